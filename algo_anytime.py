@@ -0,0 +1,258 @@
+import time
+from algo_forward import Astar
+from instrumentation import phase
+
+__all__ = ["WeightedAstar", "ARAstar"]
+
+INF = float("inf")
+
+def _suboptimality_bound(g_goal, lower_bound):
+    # cost / a lower bound of the optimal cost (>= 1, see `WeightedAstar.suboptimality_bound`)
+    if g_goal == INF:
+        return INF
+    if lower_bound >= g_goal:
+        return 1.0
+    return g_goal / lower_bound if lower_bound > 0 else INF
+
+
+class WeightedAstar(Astar):
+    def __init__(self, start: str, goal: str, graph, heuristic=None, observer=None, epsilon=1.5):
+        """A* with an inflated heuristic, i.e. the OPEN buffer is keyed by f = g + epsilon * h
+
+        Args:
+            start, goal, graph, heuristic, observer: see `Astar`
+            epsilon (float): >= 1, the inflation factor of the heuristic
+                (1 is plain A*, larger values expand fewer nodes, more greedily)
+
+        With an admissible heuristic the solution costs at most epsilon times the optimal cost.
+        After `solve()`, `self.bound` holds a (usually much) tighter certificate,
+        see `suboptimality_bound`.
+        """
+        assert epsilon >= 1.0, "epsilon < 1 gives no suboptimality bound"
+        self.epsilon = float(epsilon) # (needed by calc_total_cost_est in Astar.__init__)
+        super().__init__(start, goal, graph, heuristic, observer)
+        self.bound = INF
+
+    def calc_total_cost_est(self, intermediate_node):
+        assert self.node_is_visited(intermediate_node), f"Node {intermediate_node} not yet visited"
+        return self.tree_cum_cost[intermediate_node] + self.epsilon * self._heuristic(intermediate_node)
+
+    def _lower_bound(self):
+        # min (g + h) over OPEN: some node of an optimal path is in there with its optimal g
+        # (unless the goal already has it), so this never exceeds the optimal cost
+        g, h = self.tree_cum_cost, self._heuristic
+        return min((g[node] + h(node) for node in self._buffer), default=INF)
+
+    def suboptimality_bound(self):
+        """cost found / optimal cost <= the returned value (inf if the goal isn't reached yet)
+
+        Both epsilon and cost / min over OPEN of (g + h) bound the ratio
+        for an admissible heuristic, the smaller one is returned.
+        """
+        g_goal = self.tree_cum_cost.get(self._goal, INF)
+        return min(self.epsilon, _suboptimality_bound(g_goal, self._lower_bound())) if g_goal < INF else INF
+
+    def solve(self, validate_heuristics=True):
+        """see `Astar.solve`, the cost is within `self.bound` times the optimal cost"""
+        soln = super().solve(validate_heuristics)
+        self.bound = self.suboptimality_bound()
+        return soln
+
+
+class ARAstar(Astar):
+    def __init__(self, start: str, goal: str, graph, heuristic=None, observer=None,
+                 epsilon=3.0, epsilon_step=0.5, time_budget=None, max_expansions=None,
+                 clock=time.perf_counter):
+        """Anytime Repairing A* (Likhachev, Gordon & Thrun), i.e. a series of weighted A*
+        searches with a decreasing epsilon, each one reusing the work of the previous ones
+
+        Args:
+            start, goal, graph, heuristic, observer: see `Astar`
+                (the heuristic should be CONSISTENT for the epsilon bounds,
+                the `bound` computed from the OPEN buffer only needs it to be admissible)
+            epsilon (float): >= 1, the inflation factor of the first search
+            epsilon_step (float): epsilon is decreased by it after every search (down to 1)
+            time_budget (float, optional): seconds `solve()` may take (None: unlimited)
+            max_expansions (int, optional): expansions `solve()` may make (None: unlimited)
+            clock (callable): the time source for the time budget
+
+        The first solution is usually found after few expansions, then improved until
+        it is provably optimal or the budget runs out. Either way, the best solution
+        found so far is returned, along with a bound on its suboptimality (`self.bound`):
+            its cost <= bound * the optimal cost
+
+        How the searches are chained:
+        * a node whose g improves after its expansion in the current search is not
+          put back into OPEN but into INCONS (so every node is expanded at most once per search)
+        * the next search starts from OPEN + INCONS, re-keyed with the smaller epsilon
+        * a search stops as soon as f(goal) <= min f over OPEN
+        """
+        assert epsilon >= 1.0, "epsilon < 1 gives no suboptimality bound"
+        assert epsilon_step > 0.0
+        self.epsilon = float(epsilon)
+        super().__init__(start, goal, graph, heuristic, observer)
+        self.epsilon_step = epsilon_step
+        self.time_budget = time_budget
+        self.max_expansions = max_expansions
+        self._clock = clock
+
+        self._closed = set() # expanded in the current search
+        self._incons = set() # improved after their expansion in the current search
+        self._certified_epsilon = INF # the epsilon of the last completed search
+        self.bound = INF
+        self.n_searches = 0 # completed searches (i.e. epsilon values)
+
+    def calc_total_cost_est(self, intermediate_node):
+        assert self.node_is_visited(intermediate_node), f"Node {intermediate_node} not yet visited"
+        return self.tree_cum_cost[intermediate_node] + self.epsilon * self._heuristic(intermediate_node)
+
+    def suboptimality_bound(self):
+        """cost found / optimal cost <= the returned value (inf if the goal isn't reached yet)
+
+        The epsilon of the last completed search bounds the ratio, and so does
+        g(goal) / min over OPEN + INCONS of (g + h), even in the middle of a search.
+        """
+        g_goal = self.tree_cum_cost.get(self._goal, INF)
+        if g_goal == INF:
+            return INF
+        g, h = self.tree_cum_cost, self._heuristic
+        lower_bound = min((g[node] + h(node) for node in self._incons), default=INF)
+        lower_bound = min((g[node] + h(node) for node in self._buffer), default=lower_bound)
+        return min(self._certified_epsilon, _suboptimality_bound(g_goal, lower_bound))
+
+    def solve(self, validate_heuristics=True):
+        """
+        Returns:
+            the best (forward) path sequence (tuple) and its cost (float) found within the budget,
+            or (None, None) if the goal is unreachable or the budget ran out before reaching it.
+            See `self.bound` for its suboptimality bound.
+
+        Calling it again resumes the search (with a fresh budget).
+        """
+        soln = None
+        for soln in self.solutions(validate_heuristics):
+            pass
+        if soln is None:
+            # (no improvement, e.g. it had been optimal already)
+            if self._goal not in self.tree_cum_cost:
+                return None, None
+            with phase(self.observer, "backtrack"):
+                soln = self._backtrack(validate_heuristics)
+        return soln
+
+    def solutions(self, validate_heuristics=False):
+        """a generator of the improving solutions, i.e. (path, cost) whenever a search completes
+        with a better cost or bound (see `self.bound`), until the budget runs out or
+        the solution is optimal (the last one is also yielded if the budget runs out mid-search)
+        """
+        if self.bound <= 1.0:
+            return
+        observer = self.observer
+        deadline = None if self.time_budget is None else self._clock() + self.time_budget
+        n_expansions_max = None if self.max_expansions is None else self.iter + self.max_expansions
+        while True:
+            with phase(observer, "search"):
+                is_complete = self._improve_path(observer, deadline, n_expansions_max)
+            if is_complete:
+                self._certified_epsilon = self.epsilon
+                self.n_searches += 1
+            previous_bound, self.bound = self.bound, self.suboptimality_bound()
+            if self._goal not in self.tree_cum_cost:
+                # (a complete search without reaching the goal ==> it is unreachable)
+                return
+            if not is_complete or self.bound < previous_bound:
+                with phase(observer, "backtrack"):
+                    yield self._backtrack(validate_heuristics)
+            if not is_complete or self.bound <= 1.0:
+                return
+            self._next_search()
+
+    def _next_search(self):
+        # decrease epsilon and move INCONS into OPEN, re-keying all of it
+        self.epsilon = max(1.0, min(self.epsilon - self.epsilon_step, self.bound))
+        nodes = list(self._buffer)
+        nodes.extend(self._incons)
+        self._buffer.clear()
+        for node in nodes:
+            self._buffer.push(node, self.calc_total_cost_est(node))
+        self._incons.clear()
+        self._closed.clear()
+
+    def _improve_path(self, observer, deadline, n_expansions_max):
+        """one weighted A* search, returns whether it completed (i.e. the budget did not run out)"""
+        g = self.tree_cum_cost
+        parent = self.tree_parent
+        buffer = self._buffer
+        closed = self._closed
+        clock = self._clock
+        while buffer:
+            if self._goal in g and self.calc_total_cost_est(self._goal) <= buffer.min_priority():
+                break
+            if n_expansions_max is not None and self.iter >= n_expansions_max:
+                return False
+            if deadline is not None and clock() >= deadline:
+                return False
+            self.iter += 1
+            node_current = buffer.pop()
+            closed.add(node_current)
+            g_current = g[node_current]
+            if observer is not None:
+                observer.on_expand(node_current, g_current)
+
+            for fringe_node, cost_edge in self.graph._children_with_cost_of(node_current):
+                g_alternative = g_current + cost_edge
+                is_improved = g_alternative < g.get(fringe_node, INF)
+                if observer is not None:
+                    observer.on_relax(node_current, fringe_node, cost_edge, is_improved)
+                if not is_improved:
+                    continue
+                g[fringe_node] = g_alternative
+                parent[fringe_node] = node_current
+                if fringe_node in closed:
+                    self._incons.add(fringe_node) # (until the next search)
+                else:
+                    is_reopened = fringe_node in self._incons # (expanded in an earlier search)
+                    buffer.push(fringe_node, self.calc_total_cost_est(fringe_node))
+                    if observer is not None:
+                        observer.on_push(fringe_node, buffer.priority_of(fringe_node), len(buffer), is_reopened)
+        return True
+
+
+if __name__ == "__main__":
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from graph_examples import longway_round
+    from bench.generators import road_like_graph
+    from bench.cases import make_cases
+    from instrumentation import search_stats
+
+    # with epsilon = 1 (or a budget large enough) they are optimal
+    for tcase in (german_city_network_acc_de_wikipedia(), longway_round()):
+        tcase.verify(WeightedAstar, epsilon=1.0)
+        tcase.verify(ARAstar)
+
+    sgraph = road_like_graph(40000, seed=3)
+    for case in make_cases(sgraph, 5, seed=1):
+        heuristic = sgraph.heuristic(case.goal)
+        astar = Astar(case.start, case.goal, case.graph, heuristic=heuristic)
+        _, cost_opt = astar.solve(validate_heuristics=False)
+        print(f"{case.start} --> {case.goal}: optimal {cost_opt:.1f} ({astar.iter} expansions)")
+        for epsilon in (1.2, 2.0):
+            solver = WeightedAstar(case.start, case.goal, case.graph, heuristic=heuristic, epsilon=epsilon)
+            _, cost = solver.solve()
+            assert cost <= solver.bound * cost_opt * (1 + 1e-9) and solver.bound <= epsilon
+            print(f"  weighted A* (epsilon {epsilon}): {cost / cost_opt:.4f} x optimal, "
+                  f"bound {solver.bound:.4f} ({solver.iter} expansions)")
+
+        stats = search_stats()
+        solver = ARAstar(case.start, case.goal, case.graph, heuristic=heuristic, observer=stats)
+        for path, cost in solver.solutions():
+            assert cost <= solver.bound * cost_opt * (1 + 1e-9)
+            print(f"  ARA* (epsilon {solver.epsilon:.2f}): {cost / cost_opt:.4f} x optimal, "
+                  f"bound {solver.bound:.4f} (after {solver.iter} expansions)")
+        assert solver.bound == 1.0 and abs(cost - cost_opt) < 1e-9 * cost_opt
+
+        solver = ARAstar(case.start, case.goal, case.graph, heuristic=heuristic, max_expansions=astar.iter // 4)
+        _, cost = solver.solve()
+        if cost is not None:
+            assert cost <= solver.bound * cost_opt * (1 + 1e-9)
+            print(f"  ARA* (a quarter of the expansions): {cost / cost_opt:.4f} x optimal, bound {solver.bound:.4f}")
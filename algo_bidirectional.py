@@ -0,0 +1,165 @@
+import warnings
+from graph_rep import directed_graph_weighted, frozen_graph, implicit_graph
+from priority_buffer import heap_buffer
+from heuristics import resolve_heuristic, HeuristicWarning
+from instrumentation import phase
+
+__all__ = ["BidirectionalAstar"]
+
+INF = float("inf")
+
+class BidirectionalAstar:
+    def __init__(self, start: str, goal: str, graph: directed_graph_weighted,
+                 heuristic=None, heuristic_to_start=None, observer=None):
+        """Bidirectional A* (with average potentials), or bidirectional Dijkstra if no heuristic is given
+
+        Args:
+            start (str):
+            goal (str):
+            graph (directed_graph_weighted, frozen_graph or implicit_graph): (alias!)
+                the backward search walks the predecessor table of the graph
+                (the predecessor function of an `implicit_graph`)
+            heuristic (callable or goal_heuristic, optional):
+                h_f(node key), an estimate of the cost-to-go (towards the goal)
+            heuristic_to_start (callable or goal_heuristic, optional):
+                h_b(node key), an estimate of the cost-to-come (from the start)
+                e.g. the same `landmark_heuristic` as for `heuristic`
+            observer (search_observer, optional): see `Astar`
+                (the events of both searches are reported alike)
+
+        Unlike `Astar`, the heuristics are NOT taken from the node weights by default,
+        because the stopping criterion needs them to be CONSISTENT
+        (i.e. h(u) <= cost(u, v) + h(v) for every edge), not merely admissible.
+
+        Both searches use the potential p(v) = (h_f(v) - h_b(v)) / 2,
+        the forward one keyed by g_f(v) + p(v) and the backward one by g_b(v) - p(v).
+        Let mu be the cost of the best path found so far (via a node reached from both sides),
+        the search stops as soon as
+            min forward key + min backward key >= mu
+        at which point mu is optimal.
+        Each iteration expands one node, from the side with the smaller OPEN set.
+        """
+        assert isinstance(graph, (directed_graph_weighted, frozen_graph, implicit_graph))
+        assert graph.has_node(start), f"The start node {start} cannot found in the graph!"
+        assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
+        self.start = start
+        self.goal = goal
+
+        self.graph = graph # just an alias
+        self._start = graph._key_of(start)
+        self._goal = graph._key_of(goal)
+        self._h_f = None if heuristic is None else resolve_heuristic(heuristic, graph, goal)
+        self._h_b = None if heuristic_to_start is None else \
+            resolve_heuristic(heuristic_to_start, graph, start, reverse=True)
+        self.observer = observer
+
+        # the forward tree (rooted at the start) and the backward tree (rooted at the goal)
+        self.tree_cum_cost = {self._start: 0.0} # g_f
+        self.tree_parent = {self._start: None}
+        self.tree_cum_cost_backward = {self._goal: 0.0} # g_b, i.e. the cost-to-go found so far
+        self.tree_child = {self._goal: None} # the next node towards the goal
+
+        self._buffer_forward = heap_buffer()
+        self._buffer_forward.push(self._start, self.potential(self._start))
+        self._buffer_backward = heap_buffer()
+        self._buffer_backward.push(self._goal, -self.potential(self._goal))
+        if observer is not None:
+            observer.on_push(self._start, self.potential(self._start), 1, False)
+            observer.on_push(self._goal, -self.potential(self._goal), 1, False)
+
+        # the best path so far: its cost and the node where both trees meet
+        self.mu = 0.0 if self._start == self._goal else INF
+        self._meeting_node = self._start if self._start == self._goal else None
+
+        self.iter = 0 # relevant for academic purpose
+
+    def potential(self, node):
+        h_f = 0.0 if self._h_f is None else self._h_f(node)
+        h_b = 0.0 if self._h_b is None else self._h_b(node)
+        return 0.5 * (h_f - h_b)
+
+    def _expand(self, node, g_this, parent_this, g_other, buffer, neighbours, sign, validate):
+        g_node = g_this[node]
+        p_node = sign * self.potential(node)
+        observer = self.observer
+        if observer is not None:
+            observer.on_expand(node, g_node)
+        for neighbour, cost_edge in neighbours(node):
+            g_new = g_node + cost_edge
+            is_improved = g_new < g_this.get(neighbour, INF)
+            if observer is not None:
+                observer.on_relax(node, neighbour, cost_edge, is_improved)
+            if is_improved:
+                is_reopened = neighbour in g_this and neighbour not in buffer
+                g_this[neighbour] = g_new
+                parent_this[neighbour] = node
+                p_neighbour = sign * self.potential(neighbour)
+                # (with some tolerance for rounding, e.g. of float32 landmark tables)
+                if validate and cost_edge - p_node + p_neighbour < -1e-6 * (1.0 + abs(g_new)):
+                    warnings.warn(f"the heuristics are inconsistent at the edge between "
+                                  f"{self.graph._name_of(node)} and {self.graph._name_of(neighbour)}"
+                                  f" ==> This means the solution might be sub-optimal.", HeuristicWarning, stacklevel=3)
+                buffer.push(neighbour, g_new + p_neighbour)
+                if observer is not None:
+                    observer.on_push(neighbour, g_new + p_neighbour, len(buffer), is_reopened)
+                if neighbour in g_other and g_new + g_other[neighbour] < self.mu:
+                    self.mu = g_new + g_other[neighbour]
+                    self._meeting_node = neighbour
+
+    def solve(self, validate_heuristics=True):
+        """
+        Returns:
+            the (forward) path sequence (tuple) and the total path cost (float),
+            or (None, None) if the goal is unreachable
+
+        With validate_heuristics=True, each relaxed edge is checked
+        for consistency of the heuristics (see the constructor).
+        """
+        with phase(self.observer, "search"):
+            self._search(validate_heuristics)
+        if self._meeting_node is None:
+            return None, None
+        with phase(self.observer, "backtrack"):
+            return self._stitch()
+
+    def _search(self, validate_heuristics):
+        forward, backward = self._buffer_forward, self._buffer_backward
+        while len(forward) > 0 and len(backward) > 0:
+            if forward.min_priority() + backward.min_priority() >= self.mu:
+                break
+            self.iter += 1
+            if len(forward) <= len(backward):
+                self._expand(forward.pop(), self.tree_cum_cost, self.tree_parent,
+                             self.tree_cum_cost_backward, forward,
+                             self.graph._children_with_cost_of, +1, validate_heuristics)
+            else:
+                self._expand(backward.pop(), self.tree_cum_cost_backward, self.tree_child,
+                             self.tree_cum_cost, backward,
+                             self.graph._parents_with_cost_of, -1, validate_heuristics)
+        # (once either side runs out of nodes, every path has been accounted for)
+
+    def _stitch(self):
+        # stitch the two half paths together
+        path = [self._meeting_node]
+        while path[-1] != self._start:
+            path.append(self.tree_parent[path[-1]])
+        path.reverse()
+        while path[-1] != self._goal:
+            path.append(self.tree_child[path[-1]])
+        name_of = self.graph._name_of
+        return tuple(name_of(n) for n in path), self.mu
+
+
+if __name__ == "__main__":
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from graph_examples import longway_round
+
+    tcase1 = german_city_network_acc_de_wikipedia()
+    tcase1.verify(BidirectionalAstar, num_expected_iter=6)
+
+    tcase2 = longway_round()
+    tcase2.verify(BidirectionalAstar, num_expected_iter=4)
+
+    for tcase in (tcase1, tcase2):
+        tcase.graph = tcase.graph.freeze()
+        tcase.verify(BidirectionalAstar)
@@ -0,0 +1,357 @@
+import heapq
+import numpy as np
+from graph_rep import directed_graph_weighted, frozen_graph
+
+__all__ = ["contraction_hierarchy", "CH"]
+
+INF = float("inf")
+
+def _to_csr(n_nodes, rows):
+    """rows[i] = {neighbour: (cost, middle node)} --> CSR arrays (neighbours sorted within a row)"""
+    offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(row) for row in rows])
+    targets = np.empty(offsets[-1], dtype=np.int64)
+    cost = np.empty(offsets[-1], dtype=np.float64)
+    middle = np.empty(offsets[-1], dtype=np.int64)
+    for i, row in enumerate(rows):
+        a = offsets[i]
+        for k, neighbour in enumerate(sorted(row)):
+            targets[a + k] = neighbour
+            cost[a + k], middle[a + k] = row[neighbour]
+    return offsets, targets, cost, middle
+
+
+class contraction_hierarchy:
+    def __init__(self, graph, witness_settle_limit=500):
+        """Contraction hierarchies (Geisberger et al.): preprocessing
+
+        Nodes are contracted one by one, least important first.
+        Contracting v removes it from the remaining graph, and for every pair of
+        remaining neighbours u --> v --> w, a shortcut u --> w (remembering v as its
+        "middle" node) is added unless a witness path u ~~> w, avoiding v and
+        no longer than the detour, exists.
+        The importance is the edge difference (shortcuts added - edges removed)
+        plus the number of already contracted neighbours, updated lazily.
+
+        A query is then a bidirectional Dijkstra which only climbs up
+        in the hierarchy (see `query`), i.e. it settles few nodes.
+
+        Args:
+            graph (directed_graph_weighted or frozen_graph):
+                a mutable graph is frozen first (later changes are not reflected!),
+                edge costs must be non-negative
+            witness_settle_limit (int):
+                each witness search gives up after settling this many nodes
+                (then the shortcut is added anyway, which is always correct)
+        """
+        assert isinstance(graph, (directed_graph_weighted, frozen_graph))
+        self.graph = graph if isinstance(graph, frozen_graph) else graph.freeze()
+        assert np.all(self.graph.cost_edge >= 0), "contraction hierarchies require non-negative edge costs"
+        self._settle_limit = witness_settle_limit
+        self._lists = None
+        self.n_shortcuts = 0
+        self._contract_all()
+
+    # ---- preprocessing ----
+    def _contract_all(self):
+        g = self.graph
+        n = g.n_nodes
+        # the remaining graph: neighbour --> (cost, middle node or -1 for an original edge)
+        out_edges = [dict() for _ in range(n)]
+        in_edges = [dict() for _ in range(n)]
+        parents = np.repeat(np.arange(n), np.diff(g.offsets)).tolist()
+        for u, w, c in zip(parents, g.targets.tolist(), g.cost_edge.tolist()):
+            out_edges[u][w] = (c, -1)
+            in_edges[w][u] = (c, -1)
+        self._out_edges, self._in_edges = out_edges, in_edges
+
+        self.rank = np.full(n, -1, dtype=np.int64)
+        up_rows = [None] * n # edges towards higher ranked nodes
+        down_rows = [None] * n # edges coming from higher ranked nodes (stored at the lower one)
+        n_contracted_neighbours = [0] * n
+
+        def importance(v):
+            n_shortcuts = len(self._find_shortcuts(v))
+            return n_shortcuts - len(out_edges[v]) - len(in_edges[v]) + n_contracted_neighbours[v]
+
+        queue = [(importance(v), v) for v in range(n)]
+        heapq.heapify(queue)
+        next_rank = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            # lazy update: contract v only if it is still the least important one
+            priority = importance(v)
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, v))
+                continue
+
+            for u, w, c in self._find_shortcuts(v):
+                if c < out_edges[u].get(w, (INF,))[0]:
+                    if w not in out_edges[u]:
+                        self.n_shortcuts += 1
+                    out_edges[u][w] = (c, v)
+                    in_edges[w][u] = (c, v)
+
+            self.rank[v] = next_rank
+            next_rank += 1
+            up_rows[v] = out_edges[v]
+            down_rows[v] = in_edges[v]
+            for w in out_edges[v]:
+                del in_edges[w][v]
+                n_contracted_neighbours[w] += 1
+            for u in in_edges[v]:
+                del out_edges[u][v]
+                n_contracted_neighbours[u] += 1
+            out_edges[v] = dict()
+            in_edges[v] = dict()
+        del self._out_edges, self._in_edges
+
+        self.up = _to_csr(n, up_rows)
+        self.down = _to_csr(n, down_rows)
+
+    def _find_shortcuts(self, v):
+        """the shortcuts (u, w, cost) needed if v were contracted now"""
+        shortcuts = []
+        out_v = self._out_edges[v]
+        if not out_v:
+            return shortcuts
+        max_out = max(c for c, _ in out_v.values())
+        for u, (c_uv, _) in self._in_edges[v].items():
+            dist = self._witness_search(u, v, c_uv + max_out)
+            for w, (c_vw, _) in out_v.items():
+                if w != u and dist.get(w, INF) > c_uv + c_vw:
+                    shortcuts.append((u, w, c_uv + c_vw))
+        return shortcuts
+
+    def _witness_search(self, source, avoid, max_cost):
+        """a bounded Dijkstra in the remaining graph, without the node `avoid`"""
+        out_edges = self._out_edges
+        dist = {source: 0.0}
+        settled = set()
+        heap = [(0.0, source)]
+        while heap and len(settled) < self._settle_limit:
+            d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            if d > max_cost:
+                break
+            settled.add(u)
+            for w, (c, _) in out_edges[u].items():
+                if w != avoid and d + c < dist.get(w, INF):
+                    dist[w] = d + c
+                    heapq.heappush(heap, (d + c, w))
+        return dist
+
+    # ---- query ----
+    def _query_lists(self):
+        # plain lists index much faster than NumPy arrays (one element at a time),
+        # so the query works on a copy of the arrays (made on first use)
+        if self._lists is None:
+            self._lists = tuple(tuple(arr.tolist() for arr in csr[:3]) for csr in (self.up, self.down))
+        return self._lists
+
+    @staticmethod
+    def _upward_step(csr, u, d_u, dist, parent, heap):
+        offsets, targets, cost = csr
+        a, b = offsets[u], offsets[u + 1]
+        for w, c in zip(targets[a:b], cost[a:b]):
+            if d_u + c < dist.get(w, INF):
+                dist[w] = d_u + c
+                parent[w] = u
+                heapq.heappush(heap, (d_u + c, w))
+
+    def query(self, start: str, goal: str):
+        """
+        Returns:
+            the (forward) path sequence (tuple) and the total path cost (float),
+            or (None, None) if the goal is unreachable,
+            along with the number of settled nodes
+        """
+        s = self.graph.index_of(start)
+        t = self.graph.index_of(goal)
+        dist_f, parent_f, heap_f = {s: 0.0}, {s: -1}, [(0.0, s)]
+        dist_b, parent_b, heap_b = {t: 0.0}, {t: -1}, [(0.0, t)]
+        settled_f, settled_b = set(), set()
+        mu, meeting_node = (0.0, s) if s == t else (INF, -1)
+        up, down = self._query_lists()
+
+        while heap_f or heap_b:
+            # each side only needs to go on while its keys are below mu
+            if heap_f and heap_f[0][0] >= mu:
+                heap_f = []
+            if heap_b and heap_b[0][0] >= mu:
+                heap_b = []
+            if not heap_f and not heap_b:
+                break
+            forward = bool(heap_f) and (not heap_b or heap_f[0][0] <= heap_b[0][0])
+            if forward:
+                d, u = heapq.heappop(heap_f)
+                if u in settled_f:
+                    continue
+                settled_f.add(u)
+                if u in dist_b and d + dist_b[u] < mu:
+                    mu, meeting_node = d + dist_b[u], u
+                self._upward_step(up, u, d, dist_f, parent_f, heap_f)
+            else:
+                d, u = heapq.heappop(heap_b)
+                if u in settled_b:
+                    continue
+                settled_b.add(u)
+                if u in dist_f and d + dist_f[u] < mu:
+                    mu, meeting_node = d + dist_f[u], u
+                self._upward_step(down, u, d, dist_b, parent_b, heap_b)
+        n_settled = len(settled_f) + len(settled_b)
+        if meeting_node < 0:
+            return None, None, n_settled
+
+        # the path in the hierarchy (incl. shortcuts) ...
+        path = [meeting_node]
+        while parent_f[path[-1]] >= 0:
+            path.append(parent_f[path[-1]])
+        path.reverse()
+        while parent_b[path[-1]] >= 0:
+            path.append(parent_b[path[-1]])
+        # ... gets unpacked into original edges
+        name_of = self.graph.name_of
+        return tuple(name_of(n) for n in self._unpack(path)), mu, n_settled
+
+    @staticmethod
+    def _upward_search(csr, source):
+        """every node reachable upwards from `source` (a full Dijkstra in the upward graph)"""
+        dist, parent, heap = {source: 0.0}, {source: -1}, [(0.0, source)]
+        settled = dict()
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled[u] = d
+            contraction_hierarchy._upward_step(csr, u, d, dist, parent, heap)
+        return settled
+
+    def distance_matrix(self, sources, targets):
+        """many-to-many costs, bucket-based (Knopp et al.)
+
+        Each target t runs a backward upward search and leaves (t, d(u, t)) in the bucket
+        of every node u it settles, then each source s runs a forward upward search and
+        scans the buckets of the nodes it settles, since the highest node on a shortest
+        s-t path is found by both searches.
+
+        Returns:
+            dist (float64 array, shape (len(sources), len(targets))): inf if unreachable
+        """
+        up, down = self._query_lists()
+        index_of = self.graph.index_of
+        buckets = dict() # node --> [(target column, cost from the node to that target)]
+        for j, target in enumerate(targets):
+            for u, d in self._upward_search(down, index_of(target)).items():
+                buckets.setdefault(u, []).append((j, d))
+
+        dist = np.full((len(sources), len(targets)), np.inf)
+        for i, source in enumerate(sources):
+            row = [INF] * len(targets)
+            for u, d in self._upward_search(up, index_of(source)).items():
+                for j, d_to_target in buckets.get(u, ()):
+                    if d + d_to_target < row[j]:
+                        row[j] = d + d_to_target
+            dist[i] = row
+        return dist
+
+    def _edge_middle(self, u, w):
+        """the middle node of the hierarchy edge u --> w (-1 for an original edge)"""
+        if self.rank[w] > self.rank[u]:
+            offsets, targets, _, middle = self.up
+            row = u
+            other = w
+        else:
+            offsets, targets, _, middle = self.down
+            row = w
+            other = u
+        a, b = offsets[row], offsets[row + 1]
+        return int(middle[a + np.searchsorted(targets[a:b], other)])
+
+    def _unpack(self, path):
+        out = [path[0]]
+        stack = [(u, w) for u, w in zip(path[-2::-1], path[:0:-1])] # reversed, i.e. first edge on top
+        while stack:
+            u, w = stack.pop()
+            m = self._edge_middle(u, w)
+            if m < 0:
+                out.append(w)
+            else:
+                stack.append((m, w))
+                stack.append((u, m))
+        return out
+
+    # ---- persistence ----
+    def save(self, path):
+        arrays = {"rank": self.rank, "settle_limit": self._settle_limit, "n_shortcuts": self.n_shortcuts}
+        for prefix, csr in (("up", self.up), ("down", self.down)):
+            for name, arr in zip(("offsets", "targets", "cost", "middle"), csr):
+                arrays[f"{prefix}_{name}"] = arr
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path, graph):
+        """
+        Args:
+            graph: the (frozen) graph the hierarchy was computed on
+        """
+        out = cls.__new__(cls)
+        out.graph = graph if isinstance(graph, frozen_graph) else graph.freeze()
+        with np.load(path) as data:
+            out.rank = data["rank"]
+            out.up = tuple(data[f"up_{name}"] for name in ("offsets", "targets", "cost", "middle"))
+            out.down = tuple(data[f"down_{name}"] for name in ("offsets", "targets", "cost", "middle"))
+            out._settle_limit = int(data["settle_limit"])
+            out.n_shortcuts = int(data["n_shortcuts"])
+        assert out.rank.shape == (out.graph.n_nodes,)
+        out._lists = None
+        return out
+
+
+class CH:
+    def __init__(self, start: str, goal: str, graph, hierarchy: contraction_hierarchy = None):
+        """a query on a contraction hierarchy, with the same interface as `Astar`
+
+        Args:
+            hierarchy (optional): preprocessed for `graph` (built here if None)
+        """
+        if hierarchy is None:
+            hierarchy = contraction_hierarchy(graph)
+        assert hierarchy.graph.has_node(start), f"The start node {start} cannot found in the graph!"
+        assert hierarchy.graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
+        self.start = start
+        self.goal = goal
+        self.hierarchy = hierarchy
+        self.iter = 0 # number of settled nodes
+
+    def solve(self, validate_heuristics=False):
+        """
+        Returns:
+            the (forward) path sequence (tuple) and the total path cost (float),
+            or (None, None) if the goal is unreachable
+
+        (`validate_heuristics` is accepted for the same call signature as `Astar.solve`)
+        """
+        path, cost, self.iter = self.hierarchy.query(self.start, self.goal)
+        return path, cost
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from graph_examples import longway_round
+
+    for tcase in (german_city_network_acc_de_wikipedia(), longway_round()):
+        tcase.verify(CH)
+        hierarchy = contraction_hierarchy(tcase.graph)
+        print(f"{tcase.graph.name}: {hierarchy.n_shortcuts} shortcut(s)")
+        tcase.verify(CH, hierarchy=hierarchy)
+
+        # save/ load
+        path = os.path.join(tempfile.mkdtemp(), "hierarchy.npz")
+        hierarchy.save(path)
+        loaded = contraction_hierarchy.load(path, hierarchy.graph)
+        assert loaded.n_shortcuts == hierarchy.n_shortcuts and loaded._settle_limit == hierarchy._settle_limit
+        tcase.verify(CH, hierarchy=loaded)
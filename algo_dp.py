@@ -0,0 +1,333 @@
+import heapq
+import numpy as np
+from graph_rep import directed_graph_weighted, frozen_graph
+
+__all__ = ["DP", "shortest_path_tree", "distance_matrix", "tree_path"]
+
+INF = float("inf")
+
+
+def shortest_path_tree(graph: frozen_graph, source: int, reverse=False, targets=None):
+    """Dijkstra from `source` (node index), for non-negative edge costs
+
+    Args:
+        graph (frozen_graph):
+        source (int): node index
+        reverse (bool): if True, search along the flipped edges,
+            i.e. compute the cost-to-go TO `source` instead of the cost FROM it
+        targets (iterable of int, optional):
+            stop as soon as all of them are settled (by default, settle every reachable node)
+
+    Returns:
+        dist (dict): node index --> cost (of the settled nodes)
+        parent (dict): node index --> its parent in the tree (-1 for the source),
+            for reverse=True the "parent" is the successor towards `source`
+    """
+    g = graph.reverse() if reverse else graph
+    offsets, children, cost_edge = g.offsets, g.targets, g.cost_edge
+    remaining = None if targets is None else set(targets)
+
+    dist = {source: 0.0} # tentative until settled
+    parent = {source: -1}
+    settled = dict()
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled[u] = d
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        a, b = offsets[u], offsets[u + 1]
+        for v, c in zip(children[a:b].tolist(), cost_edge[a:b].tolist()):
+            d_new = d + c
+            if d_new < dist.get(v, INF):
+                dist[v] = d_new
+                parent[v] = u
+                heapq.heappush(heap, (d_new, v))
+    return settled, {u: parent[u] for u in settled}
+
+
+def _multi_target_dijkstra(offsets, children, cost_edge, source, targets, record_parent):
+    """Dijkstra on the CSR arrays (as plain lists), until every node in the set `targets` is settled"""
+    dist = {source: 0.0}
+    parent = {source: -1} if record_parent else None
+    settled = dict()
+    n_remaining = len(targets)
+    heap = [(0.0, source)]
+    while heap and n_remaining > 0:
+        d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled[u] = d
+        if u in targets:
+            n_remaining -= 1
+        for k in range(offsets[u], offsets[u + 1]):
+            v = children[k]
+            d_new = d + cost_edge[k]
+            if d_new < dist.get(v, INF):
+                dist[v] = d_new
+                if record_parent:
+                    parent[v] = u
+                heapq.heappush(heap, (d_new, v))
+    if record_parent:
+        parent = {u: parent[u] for u in settled}
+    return settled, parent
+
+
+def distance_matrix(graph, sources, targets, return_predecessors=False, hierarchy=None):
+    """one-to-many/ many-to-many shortest path costs, for non-negative edge costs
+
+    Args:
+        graph (directed_graph_weighted or frozen_graph):
+            a mutable graph is frozen first
+        sources, targets (sequences of node names):
+        return_predecessors (bool):
+            also return the shortest path tree of each source
+        hierarchy (contraction_hierarchy, optional):
+            if given (and computed on `graph`), the bucket-based many-to-many method is used,
+            i.e. one upward search per target and per source (no predecessors though)
+
+    Returns:
+        dist (float64 array, shape (len(sources), len(targets))): inf if unreachable
+        predecessors (list of dict, only with return_predecessors=True):
+            one per source, node key --> its parent (the root maps to -1 for a frozen_graph,
+            None otherwise), covering at least the reachable targets, see `tree_path`
+
+    Otherwise, it runs one Dijkstra per (distinct) source, stopping as soon as
+    all the targets are settled, instead of one search per (source, target) pair.
+    """
+    if hierarchy is not None:
+        assert not return_predecessors, "the hierarchy-based method does not record predecessors"
+        return hierarchy.distance_matrix(sources, targets)
+    assert isinstance(graph, (directed_graph_weighted, frozen_graph))
+    frozen = graph if isinstance(graph, frozen_graph) else graph.freeze()
+    assert np.all(frozen.cost_edge >= 0), "Dijkstra requires non-negative edge costs"
+    source_idx = [frozen.index_of(s) for s in sources]
+    target_idx = [frozen.index_of(t) for t in targets]
+    target_set = set(target_idx)
+
+    # (indexing plain lists is much faster than indexing arrays one element at a time)
+    offsets, children, cost_edge = frozen.offsets.tolist(), frozen.targets.tolist(), frozen.cost_edge.tolist()
+    dist = np.full((len(source_idx), len(target_idx)), np.inf)
+    predecessors = []
+    trees = dict() # source index --> (settled, parent), for repeated sources
+    for i, s in enumerate(source_idx):
+        if s not in trees:
+            trees[s] = _multi_target_dijkstra(offsets, children, cost_edge, s, target_set, return_predecessors)
+        settled, parent = trees[s]
+        dist[i] = [settled.get(t, INF) for t in target_idx]
+        if return_predecessors:
+            predecessors.append(parent)
+    if not return_predecessors:
+        return dist
+    if frozen is not graph: # node names as keys (like the tree of `Astar`)
+        name_of = frozen.name_of
+        renamed = dict()
+        for k, parent in enumerate(predecessors):
+            if id(parent) not in renamed:
+                renamed[id(parent)] = {name_of(u): (None if p < 0 else name_of(p)) for u, p in parent.items()}
+            predecessors[k] = renamed[id(parent)]
+    return dist, predecessors
+
+
+def tree_path(parent, node):
+    """the path (tuple of node keys) from the root of a shortest path tree to `node`,
+    None if `node` is not in the tree (see `distance_matrix` and `shortest_path_tree`)"""
+    if node not in parent:
+        return None
+    path = [node]
+    while parent[path[-1]] is not None and parent[path[-1]] != -1:
+        path.append(parent[path[-1]])
+    return tuple(reversed(path))
+
+
+class DP:
+    def __init__(self, graph, goal: str):
+        """Dynamic programming, i.e. the value function (aka cost-to-go function)
+        of every node w.r.t. a single goal
+
+        Args:
+            graph (directed_graph_weighted or frozen_graph):
+                a mutable graph is frozen first (later changes are not reflected!)
+            goal (str):
+
+        Once `solve_backward()` is done, each query `solve_forward(start)`
+        just follows the (feedback) policy, i.e. it costs O(path length).
+        Handy when many starts share one goal.
+        """
+        assert isinstance(graph, (directed_graph_weighted, frozen_graph))
+        assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
+        self.goal = goal
+        self.graph = graph if isinstance(graph, frozen_graph) else graph.freeze()
+        self._goal = self.graph.index_of(goal)
+
+        # both indexed by the node index of `self.graph`
+        self.cost_to_go = None # float64 array, inf if the goal is unreachable
+        self.policy = None # int array, the next node towards the goal (-1 if none)
+
+        self.iter = 0 # relevant for academic purpose
+
+    def solve_backward(self, method="auto"):
+        """compute the cost-to-go of every node
+
+        Args:
+            method (str):
+                "dijkstra" --- reverse-graph Dijkstra, requires non-negative edge costs
+                "bellman_ford" --- vectorized value iteration, any edge costs
+                "auto" --- the former if possible
+
+        Returns:
+            the cost-to-go array (indexed by node index)
+
+        Raises:
+            ValueError: if a negative cycle can reach the goal
+        """
+        if method == "auto":
+            method = "dijkstra" if np.all(self.graph.cost_edge >= 0) else "bellman_ford"
+        if method == "dijkstra":
+            self._solve_backward_dijkstra()
+        elif method == "bellman_ford":
+            self._solve_backward_bellman_ford()
+        else:
+            raise ValueError(f"unknown method {method!r}")
+        self.cost_to_go.flags.writeable = False
+        return self.cost_to_go
+
+    def _solve_backward_dijkstra(self):
+        assert np.all(self.graph.cost_edge >= 0), "Dijkstra requires non-negative edge costs"
+        settled, successor = shortest_path_tree(self.graph, self._goal, reverse=True)
+        self.iter = len(settled)
+
+        n = self.graph.n_nodes
+        self.cost_to_go = np.full(n, np.inf)
+        self.policy = np.full(n, -1, dtype=np.int64)
+        nodes = np.fromiter(settled.keys(), dtype=np.int64, count=len(settled))
+        self.cost_to_go[nodes] = np.fromiter(settled.values(), dtype=np.float64, count=len(settled))
+        self.policy[nodes] = np.fromiter((successor[u] for u in settled), dtype=np.int64, count=len(settled))
+
+    def _solve_backward_bellman_ford(self):
+        g = self.graph
+        n = g.n_nodes
+        row_len = np.diff(g.offsets)
+        parents = np.repeat(np.arange(n), row_len)
+        non_empty_rows = np.flatnonzero(row_len > 0)
+
+        value = np.full(n, np.inf)
+        value[self._goal] = 0.0
+        self.iter = 0
+        # a shortest path has at most n-1 edges, i.e. it converges within n-1 sweeps
+        # (one more sweep tells whether a negative cycle is involved)
+        for _ in range(n):
+            self.iter += 1
+            candidates = g.cost_edge + value[g.targets] # cost via each edge
+            value_new = value.copy()
+            if len(non_empty_rows):
+                value_new[non_empty_rows] = np.minimum(
+                    value[non_empty_rows], np.minimum.reduceat(candidates, g.offsets[non_empty_rows]))
+            value_new[self._goal] = min(value_new[self._goal], 0.0)
+            if np.array_equal(value_new, value):
+                break
+            value = value_new
+        else:
+            raise ValueError("a negative cycle is reachable, the cost-to-go is unbounded")
+        if value[self._goal] < 0:
+            raise ValueError("a negative cycle passes through the goal, the cost-to-go is unbounded")
+
+        # the policy: a tree over the tight edges (those attaining the minimum), grown backward from the goal
+        # (not just any tight edge per node, with zero-cost cycles the nodes may point at each other)
+        candidates = g.cost_edge + value[g.targets]
+        tight_edges = np.flatnonzero((candidates == value[parents]) & np.isfinite(candidates))
+        policy = np.full(n, -1, dtype=np.int64)
+        in_tree = np.zeros(n, dtype=bool)
+        in_tree[self._goal] = True
+        frontier = in_tree.copy()
+        while len(tight_edges):
+            reached = tight_edges[frontier[g.targets[tight_edges]] & ~in_tree[parents[tight_edges]]]
+            if len(reached) == 0:
+                break
+            nodes, first = np.unique(parents[reached], return_index=True)
+            policy[nodes] = g.targets[reached[first]]
+            in_tree[nodes] = True
+            frontier[:] = False
+            frontier[nodes] = True
+            tight_edges = tight_edges[~in_tree[parents[tight_edges]]]
+        self.cost_to_go = value
+        self.policy = policy
+
+    def solve_forward(self, start: str):
+        """
+        Returns:
+            the (forward) path sequence (tuple) and the total path cost (float),
+            or (None, None) if the goal is unreachable from `start`
+        """
+        assert self.cost_to_go is not None, "please first call solve_backward()"
+        node = self.graph.index_of(start)
+        cost = float(self.cost_to_go[node])
+        if cost == INF:
+            return None, None
+        path = [node]
+        while node != self._goal:
+            node = int(self.policy[node])
+            path.append(node)
+            assert len(path) <= self.graph.n_nodes, "the policy contains a cycle"
+        name_of = self.graph.name_of
+        return tuple(name_of(n) for n in path), cost
+
+    def value_of(self, node_name: str):
+        assert self.cost_to_go is not None, "please first call solve_backward()"
+        return float(self.cost_to_go[self.graph.index_of(node_name)])
+
+    def heuristic(self, graph=None):
+        """the cost-to-go as an (exact) heuristic for `Astar` towards `self.goal`
+
+        Args:
+            graph (optional): the graph Astar runs on,
+                either `self.graph` (the default) or the mutable graph it was frozen from
+        """
+        assert self.cost_to_go is not None, "please first call solve_backward()"
+        values = self.cost_to_go.tolist()
+        if graph is None or graph is self.graph:
+            return values.__getitem__ # node index --> cost-to-go
+        return dict(zip(self.graph._names, values)).__getitem__ # node name --> cost-to-go
+
+
+if __name__ == "__main__":
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from graph_examples import longway_round
+    from numpy.testing import assert_almost_equal
+    from algo_forward import Astar
+
+    for tcase in (german_city_network_acc_de_wikipedia(), longway_round()):
+        for method in ("dijkstra", "bellman_ford"):
+            solver = DP(tcase.graph, tcase.goal)
+            solver.solve_backward(method=method)
+            soln_path, soln_cost = solver.solve_forward(tcase.start)
+            assert_almost_equal(soln_cost, tcase.true_min_cost)
+            assert soln_path in tcase.tuple_global_soln
+            print(f"[{method}] {soln_path} at cost {soln_cost}")
+
+        # the exact cost-to-go is the most informative heuristic
+        # (only the nodes on the optimal path get expanded)
+        tcase.verify(Astar, heuristic=solver.heuristic(tcase.graph),
+                     num_expected_iter=len(tcase.tuple_global_soln[0]))
+
+        # one Dijkstra per source (instead of one search per pair)
+        nodes = sorted(tcase.graph.list_all_nodes())
+        dist, predecessors = distance_matrix(tcase.graph, [tcase.start], nodes, return_predecessors=True)
+        assert_almost_equal(dist[0, nodes.index(tcase.goal)], tcase.true_min_cost)
+        assert tree_path(predecessors[0], tcase.goal) in tcase.tuple_global_soln
+
+    # zero-cost edges (a zero-cost cycle A <-> B, where both nodes tie)
+    graph = directed_graph_weighted("zero-cost cycle")
+    graph.add_nodes_from(["S", "A", "B", "G"])
+    graph.add_edges_from([("S", "A", 1.), ("A", "B", 0.), ("B", "A", 0.), ("A", "G", 1.), ("B", "G", 1.)])
+    for method in ("dijkstra", "bellman_ford"):
+        solver = DP(graph, "G")
+        solver.solve_backward(method=method)
+        for start in ("A", "B"):
+            soln_path, soln_cost = solver.solve_forward(start)
+            assert soln_path[0] == start and soln_path[-1] == "G" and soln_cost == 1.0
+        assert solver.solve_forward("S")[1] == 2.0
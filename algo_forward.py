@@ -1,24 +1,44 @@
-from graph_rep import directed_graph_weighted
+import warnings
+from graph_rep import directed_graph_weighted, frozen_graph, implicit_graph
+from priority_buffer import heap_buffer
+from heuristics import resolve_heuristic, HeuristicWarning
+from instrumentation import phase
 
 __all__ = ["Astar"]
 
 class Astar:
-    def __init__(self, start: str, goal: str, graph: directed_graph_weighted):
+    def __init__(self, start: str, goal: str, graph: directed_graph_weighted, heuristic=None, observer=None,
+                 max_nodes=None):
         """
 
         Args:
             start (str):
             goal (str): 
-            graph (directed_graph_weighted): (alias!)
+            graph (directed_graph_weighted, frozen_graph or implicit_graph): (alias!)
+            heuristic (callable or goal_heuristic, optional):
+                the (optimistic) cost-to-go estimate h(node key),
+                by default the node weights of the graph are used.
+                (e.g. `DP.heuristic(graph)` gives the exact cost-to-go,
+                `landmark_heuristic` and the coordinate-based ones of coord_heuristics.py work for any goal)
+            observer (search_observer, optional):
+                notified of every expansion/ relaxation/ push and the phase timings,
+                e.g. a `search_stats`
+            max_nodes (int, optional): a cap on the number of nodes in the node table,
+                once exceeded the tables are dropped and the search goes on as `IDAstar`
+                (with memory O(depth)), starting from min f over OPEN, a lower bound found so far
 
 
         Important additional data structure employed here
 
         1. a node_table (aka the tree):
 
-            node name (as ID),  parent, cum_cost_estimate
+            node key (as ID),  parent, cum_cost_estimate
 
-        2. the open buffer (should be a set of node names)
+            where the node key is the node name for a `directed_graph_weighted`
+            and the integer node index for a `frozen_graph`
+            (node names are only looked up for the start/ goal and the returned path)
+
+        2. the open buffer (a priority queue of node names, keyed by f = g + h)
 
         Remarks on the choices made above:
         * to avoid data staleness, there is no "visited flag" for every node in `graph`,
@@ -26,25 +46,35 @@ class Astar:
         * In principle, cum_cost_estimate is also redundant but
           it makes perfect sense to "cache" it.
           In fact, I use cum_cost_estimate (often denoted as g) instead of f
-        * This implementation has a VERY SIMPLE buffer (just a dict)
-          --- priority queue is NOT used
+        * The buffer is a binary heap (see `heap_buffer`) with decrease-key
+          by lazy deletion, so each expansion costs O(log |OPEN|)
+          instead of a linear scan over the OPEN set.
 
         """
 
-        node_set = graph.list_all_nodes()
-        assert start in node_set, f"The start node {start} cannot found in the graph!"
-        assert goal in  node_set, f"The goal node {goal} cannot found in the graph!"
+        assert isinstance(graph, (directed_graph_weighted, frozen_graph, implicit_graph))
+        assert graph.has_node(start), f"The start node {start} cannot found in the graph!"
+        assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
         self.start = start
         self.goal = goal
         
-        assert isinstance(graph, directed_graph_weighted)
         self.graph = graph # just an alias
+        self._start = graph._key_of(start)
+        self._goal = graph._key_of(goal)
+        self._goals = {self._goal} # (the nodes ending the search, see `MultiGoalAstar`)
+        self._reached = None # popped but not expanded yet (a goal, or see `traverse`)
+        self._found = None # the goal, once popped (by `solve` or by `traverse`)
+        self._heuristic = resolve_heuristic(heuristic, graph, goal)
+        self.observer = observer
+        self.max_nodes = max_nodes
 
-        self.tree_cum_cost = {start: 0.0} # often denoted as g
-        self.tree_parent  = {start: None}
+        self.tree_cum_cost = {self._start: 0.0} # often denoted as g
+        self.tree_parent  = {self._start: None}
 
-        self._buffer = set([self.start]) # holding nodes to investigate further, aka the fringe/ OPEN set
-        # you might want to implement it as a priority queue instead
+        self._buffer = heap_buffer() # holding nodes to investigate further, aka the fringe/ OPEN set
+        self._buffer.push(self._start, self.calc_total_cost_est(self._start))
+        if observer is not None:
+            observer.on_push(self._start, self._buffer.priority_of(self._start), 1, False)
 
         self.iter = 0 # relevant for academic purpose
 
@@ -53,23 +83,12 @@ class Astar:
     
     def calc_total_cost_est(self,intermediate_node):
         assert self.node_is_visited(intermediate_node), f"Node {intermediate_node} not yet visited"
-        return self.tree_cum_cost[intermediate_node] + self.graph._cost_node[intermediate_node]
+        return self.tree_cum_cost[intermediate_node] + self._heuristic(intermediate_node)
 
     def extract_best_node_from_buffer(self):
-        list_nodes_in_buffer = list(self._buffer)
-        # just an initialization for searching among nodes in the OPEN buffer
         # the node with minimum estimated total path cost
-        node_to_pop = list_nodes_in_buffer[0]
-        f_lowest = self.calc_total_cost_est(node_to_pop)
-        for n in list_nodes_in_buffer[1:]:
-            f = self.calc_total_cost_est(n)
-            if f < f_lowest:
-                node_to_pop = n
-                f_lowest = f
-
-        # don't forget this!
-        self._buffer.remove(node_to_pop)
-        return node_to_pop
+        # (the heap also takes it out of the OPEN buffer)
+        return self._buffer.pop()
 
     def solve(self,validate_heuristics = True):
         """
@@ -91,68 +110,219 @@ class Astar:
             * the non-existence of solution and/or
             * non-admissible heuristics (TBD: examples).
         """
+        observer = self.observer
+        with phase(observer, "search"):
+            if self._found is not None:
+                is_found = True # (e.g. `traverse` went past the goal already)
+            else:
+                self._expand_pending(observer)
+                is_found = self._search(observer) if len(self._buffer) > 0 else False
+        if is_found is None:
+            return self._fall_back_to_idastar(validate_heuristics)
+        if not is_found:
+            return None, None
+        with phase(observer, "backtrack"):
+            return self._backtrack(validate_heuristics, self._found)
+
+    def _search(self, observer):
+        """the main loop, returns whether a goal is reached (None if `max_nodes` is exceeded),
+        the goal reached is left in `self._reached` (unexpanded)"""
+        max_nodes = self.max_nodes
+        goals = self._goals
         while True:
+            if max_nodes is not None and len(self.tree_parent) > max_nodes:
+                return None
             self.iter += 1
             node_current = self.extract_best_node_from_buffer()
-            if node_current == self.goal:
+            if observer is not None:
+                observer.on_expand(node_current, self.tree_cum_cost[node_current])
+            if node_current in goals:
+                self._reached = self._found = node_current
                 break # goto where???
 
-            nodes_to_investigate = self.graph._adj[node_current] # a set object
-
-            for fringe_node in nodes_to_investigate:
-                if not self.node_is_visited(fringe_node): # unvisited
-                    # make a new entry
-                    self.tree_parent[fringe_node] = node_current
-                    self.tree_cum_cost[fringe_node] = \
-                        self.tree_cum_cost[node_current] \
-                        + self.graph.get_cost_edge(node_current,fringe_node)
-
-                    self._buffer.add(fringe_node) # not to forget!
-                # IF ...
-                #   a. already visited AND 
-                #   b. it is better off to base the fringe_node
-                #      from node_current (instead of basing from self.tree_parent[fringe_node])
-                # THEN
-                #   update the buffer (for my implementation, it's just about adding it to the buffer, if it hasn't)
-                #   update the tree
-                else:
-                    cum_cost_alternative_path_start_to_fringe = \
-                        self.tree_cum_cost[node_current] + self.graph.get_cost_edge(node_current,fringe_node)
-                    if self.tree_cum_cost[fringe_node] > cum_cost_alternative_path_start_to_fringe:
-                        # update the tree
-                        self.tree_cum_cost[fringe_node] =  cum_cost_alternative_path_start_to_fringe
-                        self.tree_parent[fringe_node] = node_current
-                        # update the buffer (to allow expanding this fringe node in the next iteration)
-                        self._buffer.add(fringe_node) 
-                        # Remark 1: 
-                        #   the built-in "set" dtype (the dtype of self._buffer) 
-                        #   already ensures the buffer always contains distinctive elements
-                        # Remark 2:
-                        #   in my implementation, the cum cost (or equivalently the f-values)
-                        #   are stored in the tree instead of the buffer                    
+            self._expand(node_current, observer)
 
             if len(self._buffer)== 0:
                 # raise ValueError("Can't find a solution")
-                return None, None
-        
+                return False
+        return True
+
+    def traverse(self, stop=None, max_cost=None, max_nodes=None):
+        """a generator of (node, parent, g) in the order the nodes are settled (popped from OPEN),
+        where the parent is None for the start node
+
+        Args:
+            stop (callable, optional): (node, parent, g) --> bool, the search ends
+                right after yielding a node it returns True for (without expanding it)
+            max_cost (float, optional): only the nodes with f = g + h <= max_cost are settled,
+                e.g. with `heuristic=lambda v: 0.0` the isochrone g <= max_cost
+            max_nodes (int, optional): yield at most this many nodes (per call)
+
+        With a consistent heuristic every node comes once, with its optimal g
+        (otherwise a node may come again, with a smaller g).
+        The state stays in the solver, so calling it again resumes the search
+        (e.g. with a larger max_cost), and so does `solve`.
+        See also `frontier`, `checkpoint` and `restore`.
+        """
+        observer = self.observer
+        self._expand_pending(observer)
+        name_of = self.graph._name_of
+        g, parent_of = self.tree_cum_cost, self.tree_parent
+        buffer = self._buffer
+        n_yielded = 0
+        while len(buffer) > 0:
+            if max_nodes is not None and n_yielded >= max_nodes:
+                return
+            if max_cost is not None and buffer.min_priority() > max_cost:
+                return
+            node = self.extract_best_node_from_buffer()
+            self.iter += 1
+            if observer is not None:
+                observer.on_expand(node, g[node])
+            parent = parent_of[node]
+            if node in self._goals and self._found is None:
+                self._found = node
+            # (until the consumer asks for the next one, in case it never does)
+            self._reached = node
+            n_yielded += 1
+            item = (name_of(node), None if parent is None else name_of(parent), g[node])
+            yield item
+            if stop is not None and stop(*item):
+                return
+            self._reached = None
+            self._expand(node, observer)
+
+    def _expand_pending(self, observer):
+        # expand the node that was popped but not expanded (see `traverse`)
+        if self._reached is not None:
+            node, self._reached = self._reached, None
+            self._expand(node, observer)
+
+    def frontier(self):
+        """the nodes reached but not expanded (yet) as a list of (node, g),
+        i.e. OPEN and the node `traverse` last yielded (unless the search went on from it)"""
+        name_of, g = self.graph._name_of, self.tree_cum_cost
+        nodes = list(self._buffer) + ([] if self._reached is None else [self._reached])
+        return [(name_of(node), g[node]) for node in nodes]
+
+    def checkpoint(self):
+        """a snapshot of the search state (as node names, e.g. to pickle it), see `restore`"""
+        name_of = self.graph._name_of
+        parent_of = self.tree_parent
+        return {
+            "start": self.start,
+            "goals": [name_of(node) for node in self._goals],
+            "nodes": [(name_of(node), None if parent_of[node] is None else name_of(parent_of[node]), g)
+                      for node, g in self.tree_cum_cost.items()],
+            "open": [name_of(node) for node in self._buffer],
+            "reached": None if self._reached is None else name_of(self._reached),
+            "found": None if self._found is None else name_of(self._found),
+            "iter": self.iter,
+        }
+
+    def restore(self, state):
+        """continue from a `checkpoint` (of a search of the same kind from the same start node),
+        e.g. `Astar(start, goal, graph, heuristic).restore(state)`, returns the solver
+        (the priorities of OPEN are recomputed, with the heuristic of this solver)"""
+        assert state["start"] == self.start, "the checkpoint is of a search from another start node"
+        key_of = self.graph._key_of
+        self.tree_cum_cost, self.tree_parent = dict(), dict()
+        for node, parent, g in state["nodes"]:
+            node = key_of(node)
+            self.tree_cum_cost[node] = g
+            self.tree_parent[node] = None if parent is None else key_of(parent)
+        self._buffer.clear()
+        for node in state["open"]:
+            node = key_of(node)
+            self._buffer.push(node, self.calc_total_cost_est(node))
+        self._goals = {key_of(node) for node in state["goals"]}
+        self._reached = None if state["reached"] is None else key_of(state["reached"])
+        self._found = None if state["found"] is None else key_of(state["found"])
+        self.iter = state["iter"]
+        return self
+
+    def _expand(self, node_current, observer):
+        # (child, edge cost) pairs
+        nodes_to_investigate = self.graph._children_with_cost_of(node_current)
+
+        for fringe_node, cost_edge in nodes_to_investigate:
+            if not self.node_is_visited(fringe_node): # unvisited
+                # make a new entry
+                self.tree_parent[fringe_node] = node_current
+                self.tree_cum_cost[fringe_node] = \
+                    self.tree_cum_cost[node_current] + cost_edge
+
+                self._buffer.push(fringe_node, self.calc_total_cost_est(fringe_node)) # not to forget!
+                if observer is not None:
+                    observer.on_relax(node_current, fringe_node, cost_edge, True)
+                    observer.on_push(fringe_node, self._buffer.priority_of(fringe_node),
+                                     len(self._buffer), False)
+            # IF ...
+            #   a. already visited AND 
+            #   b. it is better off to base the fringe_node
+            #      from node_current (instead of basing from self.tree_parent[fringe_node])
+            # THEN
+            #   update the buffer (for my implementation, it's just about adding it to the buffer, if it hasn't)
+            #   update the tree
+            else:
+                cum_cost_alternative_path_start_to_fringe = \
+                    self.tree_cum_cost[node_current] + cost_edge
+                is_improved = self.tree_cum_cost[fringe_node] > cum_cost_alternative_path_start_to_fringe
+                if observer is not None:
+                    observer.on_relax(node_current, fringe_node, cost_edge, is_improved)
+                if is_improved:
+                    # (visited but no longer in the buffer ==> it has been expanded already)
+                    is_reopened = fringe_node not in self._buffer
+                    # update the tree
+                    self.tree_cum_cost[fringe_node] =  cum_cost_alternative_path_start_to_fringe
+                    self.tree_parent[fringe_node] = node_current
+                    # update the buffer (to allow expanding this fringe node in the next iteration)
+                    self._buffer.push(fringe_node, self.calc_total_cost_est(fringe_node))
+                    if observer is not None:
+                        observer.on_push(fringe_node, self._buffer.priority_of(fringe_node),
+                                         len(self._buffer), is_reopened)
+                    # Remark 1: 
+                    #   if fringe_node is still in the buffer, this is a decrease-key,
+                    #   i.e. the buffer still contains distinctive elements
+                    # Remark 2:
+                    #   the tree stays the ground truth for g,
+                    #   the f-values in the buffer are merely the sorting keys
+
+    def _fall_back_to_idastar(self, validate_heuristics):
+        from algo_memory_bounded import IDAstar
+        # some node of an optimal path is in OPEN with its optimal g ==> min (g + h) <= the optimal cost
+        g, h = self.tree_cum_cost, self._heuristic
+        threshold = min(g[node] + h(node) for node in self._buffer)
+        self.tree_cum_cost, self.tree_parent = dict(), dict()
+        self._buffer.clear()
+        solver = IDAstar(self.start, self.goal, self.graph, heuristic=h, observer=self.observer,
+                         threshold=threshold)
+        soln = solver.solve(validate_heuristics)
+        self.iter += solver.iter
+        return soln
+
+    def _backtrack(self, validate_heuristics, target=None):
         # backtracing the path (and validate the heuristics' admissibility)
         # initialization
-        backward_path_seq = [self.goal]  # current node being backward_path_seq[-1]
-        while backward_path_seq[-1] != self.start:
+        target = self._goal if target is None else target
+        backward_path_seq = [target]  # current node being backward_path_seq[-1]
+        while backward_path_seq[-1] != self._start:
             node_next = self.tree_parent[backward_path_seq[-1]]
 
             # extra validation stuff
             if validate_heuristics:
-                node_next_rem_cost_soln = self.tree_cum_cost[self.goal] - self.tree_cum_cost[node_next]
-                node_next_rem_cost_heuristic = self.graph.get_cost_node(node_next)
-                if node_next_rem_cost_soln < node_next_rem_cost_heuristic:
-                    warnTxt  = f"[Info] your heuristic value for node {node_next} is unadmissible, \n"
-                    warnTxt += f"       i.e. cost-to-go <= {node_next_rem_cost_soln} (from the soln) < {node_next_rem_cost_heuristic} (from the heuristics)"
-                    warnTxt +=  "       ==> This means the solution might be sub-optimal."
-                    print(warnTxt)
+                node_next_rem_cost_soln = self.tree_cum_cost[target] - self.tree_cum_cost[node_next]
+                node_next_rem_cost_heuristic = self._heuristic(node_next)
+                # (with some tolerance for rounding, e.g. an exact heuristic summed up differently)
+                if node_next_rem_cost_soln < node_next_rem_cost_heuristic - 1e-9 * (1.0 + abs(node_next_rem_cost_soln)):
+                    warnTxt  = f"your heuristic value for node {self.graph._name_of(node_next)} is unadmissible, \n"
+                    warnTxt += f"i.e. cost-to-go <= {node_next_rem_cost_soln} (from the soln) < {node_next_rem_cost_heuristic} (from the heuristics)\n"
+                    warnTxt +=  "==> This means the solution might be sub-optimal."
+                    warnings.warn(warnTxt, HeuristicWarning, stacklevel=3)
 
             backward_path_seq.append(node_next)
-        return tuple(backward_path_seq[::-1]), self.tree_cum_cost[self.goal]
+        name_of = self.graph._name_of
+        return tuple(name_of(n) for n in reversed(backward_path_seq)), self.tree_cum_cost[target]
 
 
 if __name__ == "__main__":
@@ -164,3 +334,26 @@ if __name__ == "__main__":
 
     tcase2 = longway_round()
     tcase2.verify(Astar, num_expected_iter=6)
+
+    # the same on the frozen (integer-indexed) graphs
+    for tcase in (tcase1, tcase2):
+        tcase.graph = tcase.graph.freeze()
+        tcase.verify(Astar, num_expected_iter=6)
+
+    # streaming: the cities within 150 km of SB (Dijkstra order, i.e. h = 0), then on to WB
+    solver = Astar(tcase1.start, tcase1.goal, tcase1.graph, heuristic=lambda v: 0.0)
+    for city, parent, g in solver.traverse(max_cost=150.0):
+        print(f"  {city} (from {parent}): {g}")
+    print("frontier:", solver.frontier())
+    path, cost = solver.solve()
+    assert cost == tcase1.true_min_cost
+
+    # `solve` after a traversal that went past the goal, fully or up to a limit
+    for limits in (dict(), dict(max_cost=300.0), dict(max_nodes=8)):
+        solver = Astar(tcase1.start, tcase1.goal, tcase1.graph)
+        list(solver.traverse(**limits))
+        path, cost = solver.solve()
+        assert path in tcase1.tuple_global_soln and cost == tcase1.true_min_cost, limits
+        # (and so does a search restored from a checkpoint)
+        restored = Astar(tcase1.start, tcase1.goal, tcase1.graph).restore(solver.checkpoint())
+        assert restored.solve() == (path, cost)
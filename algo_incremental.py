@@ -0,0 +1,213 @@
+from graph_rep import directed_graph_weighted
+from priority_buffer import heap_buffer
+from heuristics import resolve_heuristic
+from instrumentation import phase
+
+__all__ = ["LPAstar"]
+
+INF = float("inf")
+
+class LPAstar:
+    def __init__(self, start: str, goal: str, graph: directed_graph_weighted, heuristic=None, observer=None):
+        """Lifelong Planning A* (Koenig & Likhachev), i.e. incremental replanning
+
+        Args:
+            start (str):
+            goal (str):
+            graph (directed_graph_weighted): (alias!)
+                the planner subscribes to its edge insertions/ cost changes
+                (see `directed_graph_weighted.set_cost_edge`),
+                call `close()` to unsubscribe
+            heuristic (callable or goal_heuristic, optional): h(node name),
+                by default the node weights of the graph are used.
+                It should be CONSISTENT, and it is assumed to stay fixed.
+            observer (search_observer, optional): see `Astar`
+                (here g is min(g, rhs) of the expanded node, a reopening is
+                a node pushed again after an expansion, and the phases are
+                "update" (the edge changes), "search" and "backtrack")
+
+        Two tables are kept between calls of `solve()`
+        * g --- the cost-to-come as of the last expansion
+        * rhs --- the one-step lookahead, rhs(u) = min over parents p of g(p) + cost(p, u)
+        A node is locally consistent iff g == rhs, only the inconsistent ones are
+        in the OPEN buffer, keyed by [min(g, rhs) + h, min(g, rhs)] (lexicographic).
+        An edge change only makes its child node (possibly) inconsistent,
+        so the next `solve()` just repairs the affected part of the search tree.
+
+        Zero-cost edges are fine: the paper assumes positive costs, otherwise the nodes of
+        a zero-cost cycle can keep supporting each other's outdated g after a cost increase.
+        So the parent each node was settled from is recorded (the search tree), and a node whose
+        g is invalidated takes its whole subtree along (g = inf), before any rhs is recomputed.
+        """
+        assert isinstance(graph, directed_graph_weighted)
+        assert graph.has_node(start), f"The start node {start} cannot found in the graph!"
+        assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
+        self.start = start
+        self.goal = goal
+        self.graph = graph # just an alias
+        self._heuristic = resolve_heuristic(heuristic, graph, goal)
+        self.observer = observer
+
+        # nodes not in the tables have g = rhs = inf
+        self.g = dict()
+        self.rhs = {start: 0.0}
+        self.parent = {start: None} # the search tree, i.e. the parent each node was settled from
+        self._buffer = heap_buffer()
+        self._buffer.push(start, self.calc_key(start))
+
+        self._nodes_to_update = set() # the children of changed edges, until the next solve()
+        self._nodes_to_invalidate = set() # ... of the tree edges that got more expensive
+        graph.subscribe(self._on_edge_change)
+
+        self.iter = 0 # number of expansions of the latest solve() (relevant for academic purpose)
+
+    def close(self):
+        """stop listening to the graph"""
+        self.graph.unsubscribe(self._on_edge_change)
+
+    def _on_edge_change(self, parent_node, child_node, old_cost, new_cost):
+        self._nodes_to_update.add(child_node)
+        if new_cost > old_cost and self.parent.get(child_node) == parent_node:
+            self._nodes_to_invalidate.add(child_node)
+
+    def calc_key(self, node):
+        g_rhs = min(self.g.get(node, INF), self.rhs.get(node, INF))
+        return (g_rhs + self._heuristic(node), g_rhs)
+
+    def update_node(self, node):
+        if node != self.start:
+            g = self.g
+            self.rhs[node] = min(
+                (g.get(parent, INF) + cost_edge for parent, cost_edge in self.graph._parents_with_cost_of(node)),
+                default=INF)
+        if self.g.get(node, INF) != self.rhs.get(node, INF):
+            self._buffer.push(node, self.calc_key(node))
+            if self.observer is not None:
+                self.observer.on_push(node, self._buffer.priority_of(node), len(self._buffer), node in self.g)
+        else:
+            self._buffer.remove(node)
+
+    def _invalidate(self, nodes):
+        """g = inf for `nodes` and all their descendants in the search tree,
+        then recompute the rhs of everything that depended on them"""
+        g, parent = self.g, self.parent
+        subtree = set()
+        stack = [node for node in nodes if node in g]
+        while stack:
+            node = stack.pop()
+            if node in subtree:
+                continue
+            subtree.add(node)
+            stack.extend(child for child in self.graph._children_of(node) if parent.get(child) == node)
+        for node in subtree:
+            g[node] = INF
+        for node in subtree:
+            self.update_node(node)
+            self._update_children(node)
+
+    def _update_children(self, node):
+        observer = self.observer
+        if observer is None:
+            for child in self.graph._children_of(node):
+                self.update_node(child)
+            return
+        rhs = self.rhs
+        for child, cost_edge in self.graph._children_with_cost_of(node):
+            rhs_old = rhs.get(child, INF)
+            self.update_node(child)
+            observer.on_relax(node, child, cost_edge, rhs.get(child, INF) < rhs_old)
+
+    def _compute_shortest_path(self):
+        buffer = self._buffer
+        g, rhs = self.g, self.rhs
+        goal = self.goal
+        while len(buffer) > 0 and (
+                buffer.min_priority() < self.calc_key(goal) or g.get(goal, INF) != rhs.get(goal, INF)):
+            self.iter += 1
+            node = buffer.pop()
+            if self.observer is not None:
+                self.observer.on_expand(node, min(g.get(node, INF), rhs.get(node, INF)))
+            if g.get(node, INF) > rhs[node]: # over-consistent ==> settle it
+                g[node] = rhs[node]
+                if node != self.start:
+                    self.parent[node] = min(((p, g.get(p, INF) + c) for p, c in self.graph._parents_with_cost_of(node)),
+                                            key=lambda pair: pair[1])[0]
+                self._update_children(node)
+            else: # under-consistent ==> invalidate it (and its subtree) and let it be re-derived
+                self._invalidate([node])
+
+    def solve(self, validate_heuristics=False):
+        """(re)plan, taking into account every edge change since the last call
+
+        Returns:
+            the (forward) path sequence (tuple) and the total path cost (float),
+            or (None, None) if the goal is unreachable
+
+        (`validate_heuristics` is accepted for the same call signature as `Astar.solve`)
+        """
+        self.iter = 0
+        nodes_to_update, self._nodes_to_update = self._nodes_to_update, set()
+        nodes_to_invalidate, self._nodes_to_invalidate = self._nodes_to_invalidate, set()
+        with phase(self.observer, "update"):
+            self._invalidate(nodes_to_invalidate)
+            for node in nodes_to_update:
+                self.update_node(node)
+        with phase(self.observer, "search"):
+            self._compute_shortest_path()
+
+        cost = self.g.get(self.goal, INF)
+        if cost == INF:
+            return None, None
+        with phase(self.observer, "backtrack"):
+            return self._backtrack(cost)
+
+    def _backtrack(self, cost):
+        # follow the search tree back to the start
+        # (not the best parent by g, with zero-cost edges two nodes may be each other's best parent)
+        backward_path = [self.goal]
+        while backward_path[-1] != self.start:
+            backward_path.append(self.parent[backward_path[-1]])
+            assert len(backward_path) <= len(self.g), "the search tree contains a cycle"
+        return tuple(backward_path[::-1]), cost
+
+
+if __name__ == "__main__":
+    from graph_examples import german_city_network_acc_de_wikipedia, path_cost
+    from numpy.testing import assert_almost_equal
+
+    # (its straight-line heuristic is consistent)
+    tcase = german_city_network_acc_de_wikipedia()
+    tcase.verify(LPAstar)
+
+    planner = LPAstar(tcase.start, tcase.goal, tcase.graph)
+    print(planner.solve(), f"after {planner.iter} expansions")
+
+    # a traffic jam near Frankfurt
+    tcase.graph.set_cost_edge("Frankfurt", "WB", 216.)
+    soln_path, soln_cost = planner.solve()
+    print((soln_path, soln_cost), f"after {planner.iter} expansions")
+    assert soln_path == ("SB", "KL", "LH", "WB")
+    assert_almost_equal(soln_cost, 306.0)
+
+    # ... has cleared up
+    tcase.graph.set_cost_edge("Frankfurt", "WB", 116.)
+    soln_path, soln_cost = planner.solve()
+    print((soln_path, soln_cost), f"after {planner.iter} expansions")
+    assert soln_path in tcase.tuple_global_soln
+    assert_almost_equal(soln_cost, tcase.true_min_cost)
+    planner.close()
+
+    # zero-cost edges (a zero-cost cycle A <-> B, where both nodes tie)
+    graph = directed_graph_weighted("zero-cost cycle")
+    graph.add_nodes_from(["S", "A", "B", "G"])
+    graph.add_edges_from([("S", "A", 1.), ("S", "B", 1.), ("A", "B", 0.), ("B", "A", 0.),
+                          ("A", "G", 1.), ("B", "G", 1.)])
+    planner = LPAstar("S", "G", graph)
+    soln_path, soln_cost = planner.solve()
+    assert soln_path[0] == "S" and soln_path[-1] == "G" and soln_cost == 2.0
+    assert_almost_equal(path_cost(graph, soln_path), soln_cost)
+    graph.set_cost_edge("S", "A", 5.)
+    graph.set_cost_edge("B", "G", 7.)
+    soln_path, soln_cost = planner.solve()
+    assert soln_path == ("S", "B", "A", "G") and soln_cost == 2.0
+    planner.close()
@@ -0,0 +1,192 @@
+import heapq
+from itertools import count, islice
+from graph_rep import directed_graph_weighted, frozen_graph
+from algo_dp import shortest_path_tree
+from instrumentation import phase
+
+__all__ = ["KShortestPaths"]
+
+INF = float("inf")
+
+class KShortestPaths:
+    def __init__(self, start: str, goal: str, graph: directed_graph_weighted, observer=None):
+        """the loopless paths from start to goal in increasing cost order (Yen, with Lawler's pruning)
+
+        Args:
+            start (str):
+            goal (str):
+            graph (directed_graph_weighted or frozen_graph): a mutable graph is frozen first
+                (once, later changes are not reflected)
+            observer (search_observer, optional): see `Astar`,
+                the expansions of the spur searches are reported (g is counted from the spur node)
+
+        Each path is derived from an earlier one: it shares a prefix (the root) with it,
+        then deviates at some node (the spur node) along the cheapest detour (the spur path)
+        that avoids the root nodes and the edges already taken there by the paths found so far.
+
+        What is shared instead of re-searching a modified copy of the graph:
+        * the cost-to-go of every node is computed once (a reverse Dijkstra from the goal),
+          it is the exact heuristic for the spur searches (A*), which only have to skip
+          the blocked nodes/ edges, since blocking can only increase the cost-to-go
+        * the cheapest unblocked edge out of the spur node (counting the cost-to-go of its end)
+          followed by the tree path is a lower bound, so if that tree path avoids the root,
+          it IS the spur path (no search at all)
+        * a path only spurs from the nodes at or after its own deviation point,
+          the detours before it have been generated from its parent path already
+        """
+        assert isinstance(graph, (directed_graph_weighted, frozen_graph))
+        assert graph.has_node(start), f"The start node {start} cannot found in the graph!"
+        assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
+        self.start = start
+        self.goal = goal
+        self.graph = graph if isinstance(graph, frozen_graph) else graph.freeze()
+        self._start = self.graph.index_of(start)
+        self._goal = self.graph.index_of(goal)
+        self.observer = observer
+
+        with phase(observer, "reverse tree"):
+            # cost-to-go and the next node towards the goal (-1 for the goal itself)
+            self._cost_to_go, self._next = shortest_path_tree(self.graph, self._goal, reverse=True)
+
+        self.iter = 0 # expansions of the spur searches
+        self.n_spur_searches = 0
+        self.n_tree_shortcuts = 0 # spur paths taken straight from the reverse tree
+
+    def paths(self):
+        """a generator of (path, cost), the path a tuple of node names, in increasing cost order
+        (ties in no particular order), until all loopless paths are exhausted"""
+        name_of = self.graph.name_of
+        if self._start not in self._cost_to_go:
+            return
+        # the found paths (as node index tuples), the cost of each of their prefixes
+        # and the index of their spur node
+        found = [self._tree_path(self._start)]
+        prefix_costs = [self._prefix_costs(found[0])]
+        deviation = [0]
+        candidates = [] # heap of (cost, seq, path, spur index)
+        seen = {found[0]}
+        seq = count()
+        while True:
+            path, costs = found[-1], prefix_costs[-1]
+            yield tuple(name_of(n) for n in path), costs[-1]
+
+            with phase(self.observer, "spur searches"):
+                for i in range(deviation[-1], len(path) - 1):
+                    root = path[:i + 1]
+                    blocked_edges = {other[i + 1] for other in found if other[:i + 1] == root}
+                    spur, spur_cost = self._spur_path(path[i], set(root[:-1]), blocked_edges)
+                    if spur is None:
+                        continue
+                    candidate = root[:-1] + spur
+                    if candidate not in seen:
+                        seen.add(candidate)
+                        heapq.heappush(candidates, (costs[i] + spur_cost, next(seq), candidate, i))
+            if not candidates:
+                return
+            _, _, candidate, i = heapq.heappop(candidates)
+            found.append(candidate)
+            prefix_costs.append(self._prefix_costs(candidate))
+            deviation.append(i)
+
+    def solve(self, k: int):
+        """the (up to) k cheapest loopless paths as a list of (path, cost)"""
+        return list(islice(self.paths(), k))
+
+    def _edge_cost(self, u, v):
+        g = self.graph
+        a, b = g.offsets[u], g.offsets[u + 1]
+        row = g.targets[a:b].tolist()
+        return float(g.cost_edge[a + row.index(v)])
+
+    def _prefix_costs(self, path):
+        costs = [0.0]
+        for u, v in zip(path, path[1:]):
+            costs.append(costs[-1] + self._edge_cost(u, v))
+        return costs
+
+    def _tree_path(self, node):
+        path = [node]
+        while path[-1] != self._goal:
+            path.append(self._next[path[-1]])
+        return tuple(path)
+
+    def _spur_path(self, spur, blocked_nodes, blocked_edges):
+        """the cheapest path from spur to the goal avoiding blocked_nodes, and the edges
+        from spur to blocked_edges, as a tuple of node indices and its cost ((None, None) if there is none)"""
+        h = self._cost_to_go
+        offsets, targets, cost_edge = self.graph.offsets, self.graph.targets, self.graph.cost_edge
+        # the best first edge, followed by the tree path, is a lower bound of any spur path,
+        # so it is the spur path if it avoids the blocked nodes (and the spur node itself)
+        a, b = offsets[spur], offsets[spur + 1]
+        best, best_cost = None, INF
+        for v, c in zip(targets[a:b].tolist(), cost_edge[a:b].tolist()):
+            if v in h and v not in blocked_edges and v not in blocked_nodes and c + h[v] < best_cost:
+                best, best_cost = v, c + h[v]
+        if best is None:
+            return None, None
+        path = self._tree_path(best)
+        if spur not in path and blocked_nodes.isdisjoint(path):
+            self.n_tree_shortcuts += 1
+            return (spur,) + path, best_cost
+
+        # A* with the exact (unblocked) cost-to-go, which is consistent
+        self.n_spur_searches += 1
+        observer = self.observer
+        g = {spur: 0.0}
+        parent = {spur: None}
+        closed = set()
+        heap = [(h[spur], spur)]
+        while heap:
+            _, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            closed.add(u)
+            self.iter += 1
+            if observer is not None:
+                observer.on_expand(u, g[u])
+            if u == self._goal:
+                path = [u]
+                while parent[path[-1]] is not None:
+                    path.append(parent[path[-1]])
+                return tuple(reversed(path)), g[u]
+            a, b = offsets[u], offsets[u + 1]
+            for v, c in zip(targets[a:b].tolist(), cost_edge[a:b].tolist()):
+                if v in blocked_nodes or v not in h or (u == spur and v in blocked_edges):
+                    continue
+                g_new = g[u] + c
+                is_improved = g_new < g.get(v, INF)
+                if observer is not None:
+                    observer.on_relax(u, v, c, is_improved)
+                if is_improved:
+                    g[v] = g_new
+                    parent[v] = u
+                    heapq.heappush(heap, (g_new + h[v], v))
+        return None, None
+
+
+if __name__ == "__main__":
+    import time
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from graph_examples import longway_round
+    from bench.generators import road_like_graph
+
+    for tcase in (german_city_network_acc_de_wikipedia(), longway_round()):
+        solver = KShortestPaths(tcase.start, tcase.goal, tcase.graph)
+        print(f"{tcase.graph.name}:")
+        for path, cost in solver.paths():
+            print(f"  {cost:8.1f}  {' -> '.join(path)}")
+        (path, cost), = solver.solve(1)
+        assert path in tcase.tuple_global_soln and cost == tcase.true_min_cost
+
+    # the lazy stream on a bigger graph
+    sgraph = road_like_graph(40000, seed=2)
+    solver = KShortestPaths("0", str(sgraph.n_nodes - 1), sgraph.graph)
+    t0 = time.perf_counter()
+    costs = []
+    for path, cost in islice(solver.paths(), 10):
+        assert len(set(path)) == len(path) # loopless
+        costs.append(cost)
+    elapsed = time.perf_counter() - t0
+    assert costs == sorted(costs)
+    print(f"10 paths on {sgraph}: {costs[0]:.2f} ... {costs[-1]:.2f} in {elapsed:.2f} s "
+          f"({solver.n_spur_searches} spur searches, {solver.n_tree_shortcuts} tree shortcuts)")
@@ -0,0 +1,190 @@
+import warnings
+from graph_rep import directed_graph_weighted, frozen_graph, implicit_graph
+from heuristics import resolve_heuristic, HeuristicWarning
+from instrumentation import phase
+
+__all__ = ["IDAstar"]
+
+INF = float("inf")
+
+class IDAstar:
+    def __init__(self, start: str, goal: str, graph, heuristic=None, observer=None, threshold=0.0):
+        """Iterative-deepening A* (Korf), i.e. a series of depth-first searches bounded by f = g + h
+
+        Args:
+            start, goal, graph, heuristic, observer: see `Astar`
+                (the heuristic should be admissible for the solution to be optimal)
+            threshold (float): the initial f bound, it may be any lower bound of the
+                optimal cost (e.g. min f over the OPEN buffer of an interrupted `Astar`),
+                the larger the fewer iterations
+
+        Memory: only the current path (with an iterator over the remaining children of
+        each of its nodes) is kept, i.e. O(depth), no matter how many nodes are generated.
+        The price is re-expanding nodes, once per iteration and once per path reaching them
+        (only cycles along the current path are cut off).
+        Every iteration raises the threshold to the smallest f that exceeded it,
+        so with many distinct (real-valued) f values there are many iterations.
+        """
+        assert isinstance(graph, (directed_graph_weighted, frozen_graph, implicit_graph))
+        assert graph.has_node(start), f"The start node {start} cannot found in the graph!"
+        assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
+        self.start = start
+        self.goal = goal
+        self.graph = graph # just an alias
+        self._start = graph._key_of(start)
+        self._goal = graph._key_of(goal)
+        self._heuristic = resolve_heuristic(heuristic, graph, goal)
+        self.observer = observer
+        self.threshold = threshold
+
+        self._path = None # the node keys of the solution
+        self._cost = None
+        self.n_iterations = 0 # (depth-first searches)
+        self.iter = 0 # number of expansions, relevant for academic purpose
+
+    def solve(self, validate_heuristics=True):
+        """see `Astar.solve`"""
+        observer = self.observer
+        with phase(observer, "search"):
+            is_found = self._search(observer)
+        if not is_found:
+            return None, None
+        with phase(observer, "backtrack"):
+            return self._backtrack(validate_heuristics)
+
+    def _search(self, observer):
+        h = self._heuristic
+        threshold = max(self.threshold, h(self._start))
+        while True:
+            self.n_iterations += 1
+            threshold = self._bounded_dfs(threshold, observer)
+            if self._path is not None:
+                return True
+            if threshold == INF: # (nothing pruned ==> everything reachable was searched)
+                return False
+            self.threshold = threshold
+
+    def _bounded_dfs(self, threshold, observer):
+        """a depth-first search for the goal among the nodes with f <= threshold,
+        returns the smallest f beyond the threshold (or sets `self._path`)"""
+        h = self._heuristic
+        children_of = self.graph._children_with_cost_of
+        goal = self._goal
+        next_threshold = INF
+
+        path = [self._start]
+        g_path = [0.0]
+        on_path = {self._start}
+        stack = [iter(children_of(self._start))] # the unexamined children of every node on the path
+        self.iter += 1
+        if observer is not None:
+            observer.on_expand(self._start, 0.0)
+        if self._start == goal:
+            self._path, self._cost = path, 0.0
+            return threshold
+        while stack:
+            node = path[-1]
+            for child, cost_edge in stack[-1]:
+                if child in on_path:
+                    continue
+                g_child = g_path[-1] + cost_edge
+                f_child = g_child + h(child)
+                if observer is not None:
+                    observer.on_relax(node, child, cost_edge, f_child <= threshold)
+                if f_child > threshold:
+                    next_threshold = min(next_threshold, f_child)
+                    continue
+                # descend
+                path.append(child)
+                g_path.append(g_child)
+                on_path.add(child)
+                self.iter += 1
+                if observer is not None:
+                    observer.on_expand(child, g_child)
+                if child == goal:
+                    self._path, self._cost = path, g_child
+                    return threshold
+                stack.append(iter(children_of(child)))
+                break
+            else:
+                # all children examined ==> backtrack
+                stack.pop()
+                on_path.discard(path.pop())
+                g_path.pop()
+        return next_threshold
+
+    def _backtrack(self, validate_heuristics):
+        if validate_heuristics:
+            # (the same check as `Astar`, along the path)
+            g_path = [0.0]
+            for parent, child in zip(self._path, self._path[1:]):
+                g_path.append(g_path[-1] + dict(self.graph._children_with_cost_of(parent))[child])
+            for node, g in zip(self._path, g_path):
+                rem_cost_soln = self._cost - g
+                rem_cost_heuristic = self._heuristic(node)
+                if rem_cost_soln < rem_cost_heuristic - 1e-9 * (1.0 + abs(rem_cost_soln)):
+                    warnTxt  = f"your heuristic value for node {self.graph._name_of(node)} is unadmissible, \n"
+                    warnTxt += f"i.e. cost-to-go <= {rem_cost_soln} (from the soln) < {rem_cost_heuristic} (from the heuristics)\n"
+                    warnTxt +=  "==> This means the solution might be sub-optimal."
+                    warnings.warn(warnTxt, HeuristicWarning, stacklevel=3)
+        name_of = self.graph._name_of
+        return tuple(name_of(n) for n in self._path), self._cost
+
+
+if __name__ == "__main__":
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from graph_examples import longway_round
+    from graph_rep import tuple_codec
+    from algo_forward import Astar
+
+    for tcase in (german_city_network_acc_de_wikipedia(), longway_round()):
+        tcase.verify(IDAstar)
+        tcase.graph = tcase.graph.freeze()
+        tcase.verify(IDAstar)
+
+    # an 8-connected grid of 10^12 cells, never materialized
+    side = 10**6
+    moves = [(dx, dy, (dx * dx + dy * dy) ** 0.5) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+    def successors(cell):
+        x, y = cell
+        for dx, dy, cost in moves:
+            u, v = x + dx, y + dy
+            if 0 <= u < side and 0 <= v < side and not (u == 500 and 400 <= v <= 600):
+                yield (u, v), cost
+    def octile(cell, goal=(520, 510)):
+        dx, dy = abs(cell[0] - goal[0]), abs(cell[1] - goal[1])
+        return max(dx, dy) + (2 ** 0.5 - 1) * min(dx, dy)
+    codec = tuple_codec((side, side))
+    lattice = implicit_graph("8-connected grid", successors, heuristic=octile,
+                             encode=codec.encode, decode=codec.decode)
+    solver = Astar((480, 500), (520, 510), lattice)
+    path, cost = solver.solve()
+    print(f"grid: cost {cost:.3f} with {len(solver.tree_parent)} nodes in memory ({solver.iter} expansions)")
+
+    # the 8-puzzle (a tree-like state space, where IDA* shines)
+    def slide(board):
+        blank = board.index(0)
+        row, col = divmod(blank, 3)
+        for r, c in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if 0 <= r < 3 and 0 <= c < 3:
+                child = list(board)
+                child[blank], child[3 * r + c] = child[3 * r + c], 0
+                yield tuple(child), 1.0
+    def manhattan(board):
+        return float(sum(abs(i // 3 - (t - 1) // 3) + abs(i % 3 - (t - 1) % 3)
+                         for i, t in enumerate(board) if t))
+    codec = tuple_codec((9,) * 9)
+    puzzle = implicit_graph("8-puzzle", slide, heuristic=manhattan, encode=codec.encode, decode=codec.decode)
+    start, goal = (8, 6, 7, 2, 5, 4, 3, 0, 1), (1, 2, 3, 4, 5, 6, 7, 8, 0)
+    solver = Astar(start, goal, puzzle)
+    path, cost = solver.solve()
+    print(f"8-puzzle, A*: {cost:.0f} moves with {len(solver.tree_parent)} nodes in memory")
+    solver = IDAstar(start, goal, puzzle)
+    assert solver.solve()[1] == cost
+    print(f"8-puzzle, IDA*: {solver.iter} expansions in {solver.n_iterations} iterations")
+
+    # with a memory cap, A* falls back to IDA* (starting from the bound it had found)
+    solver = Astar(start, goal, puzzle, max_nodes=1000)
+    path_capped, cost_capped = solver.solve()
+    assert cost_capped == cost and path_capped[0] == start and path_capped[-1] == goal
+    print(f"8-puzzle, A* capped at 1000 nodes: {cost_capped:.0f} moves ({solver.iter} expansions)")
@@ -0,0 +1,159 @@
+from itertools import islice
+from graph_rep import directed_graph, directed_graph_weighted
+from heuristics import resolve_heuristic_many
+from algo_forward import Astar
+from algo_traversal import BFS
+from instrumentation import phase
+
+__all__ = ["MultiGoalAstar", "MultiGoalBFS"]
+
+class MultiGoalAstar(Astar):
+    def __init__(self, start: str, goals, graph: directed_graph_weighted, heuristic=None, observer=None):
+        """A* towards the nearest of several goals (e.g. the nearest of hundreds of depots),
+        in one search instead of one per goal
+
+        Args:
+            start (str):
+            goals (iterable of node names): the targets, at least one
+            graph, observer: see `Astar`
+            heuristic (callable or goal_heuristic, optional):
+                a `goal_heuristic` is bound to all the goals at once (see `goal_heuristic.bind_many`,
+                e.g. `landmark_heuristic` takes the minimum over the goals in one numpy call),
+                a callable should bound the cost to the nearest goal,
+                by default h = 0 (i.e. Dijkstra), since the node weights refer to a single goal
+
+        The search stops at the first goal popped from the OPEN buffer. With a consistent heuristic
+        it is the nearest one (h = 0 at a goal, so the goals come out in increasing cost order),
+        and resuming the search (`targets()`) gives the next nearest ones.
+        """
+        goals = tuple(goals)
+        assert len(goals) > 0, "There should be at least one goal!"
+        for goal in goals:
+            assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
+        super().__init__(start, goals[0], graph, resolve_heuristic_many(heuristic, graph, goals), observer)
+        self.goal = goals
+        self._goals = {graph._key_of(goal) for goal in goals}
+        self._n_targets = len(self._goals)
+        self.reached = [] # the goals settled so far, as (goal, path, cost)
+
+    def targets(self, validate_heuristics=False):
+        """a generator of (goal, path, cost), the nearest goal first, until every reachable goal is
+        settled (the search resumes where the previous call stopped)"""
+        observer = self.observer
+        while len(self.reached) < self._n_targets:
+            if self._reached is not None:
+                # (the last goal found has not been expanded yet, paths may go through it)
+                self._goals.discard(self._reached)
+                with phase(observer, "search"):
+                    self._expand_pending(observer)
+            if len(self._buffer) == 0:
+                return
+            with phase(observer, "search"):
+                is_found = self._search(observer)
+            if not is_found:
+                return
+            with phase(observer, "backtrack"):
+                path, cost = self._backtrack(validate_heuristics, self._reached)
+            self.reached.append((path[-1], path, cost))
+            yield self.reached[-1]
+
+    def solve(self, k=1, validate_heuristics=True):
+        """
+        Returns:
+            the (up to) k nearest goals as a list of (goal, path, cost) in increasing cost order,
+            fewer if fewer are reachable (an empty list if none is).
+            A repeated call returns the k next ones.
+        """
+        return list(islice(self.targets(validate_heuristics), k))
+
+
+class MultiGoalBFS(BFS):
+    def __init__(self, start: str, goals, graph: directed_graph, observer=None):
+        """`BFS` towards the nearest of several goals (the fewest edges), in one traversal
+
+        Args:
+            start (str):
+            goals (iterable of node names): the targets, at least one
+            graph, observer: see `BFS`
+        """
+        goals = tuple(goals)
+        assert len(goals) > 0, "There should be at least one goal!"
+        for goal in goals:
+            assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
+        super().__init__(start, goals[0], graph, observer)
+        self.goal = goals
+        self._goals = {graph._key_of(goal) for goal in goals}
+        self._n_targets = len(self._goals)
+        self.reached = [] # the goals reached so far, as (goal, path, number of edges)
+
+    def targets(self):
+        """a generator of (goal, path, number of edges), the nearest goal first,
+        until every reachable goal is reached (resumable, see `MultiGoalAstar.targets`)"""
+        while len(self.reached) < self._n_targets:
+            if self._reached is not None:
+                self._goals.discard(self._reached)
+                with phase(self.observer, "search"):
+                    self._expand_pending()
+            with phase(self.observer, "search"):
+                is_found = self._search()
+            if not is_found:
+                return
+            with phase(self.observer, "backtrack"):
+                path = self._backtrack(self._reached)
+            self.reached.append((path[-1], path, len(path) - 1))
+            yield self.reached[-1]
+
+    def solve(self, k=1):
+        """the (up to) k nearest goals as a list of (goal, path, number of edges), see `MultiGoalAstar.solve`"""
+        return list(islice(self.targets(), k))
+
+
+if __name__ == "__main__":
+    import time
+    import random
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from algo_dp import shortest_path_tree
+    from landmarks import landmark_heuristic
+    from bench.generators import road_like_graph, scale_free_graph
+
+    tcase = german_city_network_acc_de_wikipedia()
+    solver = MultiGoalAstar(tcase.start, ["Frankfurt", "KA", tcase.goal], tcase.graph)
+    for goal, path, cost in solver.targets():
+        print(f"  {goal}: {cost:6.1f}  {' -> '.join(path)}")
+    assert [goal for goal, _, _ in solver.reached] == ["KA", "Frankfurt", tcase.goal]
+    assert solver.reached[-1][1] in tcase.tuple_global_soln and solver.reached[-1][2] == tcase.true_min_cost
+
+    # the nearest of 100 "charging stations" vs one search per station
+    sgraph = road_like_graph(5000, seed=4)
+    graph = sgraph.graph
+    rng = random.Random(0)
+    stations = [str(v) for v in rng.sample(range(graph.n_nodes), 100)]
+    lm = landmark_heuristic(graph, n_landmarks=8)
+    for start in ("0", "1234", "3333"):
+        dist, _ = shortest_path_tree(graph, graph.index_of(start))
+        by_cost = sorted((dist[graph.index_of(s)], s) for s in stations if graph.index_of(s) in dist)
+
+        t0 = time.perf_counter()
+        solver = MultiGoalAstar(start, stations, graph, heuristic=lm)
+        nearest = solver.solve(k=5)
+        elapsed_multi = time.perf_counter() - t0
+        assert [round(c, 6) for _, _, c in nearest] == [round(c, 6) for c, _ in by_cost[:5]]
+        for goal, path, cost in nearest:
+            assert path[0] == start and path[-1] == goal
+
+        t0 = time.perf_counter()
+        best = min(Astar(start, s, graph, heuristic=lm).solve(validate_heuristics=False)[1] for s in stations)
+        elapsed_single = time.perf_counter() - t0
+        assert abs(best - nearest[0][2]) < 1e-9 * best
+        print(f"{start}: the 5 nearest of {len(stations)} stations at {nearest[0][2]:.1f} ... {nearest[-1][2]:.1f} "
+              f"in {elapsed_multi * 1e3:.1f} ms ({solver.iter} expansions), "
+              f"{len(stations)} single-goal searches {elapsed_single * 1e3:.0f} ms")
+
+    # fewest hops
+    sgraph = scale_free_graph(20000, seed=1)
+    targets = [str(v) for v in rng.sample(range(sgraph.n_nodes), 50)]
+    solver = MultiGoalBFS("7", targets, sgraph.graph)
+    nearest = solver.solve(k=3)
+    hops_min = min(len(BFS("7", t, sgraph.graph).solve()) - 1 for t in targets)
+    assert nearest[0][2] == hops_min and [h for _, _, h in nearest] == sorted(h for _, _, h in nearest)
+    print(f"BFS: the 3 nearest of {len(targets)} targets at {[h for _, _, h in nearest]} hops")
@@ -1,99 +1,493 @@
 from collections import deque
-from graph_rep import directed_graph # for the tree
+import numpy as np
+from graph_rep import directed_graph, frozen_graph, implicit_graph # for the tree
+from instrumentation import phase
+
+
+class _visit_table_dict:
+    """node key --> parent key, holding the reached nodes only"""
+    def __init__(self, start):
+        self._parent = {start: None}
+
+    def __contains__(self, node):
+        return node in self._parent
+
+    def __len__(self):
+        return len(self._parent)
+
+    def parent_of(self, node):
+        return self._parent[node]
+
+    def discover_children(self, graph, node):
+        """mark the unreached children of `node` as reached (with `node` as their parent)
+        and return them"""
+        parent = self._parent
+        new_nodes = [child for child in graph._children_of(node) if child not in parent]
+        for child in new_nodes:
+            parent[child] = node
+        return new_nodes
+
+    def items(self):
+        """(node, parent) of every reached node"""
+        return self._parent.items()
+
+    def restore(self, items):
+        self._parent = dict(items)
+
+
+class _visit_table_array:
+    """the same as `_visit_table_dict` but backed by an integer array (for a `frozen_graph`)
+
+    entry i holds
+    * 0 --- node i is unreached
+    * -1 --- node i is the root
+    * p+1 --- node i was reached from node p
+
+    `np.zeros` is backed by calloc, so the memory pages are only
+    touched (and thus physically allocated) for the reached nodes.
+    """
+    def __init__(self, graph: frozen_graph, start: int):
+        self._parent = np.zeros(graph.n_nodes, dtype=np.int64)
+        self._parent[start] = -1
+        self._n_reached = 1
+
+    def __contains__(self, node):
+        return self._parent[node] != 0
+
+    def __len__(self):
+        return self._n_reached
+
+    def parent_of(self, node):
+        p = int(self._parent[node])
+        assert p != 0, f"node {node} is unreached"
+        return None if p == -1 else p - 1
+
+    def discover_children(self, graph: frozen_graph, node):
+        children = graph.targets[graph.offsets[node]:graph.offsets[node + 1]]
+        new_nodes = children[self._parent[children] == 0]
+        self._parent[new_nodes] = node + 1
+        self._n_reached += len(new_nodes)
+        return new_nodes.tolist()
+
+    def items(self):
+        nodes = np.flatnonzero(self._parent)
+        parents = self._parent[nodes] - 1
+        return ((node, None if p < 0 else p) for node, p in zip(nodes.tolist(), parents.tolist()))
+
+    def restore(self, items):
+        self._parent[:] = 0
+        self._n_reached = 0
+        for node, parent in items:
+            self._parent[node] = -1 if parent is None else parent + 1
+            self._n_reached += 1
+
+
+def _gather_rows(offsets, targets, rows, row_start=None):
+    """the entries of the given CSR rows, all at once
+
+    Returns:
+        (row of each entry, the entry) as two aligned arrays
+        (starting at `row_start` instead of the beginning of every row, if given)
+    """
+    start = offsets[rows] if row_start is None else row_start
+    count = offsets[rows + 1] - start
+    total = int(count.sum())
+    # position of entry k = start of its row + its rank within the row
+    first = np.cumsum(count) - count
+    idx = np.repeat(start - first, count) + np.arange(total, dtype=np.int64)
+    return np.repeat(rows, count), targets[idx]
+
+
+def bfs_tree(graph: frozen_graph, source: int, goal=None, direction_optimizing=True,
+             alpha=4.0, beta=24.0, max_rounds=8):
+    """level-synchronous BFS, expanding a whole frontier at once by array gathers over the CSR layout
+
+    Args:
+        graph (frozen_graph):
+        source (int): the node index to start from
+        goal (int, optional): stop after the level reaching this node index
+        direction_optimizing (bool): whether to switch to bottom-up steps (see below),
+            otherwise every level is expanded top-down
+        alpha, beta (float): the switching thresholds (Beamer, Asanovic & Patterson)
+            * top-down --> bottom-up once the edges out of the frontier exceed
+              1/alpha of the edges into the unreached nodes
+              (and the frontier holds at least 1/beta of the nodes)
+            * bottom-up --> top-down once the frontier shrinks below 1/beta of the nodes
+            (alpha is lower than the paper's 14, since a vectorized bottom-up step
+            can only stop early for part of its nodes, see `max_rounds`)
+        max_rounds (int): a bottom-up step checks the in-neighbours of the unreached nodes
+            one at a time for up to this many rounds (so most nodes stop at their first
+            hit in the frontier), the rest of the in-edges are then checked all at once
+
+    Returns:
+        hops (int64 array): the number of edges from the source, -1 if unreached
+        parent (int64 array): the predecessor in the BFS tree, -1 for the source and the unreached
+
+    A top-down step examines the out-edges of the frontier, a bottom-up step
+    the in-edges of the unreached nodes (via the cached `graph.reverse()`).
+    The latter is much cheaper for the few huge middle levels of a small-world graph.
+    """
+    n_nodes = graph.n_nodes
+    offsets, targets = graph.offsets, graph.targets
+    out_degree = np.diff(offsets)
+    hops = np.full(n_nodes, -1, dtype=np.int64)
+    parent = np.full(n_nodes, -1, dtype=np.int64)
+    hops[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+
+    unreached = None # (only kept up to date during the bottom-up steps)
+    edges_unreached = graph.n_edges - int(out_degree[source])
+    is_bottom_up = False
+    level = 0
+    while len(frontier) and (goal is None or hops[goal] < 0):
+        level += 1
+        if direction_optimizing:
+            if not is_bottom_up:
+                edges_frontier = int(out_degree[frontier].sum())
+                is_bottom_up = edges_frontier > edges_unreached / alpha and len(frontier) >= n_nodes / beta
+                if is_bottom_up:
+                    unreached = np.flatnonzero(hops < 0)
+            elif len(frontier) < n_nodes / beta:
+                is_bottom_up = False
+        if is_bottom_up:
+            frontier, unreached = _bottom_up_step(graph.reverse(), frontier, unreached,
+                                                  hops, parent, level, max_rounds)
+        else:
+            frontier = _top_down_step(offsets, targets, frontier, hops, parent, level)
+        edges_unreached -= int(out_degree[frontier].sum())
+    return hops, parent
+
+
+def _top_down_step(offsets, targets, frontier, hops, parent, level):
+    start = offsets[frontier]
+    count = offsets[frontier + 1] - start
+    end = np.cumsum(count)
+    # (the same as `_gather_rows`, but the rows are only looked up for the new children)
+    idx = np.repeat(start - end + count, count) + np.arange(int(end[-1]), dtype=np.int64)
+    children = targets[idx]
+    is_new = np.flatnonzero(hops[children] < 0)
+    children = children[is_new]
+    rows = frontier[np.searchsorted(end, is_new, side="right")]
+    # a child reached from several frontier nodes keeps the last one written,
+    # i.e. it is kept exactly once (the edges are unique)
+    parent[children] = rows
+    children = children[parent[children] == rows]
+    hops[children] = level
+    return children
+
+
+def _bottom_up_step(reverse: frozen_graph, frontier, unreached, hops, parent, level, max_rounds):
+    rev_offsets, rev_targets = reverse.offsets, reverse.targets
+    in_frontier = np.zeros(len(hops), dtype=bool)
+    in_frontier[frontier] = True
+
+    # round k checks the k-th in-neighbour of every node still unreached
+    remaining = unreached[rev_offsets[unreached + 1] > rev_offsets[unreached]]
+    pos = rev_offsets[remaining]
+    found = []
+    for _ in range(max_rounds):
+        if len(remaining) == 0:
+            break
+        candidates = rev_targets[pos]
+        hit = in_frontier[candidates]
+        parent[remaining[hit]] = candidates[hit]
+        found.append(remaining[hit])
+        pos += 1
+        keep = ~hit & (pos < rev_offsets[remaining + 1])
+        remaining, pos = remaining[keep], pos[keep]
+    if len(remaining):
+        # the remaining in-edges all at once
+        rows, candidates = _gather_rows(rev_offsets, rev_targets, remaining, row_start=pos)
+        hit = in_frontier[candidates]
+        rows, candidates = rows[hit], candidates[hit]
+        parent[rows] = candidates
+        found.append(rows[parent[rows] == candidates])
+
+    new_frontier = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+    hops[new_frontier] = level
+    return new_frontier, unreached[hops[unreached] < 0]
+
 
 class BFS:
-    def __init__(self, start: str, goal: str, graph: directed_graph):
+    def __init__(self, start: str, goal: str, graph: directed_graph, observer=None):
         """Breadth-first-search
 
         Args:
             start (str): 
             goal (str): 
-            adjacency_tab (directed_graph): 
+            graph (directed_graph, frozen_graph or implicit_graph): 
+                for a frozen graph, the traversal runs on the integer node indices
+                and only maps back to node names when assembling the path
+            observer (search_observer, optional): see `Astar`
+                (there are no costs here, so g, the edge costs and the priorities are None)
 
         state of a node
-        * 0 --- unopened/ unvisited
-        * 1 --- open (i.e. the node is in the buffer)
-        * (the state of being processed is not included here, as it is "atomic")
-        * 2 --- visited
+        * unopened/ unvisited --- not in the visit table
+        * open (i.e. the node is in the buffer) or visited --- in the visit table,
+          which also records its parent
+
+        Remarks:
+        * there is no per-node initialization, only the reached nodes
+          are ever touched (see `_visit_table_dict` and `_visit_table_array`),
+          so a traversal runs in O(V+E) of the reached subgraph.
+        * a node enters the buffer at most once (when it is discovered)
         """
-        node_set = graph.list_all_nodes()
-        assert isinstance(graph, directed_graph)
-        assert start in node_set, f"The start node {start} cannot found in the graph!"
-        assert goal in  node_set, f"The goal node {goal} cannot found in the graph!"
+        assert isinstance(graph, (directed_graph, frozen_graph, implicit_graph))
+        assert graph.has_node(start), f"The start node {start} cannot found in the graph!"
+        assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
         self.start = start
         self.goal = goal
         
+        self.graph = graph # just an alias
+        self._start = graph._key_of(start)
+        self._goal = graph._key_of(goal)
+        self._goals = {self._goal} # (the nodes ending the search, see `MultiGoalBFS`)
+        self._reached = None # popped but not expanded yet (a goal, or see `traverse`)
+        self._found = None # the goal, once popped (by `solve` or by `traverse`)
+        self._boundary = [] # popped but not expanded because of the depth limit of `traverse`
+        self._depth = {self._start: 0} # (only filled on demand, see `_depth_of`)
 
-        self._adjacency = graph.get_adj_table_as_dict(exclude_leaf_node_from_index=False)
-        # initialize the node information (that are relevant for the traversal problem)
-        self._node_parent = dict([(node_name, None) for node_name in node_set])
-        self._node_state = dict([(node_name, 0) for node_name in node_set])
+        # the node information (that are relevant for the traversal problem)
+        if isinstance(graph, frozen_graph):
+            self._visited = _visit_table_array(graph, self._start)
+        else:
+            self._visited = _visit_table_dict(self._start)
 
-        self._buffer = deque([self.start]) # holding nodes to process
+        self._buffer = deque([self._start]) # holding nodes to process
+        self.observer = observer
+        if observer is not None:
+            observer.on_push(self._start, None, 1, False)
 
         self.iter = 0 # relevant for academic purpose
 
-    def get_unvisited_node_set(self):
-        out = set()
-        for node in self._node_state.keys():
-            if self._node_state[node] == 0:
-                out.add(node)
-        return out
+    def node_is_reached(self, node_name):
+        return self.graph._key_of(node_name) in self._visited
 
-    def add_nodes_to_buffer(self, node_set_to_add: set):
+    def add_nodes_to_buffer(self, node_set_to_add):
         """ Here FIFO (BFS)
         assuming `node_set_to_add` is NON-empty!
         """
         # the specific order is implementation-dependent
-        for node in node_set_to_add:
-            self._buffer.appendleft(node) 
+        self._buffer.extendleft(node_set_to_add)
 
     def solve(self):
-        current_node = None # whatever != self.goal
+        with phase(self.observer, "search"):
+            if self._found is not None:
+                is_found = True # (e.g. `traverse` went past the goal already)
+            else:
+                self._expand_pending()
+                is_found = self._search()
+        if not is_found:
+            return None # No path connecting S--> G !
+        with phase(self.observer, "backtrack"):
+            return self._backtrack(self._found)
+
+    def traverse(self, stop=None, max_depth=None, max_nodes=None):
+        """a generator of (node, parent, depth) in the order the nodes are settled (popped from the buffer),
+        where the parent is None for the start node and the depth counts the edges of the tree path
+        (the fewest edges for BFS, not so for DFS)
+
+        Args:
+            stop (callable, optional): (node, parent, depth) --> bool, the traversal ends
+                right after yielding a node it returns True for (without expanding it)
+            max_depth (int, optional): the nodes at this depth are yielded but not expanded,
+                e.g. the k-hop neighbourhood of the start node
+            max_nodes (int, optional): yield at most this many nodes (per call)
+
+        Nothing is materialized beyond the visit table and the buffer, and all of it stays
+        in the solver, so calling it again resumes the traversal, e.g. with a larger max_depth
+        (the nodes held back by the limit, by `stop` or by leaving the loop early are expanded first).
+        `solve` resumes it as well. See also `frontier`, `checkpoint` and `restore`.
+        """
+        self._expand_pending(max_depth)
+        name_of = self.graph._name_of
+        parent_of = self._visited.parent_of
+        depth = self._depth
+        observer = self.observer
+        n_yielded = 0
+        while len(self._buffer) > 0:
+            if max_nodes is not None and n_yielded >= max_nodes:
+                return
+            node = self._buffer.pop()
+            self.iter += 1
+            if observer is not None:
+                observer.on_expand(node, None)
+            parent = parent_of(node)
+            node_depth = depth[node] = 0 if parent is None else self._depth_of(parent) + 1
+            if node in self._goals and self._found is None:
+                self._found = node
+            # (until the consumer asks for the next one, in case it never does)
+            self._reached = node
+            n_yielded += 1
+            item = (name_of(node), None if parent is None else name_of(parent), node_depth)
+            yield item
+            if stop is not None and stop(*item):
+                return
+            self._reached = None
+            if max_depth is not None and node_depth >= max_depth:
+                self._boundary.append(node)
+            else:
+                self._expand(node)
 
-        # forward traversal
-        while current_node != self.goal:
+    def _expand_pending(self, max_depth=None):
+        # expand the nodes that were popped but not expanded (see `traverse`)
+        pending = self._boundary
+        if self._reached is not None:
+            pending.append(self._reached)
+        self._reached, self._boundary = None, []
+        for node in pending:
+            if max_depth is not None and self._depth_of(node) >= max_depth:
+                self._boundary.append(node)
+            else:
+                self._expand(node)
+
+    def _depth_of(self, node):
+        # along the tree path, up to the first node of known depth (then remembered)
+        depth = self._depth
+        path = []
+        while node not in depth:
+            path.append(node)
+            node = self._visited.parent_of(node)
+        node_depth = depth[node]
+        for node in reversed(path):
+            node_depth += 1
+            depth[node] = node_depth
+        return node_depth
+
+    def frontier(self):
+        """the nodes reached but not expanded (yet) as a list of (node, depth), i.e. the buffer
+        and the nodes `traverse` held back, e.g. the outer ring of a k-hop neighbourhood"""
+        name_of = self.graph._name_of
+        nodes = list(self._buffer) + self._boundary + ([] if self._reached is None else [self._reached])
+        return [(name_of(node), self._depth_of(node)) for node in nodes]
+
+    def checkpoint(self):
+        """a snapshot of the search state (as node names, e.g. to pickle it), see `restore`"""
+        name_of = self.graph._name_of
+        return {
+            "start": self.start,
+            "goals": [name_of(node) for node in self._goals],
+            "parents": [(name_of(node), None if parent is None else name_of(parent))
+                        for node, parent in self._visited.items()],
+            "buffer": [name_of(node) for node in self._buffer],
+            "reached": None if self._reached is None else name_of(self._reached),
+            "boundary": [name_of(node) for node in self._boundary],
+            "found": None if self._found is None else name_of(self._found),
+            "iter": self.iter,
+        }
+
+    def restore(self, state):
+        """continue from a `checkpoint` (of a search of the same kind from the same start node),
+        e.g. `BFS(start, goal, graph).restore(state)`, returns the solver"""
+        assert state["start"] == self.start, "the checkpoint is of a search from another start node"
+        key_of = self.graph._key_of
+        self._visited.restore((key_of(node), None if parent is None else key_of(parent))
+                              for node, parent in state["parents"])
+        self._buffer = deque(key_of(node) for node in state["buffer"])
+        self._goals = {key_of(node) for node in state["goals"]}
+        self._reached = None if state["reached"] is None else key_of(state["reached"])
+        self._boundary = [key_of(node) for node in state["boundary"]]
+        self._found = None if state["found"] is None else key_of(state["found"])
+        self._depth = {self._start: 0}
+        self.iter = state["iter"]
+        return self
+
+    def _notify_expansion(self, node, new_nodes):
+        observer = self.observer
+        new_nodes = set(new_nodes)
+        for child in self.graph._children_of(node):
+            observer.on_relax(node, child, None, child in new_nodes)
+        for child in new_nodes:
+            observer.on_push(child, None, len(self._buffer), False)
+
+    def _search(self):
+        # forward traversal (the goal reached is left in `self._reached`, unexpanded)
+        goals = self._goals
+        while True:
             if len(self._buffer) == 0:
-                return None # No path connecting S--> G !
+                return False
 
             # Our convention: pop from the RHS (even for LIFO, i.e. DFS)
             current_node = self._buffer.pop()
-            
-            # node expansion
-            node_set_candidate = self._adjacency[current_node]
-            node_set_unvisited = self.get_unvisited_node_set()
-            node_set_to_add = node_set_candidate.intersection(node_set_unvisited)
-            if len(node_set_to_add) > 0:
-                self.add_nodes_to_buffer(node_set_to_add)
-          
-            # update the node status and parents
-            for node_new in node_set_to_add:
-                self._node_state[node_new]  = 1
-                self._node_parent[node_new] = current_node
-            self._node_state[current_node]  = 2
             self.iter += 1
+            if self.observer is not None:
+                self.observer.on_expand(current_node, None)
+            if current_node in goals:
+                self._reached = self._found = current_node
+                return True
+            self._expand(current_node)
 
+    def _expand(self, current_node):
+        # node expansion (this also updates the node status and parents)
+        node_set_to_add = self._visited.discover_children(self.graph, current_node)
+        if len(node_set_to_add) > 0:
+            self.add_nodes_to_buffer(node_set_to_add)
+        if self.observer is not None:
+            self._notify_expansion(current_node, node_set_to_add)
 
+    def _backtrack(self, target=None):
         # backward traversal (to assemble the path)
-        backward_path = [self.goal]
-        while backward_path[-1] != self.start:
+        backward_path = [self._goal if target is None else target]
+        while backward_path[-1] != self._start:
             current_node_on_path = backward_path[-1] 
-            backward_path.append(self._node_parent[current_node_on_path])
-        return backward_path[::-1]    
+            backward_path.append(self._visited.parent_of(current_node_on_path))
+        return [self.graph._name_of(n) for n in reversed(backward_path)]
+
+
+class LevelBFS:
+    def __init__(self, start: str, goal: str, graph: frozen_graph, observer=None, direction_optimizing=True):
+        """the same problem as `BFS` (i.e. a path with the fewest edges), solved by `bfs_tree`
+
+        Args:
+            start (str):
+            goal (str):
+            graph (frozen_graph or directed_graph): the latter is frozen first
+            observer (search_observer, optional): only the phases ("search", "backtrack")
+                are reported, there are no per-node events
+            direction_optimizing (bool): see `bfs_tree`
+
+        After `solve()`, `self.hops` and `self.parent` hold the BFS tree (by node index)
+        of every node reached up to the goal's level (see `bfs_tree`).
+        """
+        assert isinstance(graph, (directed_graph, frozen_graph))
+        assert graph.has_node(start), f"The start node {start} cannot found in the graph!"
+        assert graph.has_node(goal), f"The goal node {goal} cannot found in the graph!"
+        self.start = start
+        self.goal = goal
+        self.graph = graph if isinstance(graph, frozen_graph) else graph.freeze()
+        self._start = self.graph.index_of(start)
+        self._goal = self.graph.index_of(goal)
+        self.observer = observer
+        self.direction_optimizing = direction_optimizing
+        self.hops = None
+        self.parent = None
+        self.iter = 0 # number of levels expanded
+
+    def solve(self):
+        """see `BFS.solve`"""
+        with phase(self.observer, "search"):
+            self.hops, self.parent = bfs_tree(self.graph, self._start, self._goal, self.direction_optimizing)
+        self.iter = int(self.hops.max())
+        if self.hops[self._goal] < 0:
+            return None # No path connecting S--> G !
+        with phase(self.observer, "backtrack"):
+            backward_path = [self._goal]
+            while backward_path[-1] != self._start:
+                backward_path.append(int(self.parent[backward_path[-1]]))
+            return [self.graph.name_of(n) for n in reversed(backward_path)]
 
 
 class DFS(BFS):
-    def add_nodes_to_buffer(self, node_set_to_add: set):
+    def add_nodes_to_buffer(self, node_set_to_add):
         """ Here LIFO (DFS)
         assuming `node_set_to_add` is NON-empty!
         """
         # the specific order is implementation-dependent
-        for node in node_set_to_add:
-            self._buffer.append(node) 
+        self._buffer.extend(node_set_to_add)
 
 if __name__ == "__main__":
     def make_sample_graph(with_loop=False):
-        net = directed_graph()
+        net = directed_graph("sample graph")
         net.add_edge('S', 'depot')
         net.add_edge('S', 'A')
         net.add_edge('depot', 'D')
@@ -111,4 +505,31 @@ if __name__ == "__main__":
     solver = BFS('S', 'C', graph1)
     ans = solver.solve()
     print(ans)
-    print(f"finished in {solver.iter} iteration(s)")
\ No newline at end of file
+    print(f"finished in {solver.iter} iteration(s)")
+
+    solver = DFS('S', 'C', graph1.freeze())
+    ans = solver.solve()
+    print(ans)
+    print(f"finished in {solver.iter} iteration(s)")
+
+    solver = LevelBFS('S', 'C', graph1)
+    ans = solver.solve()
+    print(ans)
+    print(f"finished in {solver.iter} level(s)")
+
+    # streaming: the 1-hop neighbourhood, then the 2-hop one (resumed), then the rest
+    graph2 = make_sample_graph(with_loop=True)
+    solver = BFS('S', 'C', graph2)
+    print([node for node, _, _ in solver.traverse(max_depth=1)], "frontier:", solver.frontier())
+    print(list(solver.traverse(max_depth=2)))
+    state = solver.checkpoint()
+    rest = list(solver.traverse())
+    assert list(BFS('S', 'C', graph2).restore(state).traverse()) == rest
+    print(rest)
+
+    # `solve` after a traversal that went past the goal, fully or up to a depth limit
+    for limits in (dict(), dict(max_depth=2), dict(max_nodes=4)):
+        solver = BFS('S', 'C', graph1)
+        list(solver.traverse(**limits))
+        assert solver.solve() == ['S', 'A', 'C'], limits
+        assert BFS('S', 'C', graph1).restore(solver.checkpoint()).solve() == ['S', 'A', 'C']
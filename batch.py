@@ -0,0 +1,199 @@
+import copy
+import math
+import multiprocessing
+import os
+import tempfile
+import numpy as np
+from graph_rep import directed_graph_weighted, frozen_graph
+from algo_forward import Astar
+from heuristics import no_validation_kwargs
+
+__all__ = ["batch_executor", "solve_batch"]
+
+INF = float("inf")
+
+# the state of a worker process (set up once by `_init_worker`)
+_worker = dict()
+
+class _worker_graph:
+    """stands for the graph of the worker in the solver kwargs sent to it
+    (a class, so that it is pickled by reference)"""
+
+
+def _holds_graph(value, graph):
+    # e.g. a landmark_heuristic computed on `graph` (or on another mapping of the same file)
+    held = getattr(value, "graph", None)
+    return held is graph or (isinstance(held, frozen_graph) and held.store_path is not None
+                             and held.store_path == graph.store_path)
+
+
+def _detach_graph(solver_kwargs, graph):
+    """the solver kwargs without (the aliases of) `graph`, to be sent to the workers"""
+    out = dict()
+    for key, value in solver_kwargs.items():
+        if _holds_graph(value, graph):
+            value = copy.copy(value)
+            value.graph = _worker_graph
+        out[key] = value
+    return out
+
+
+def _init_worker(graph_path, algo_class, solver_kwargs):
+    graph = frozen_graph.load(graph_path, mmap=True)
+    for value in solver_kwargs.values():
+        if getattr(value, "graph", None) is _worker_graph:
+            value.graph = graph
+    _worker["graph"] = graph
+    _worker["algo_class"] = algo_class
+    _worker["solver_kwargs"] = solver_kwargs
+
+
+def _solve_queries(graph, algo_class, solver_kwargs, queries):
+    out = []
+    solve_kwargs = no_validation_kwargs(algo_class)
+    for start, goal in queries:
+        solver = algo_class(start, goal, graph, **solver_kwargs)
+        out.append(solver.solve(**solve_kwargs))
+    return out
+
+
+def _solve_chunk(queries):
+    return _solve_queries(_worker["graph"], _worker["algo_class"], _worker["solver_kwargs"], queries)
+
+
+class batch_executor:
+    def __init__(self, graph, algo_class: type = Astar, processes=None, **solver_kwargs):
+        """answers many independent (start, goal) queries on one graph, spread over a process pool
+
+        Args:
+            graph (directed_graph_weighted, frozen_graph or path):
+                * a path of a file written by `frozen_graph.save`, or
+                * a frozen graph memory-mapped from such a file (`frozen_graph.load`), or
+                * any other graph, which is frozen and written to a temporary file (once)
+                every worker maps the same file (read-only), i.e. the graph is neither
+                pickled per task nor copied per process (the pages are shared)
+            algo_class (type): a solver with the interface of `Astar`,
+                i.e. algo_class(start, goal, graph, **solver_kwargs).solve()
+                returns (path, cost) or (None, None)
+                (the heuristic checks are skipped, see `no_validation_kwargs`)
+            processes (int, optional): defaults to os.cpu_count(), with 1 no pool is started
+                (everything runs in this process)
+            solver_kwargs: passed on to every solver, e.g. `heuristic=landmark_heuristic(graph)`
+                (pickled once per worker, so they should be picklable).
+                A value holding the graph itself (as its `graph` attribute, like a `landmark_heuristic`
+                computed on the same frozen graph or on a mapping of the same file) is sent without it,
+                each worker hands it its own mapping of the graph instead
+
+        Use it as a context manager (or call `close()`) to shut down the pool.
+        """
+        assert type(algo_class) == type, "Please pass in a class, not an object!"
+        self.algo_class = algo_class
+        self.solver_kwargs = solver_kwargs
+        self.processes = os.cpu_count() if processes is None else processes
+        assert self.processes >= 1
+        self._tmp_dir = None
+
+        if isinstance(graph, (str, os.PathLike)):
+            self.graph_path = os.fspath(graph)
+            self.graph = frozen_graph.load(self.graph_path, mmap=True)
+        else:
+            assert isinstance(graph, (directed_graph_weighted, frozen_graph))
+            self.graph = graph if isinstance(graph, frozen_graph) else graph.freeze()
+            self.graph_path = self.graph.store_path
+            if self.graph_path is None and self.processes > 1:
+                self._tmp_dir = tempfile.TemporaryDirectory(prefix="graph_batch_")
+                self.graph_path = os.path.join(self._tmp_dir.name, "graph.bin")
+                self.graph.save(self.graph_path)
+
+        self._pool = None
+        if self.processes > 1:
+            self._pool = multiprocessing.get_context().Pool(
+                self.processes, initializer=_init_worker,
+                initargs=(self.graph_path, algo_class, _detach_graph(solver_kwargs, self.graph)))
+
+    def solve(self, queries, chunksize=None):
+        """
+        Args:
+            queries: a sequence (or an (n, 2) array) of (start, goal) node names
+            chunksize (int, optional): queries per task, by default about 4 tasks per worker
+                (larger chunks mean less inter-process traffic, smaller ones a better balance)
+
+        Returns:
+            paths (list): the path (tuple of node names) of each query, None if unreachable
+            costs (float64 array): the path costs, inf if unreachable
+            (both in the order of `queries`)
+        """
+        queries = [(str(start), str(goal)) for start, goal in queries]
+        if self._pool is None:
+            results = _solve_queries(self.graph, self.algo_class, self.solver_kwargs, queries)
+        else:
+            if chunksize is None:
+                chunksize = max(1, math.ceil(len(queries) / (4 * self.processes)))
+            chunks = [queries[i:i + chunksize] for i in range(0, len(queries), chunksize)]
+            # (map keeps the order of the chunks)
+            results = [result for chunk in self._pool.map(_solve_chunk, chunks) for result in chunk]
+        paths = [path for path, _ in results]
+        costs = np.array([INF if cost is None else cost for _, cost in results], dtype=np.float64)
+        return paths, costs
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+            self._tmp_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def solve_batch(queries, graph, algo_class: type = Astar, processes=None, chunksize=None, **solver_kwargs):
+    """a one-off `batch_executor(...).solve(queries)` (the pool is started and shut down here)
+
+    Returns:
+        paths (list), costs (float64 array): see `batch_executor.solve`
+    """
+    with batch_executor(graph, algo_class, processes, **solver_kwargs) as executor:
+        return executor.solve(queries, chunksize)
+
+
+if __name__ == "__main__":
+    import time
+    from bench.generators import road_like_graph
+    from algo_dp import shortest_path_tree
+    from landmarks import landmark_heuristic
+
+    sgraph = road_like_graph(10000, seed=1)
+    rng = np.random.default_rng(0)
+    nodes = rng.choice(sgraph.n_nodes, size=(100, 2))
+    queries = [(sgraph.graph.name_of(int(s)), sgraph.graph.name_of(int(t))) for s, t in nodes]
+
+    for processes in sorted({1, 2, os.cpu_count()}):
+        t0 = time.perf_counter()
+        paths, costs = solve_batch(queries, sgraph.graph, processes=processes)
+        elapsed = time.perf_counter() - t0
+        print(f"{processes} process(es): {len(queries) / elapsed:.0f} queries/s")
+
+    # the same answers as the reference solver, in the input order
+    for (start, goal), path, cost in zip(queries, paths, costs):
+        settled, _ = shortest_path_tree(sgraph.graph, sgraph.graph.index_of(start),
+                                        targets=[sgraph.graph.index_of(goal)])
+        expected = settled.get(sgraph.graph.index_of(goal), INF)
+        assert math.isclose(cost, expected) or cost == expected == INF
+        assert path is None or (path[0], path[-1]) == (start, goal)
+
+    # with a landmark heuristic on the same graph (the workers map the graph, the tables are pickled)
+    lm = landmark_heuristic(sgraph.graph, n_landmarks=8)
+    for processes in sorted({1, 2, os.cpu_count()}):
+        t0 = time.perf_counter()
+        paths_lm, costs_lm = solve_batch(queries, sgraph.graph, processes=processes, heuristic=lm)
+        elapsed = time.perf_counter() - t0
+        print(f"{processes} process(es), landmarks: {len(queries) / elapsed:.0f} queries/s")
+        assert np.allclose(costs_lm, costs, equal_nan=True)
+    assert lm.graph is sgraph.graph
+
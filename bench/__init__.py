@@ -0,0 +1,3 @@
+"""Synthetic graphs and a runner for benchmarking the solvers at scale (see `bench.runner`)"""
+from bench.generators import *
+from bench.cases import *
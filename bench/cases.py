@@ -0,0 +1,37 @@
+import numpy as np
+from graph_examples import graph_algo_verifier
+from algo_dp import shortest_path_tree
+from bench.generators import synthetic_graph
+
+__all__ = ["synthetic_case", "make_cases"]
+
+class synthetic_case(graph_algo_verifier):
+    def __init__(self, sgraph: synthetic_graph, start: str, goal: str):
+        """one (start, goal) query on a generated graph
+
+        The ground truth is computed by a reference solver (Dijkstra, see `shortest_path_tree`),
+        the optimal paths are not enumerated (tuple_global_soln = None),
+        so `verify` checks the cost and the feasibility of the returned path.
+        """
+        self.sgraph = sgraph
+        self.graph = sgraph.graph
+        self.start = start
+        self.goal = goal
+        self.heuristic = sgraph.heuristic(goal)
+        self.tuple_global_soln = None
+        settled, _ = shortest_path_tree(self.graph, self.graph.index_of(start),
+                                        targets=[self.graph.index_of(goal)])
+        self.true_min_cost = settled.get(self.graph.index_of(goal))
+
+
+def make_cases(sgraph: synthetic_graph, n_queries=5, seed=0):
+    """random (start, goal) pairs among the nodes with at least one edge (e.g. not obstacles)"""
+    rng = np.random.default_rng(seed)
+    out_degree = np.diff(sgraph.graph.offsets)
+    candidates = np.flatnonzero(out_degree > 0)
+    assert len(candidates) >= 2, "the graph has hardly any edges"
+    cases = []
+    for _ in range(n_queries):
+        s, t = rng.choice(candidates, size=2, replace=False)
+        cases.append(synthetic_case(sgraph, sgraph.graph.name_of(int(s)), sgraph.graph.name_of(int(t))))
+    return cases
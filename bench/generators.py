@@ -0,0 +1,244 @@
+import math
+import numpy as np
+from graph_rep import frozen_graph, node_name_table
+
+__all__ = ["synthetic_graph", "grid_graph", "random_geometric_graph",
+           "scale_free_graph", "road_like_graph", "GENERATORS"]
+
+METRICS = ("euclidean", "manhattan")
+
+class synthetic_graph:
+    def __init__(self, graph: frozen_graph, kind: str, seed: int,
+                 coords=None, metric="euclidean", heuristic_scale=1.0):
+        """a generated (frozen) graph, along with what is needed for its heuristic
+
+        Args:
+            graph (frozen_graph): node i is named str(i)
+            kind (str): the name of the generator
+            seed (int): the seed it was generated with
+            coords (float array, shape (N, D), optional):
+                the node positions, None if there is no geometry (then h = 0)
+            metric (str): "euclidean" or "manhattan", the distance between positions
+            heuristic_scale (float):
+                the generator guarantees that heuristic_scale * distance(u, v)
+                never exceeds the cost of any path from u to v (i.e. h is admissible and consistent)
+        """
+        assert metric in METRICS, f"metric must be one of {METRICS}"
+        self.graph = graph
+        self.kind = kind
+        self.seed = seed
+        self.coords = coords
+        self.metric = metric
+        self.heuristic_scale = heuristic_scale
+        self._coord_lists = None
+
+    @property
+    def n_nodes(self):
+        return self.graph.n_nodes
+
+    @property
+    def n_edges(self):
+        return self.graph.n_edges
+
+    def heuristic(self, goal: str):
+        """h(node index), the scaled distance towards `goal`, evaluated lazily node by node"""
+        if self.coords is None:
+            return lambda v: 0.0
+        if self._coord_lists is None:
+            # (indexing a list is much faster than indexing an array one element at a time)
+            self._coord_lists = tuple(self.coords[:, d].tolist() for d in range(self.coords.shape[1]))
+        t = self.graph.index_of(goal)
+        scale = self.heuristic_scale
+        if self.coords.shape[1] == 2:
+            x, y = self._coord_lists
+            tx, ty = x[t], y[t]
+            if self.metric == "manhattan":
+                return lambda v: scale * (abs(x[v] - tx) + abs(y[v] - ty))
+            return lambda v: scale * math.hypot(x[v] - tx, y[v] - ty)
+        cols = self._coord_lists
+        target = [c[t] for c in cols]
+        if self.metric == "manhattan":
+            return lambda v: scale * sum(abs(c[v] - ct) for c, ct in zip(cols, target))
+        return lambda v: scale * math.dist([c[v] for c in cols], target)
+
+    def heuristic_array(self, goal: str):
+        """the same as `heuristic` but for every node at once (as an array)"""
+        if self.coords is None:
+            return np.zeros(self.n_nodes)
+        diff = self.coords - self.coords[self.graph.index_of(goal)]
+        if self.metric == "manhattan":
+            return self.heuristic_scale * np.abs(diff).sum(axis=1)
+        return self.heuristic_scale * np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+    def __str__(self):
+        return f"{self.kind} (seed {self.seed}): {self.n_nodes} nodes, {self.n_edges} edges"
+
+
+def _both_ways(parents, children, *edge_arrays):
+    # an undirected edge becomes two directed ones
+    return (np.concatenate([parents, children]), np.concatenate([children, parents]),
+            *(np.concatenate([arr, arr]) for arr in edge_arrays))
+
+
+def _build(name, n_nodes, parents, children, weights, coords=None):
+    # (the coordinates are also kept on the graph, for the heuristics of coord_heuristics.py)
+    return frozen_graph.from_edge_arrays(name, parents, children, weights,
+                                         node_names=node_name_table.numbered(n_nodes), coords=coords)
+
+
+def grid_graph(shape, obstacle_ratio=0.2, seed=0):
+    """a 2D (4-connected) or 3D (6-connected) grid with unit edge costs,
+    where a random fraction of the cells are obstacles (nodes without any edge)
+
+    Args:
+        shape (tuple of int): e.g. (rows, cols) or (depth, rows, cols)
+        obstacle_ratio (float): in [0, 1)
+        seed (int):
+
+    The Manhattan distance is an exact lower bound (without obstacles).
+    """
+    shape = tuple(int(s) for s in shape)
+    assert len(shape) in (2, 3), "only 2D and 3D grids are supported"
+    rng = np.random.default_rng(seed)
+    n_nodes = math.prod(shape)
+    ids = np.arange(n_nodes, dtype=np.int64).reshape(shape)
+    free = (rng.random(n_nodes) >= obstacle_ratio).reshape(shape)
+
+    parents, children = [], []
+    for axis in range(len(shape)):
+        lower = [slice(None)] * len(shape)
+        upper = [slice(None)] * len(shape)
+        lower[axis] = slice(0, -1)
+        upper[axis] = slice(1, None)
+        lower, upper = tuple(lower), tuple(upper)
+        keep = free[lower] & free[upper]
+        parents.append(ids[lower][keep])
+        children.append(ids[upper][keep])
+    parents, children = _both_ways(np.concatenate(parents), np.concatenate(children))
+    name = f"grid {'x'.join(map(str, shape))}"
+    coords = np.stack(np.unravel_index(np.arange(n_nodes), shape), axis=1).astype(np.float64)
+    graph = _build(name, n_nodes, parents, children, np.ones(len(parents)), coords)
+    return synthetic_graph(graph, f"grid{len(shape)}d", seed, coords, metric="manhattan")
+
+
+def random_geometric_graph(n_nodes, mean_degree=6.0, seed=0):
+    """random points in the unit square, connected if closer than r (both ways)
+
+    The radius r is chosen for the given expected number of neighbours.
+    Each directed edge costs its length times a random detour factor in [1, 1.5),
+    i.e. the straight-line distance is admissible.
+    """
+    rng = np.random.default_rng(seed)
+    points = rng.random((n_nodes, 2))
+    radius = math.sqrt(mean_degree / (math.pi * max(n_nodes, 1)))
+
+    # bucket the points into cells of size >= r, so only neighbouring cells need comparing
+    n_cells = max(1, int(1.0 / radius))
+    cell_xy = np.minimum((points * n_cells).astype(np.int64), n_cells - 1)
+    order = np.argsort(cell_xy[:, 0] * n_cells + cell_xy[:, 1], kind="stable")
+    cell_x, cell_y = cell_xy[order, 0], cell_xy[order, 1]
+    x, y = points[order, 0], points[order, 1]
+    cell_start = np.searchsorted(cell_x * n_cells + cell_y, np.arange(n_cells * n_cells + 1))
+
+    parents, children = [], []
+    chunk = 1 << 20 # points per batch, to bound the size of the candidate pairs
+    # half of the 3x3 neighbourhood, so every pair is seen once
+    for dx, dy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        for a in range(0, n_nodes, chunk):
+            i = np.arange(a, min(a + chunk, n_nodes)) # positions in the sorted order
+            cx, cy = cell_x[i] + dx, cell_y[i] + dy
+            valid = (cx < n_cells) & (cy >= 0) & (cy < n_cells)
+            i, other = i[valid], cx[valid] * n_cells + cy[valid]
+            first, count = cell_start[other], cell_start[other + 1] - cell_start[other]
+            i_pair = np.repeat(i, count)
+            j_pair = np.repeat(first - np.cumsum(count) + count, count) + np.arange(count.sum())
+            if dx == dy == 0:
+                keep = j_pair > i_pair
+                i_pair, j_pair = i_pair[keep], j_pair[keep]
+            close = (x[i_pair] - x[j_pair])**2 + (y[i_pair] - y[j_pair])**2 < radius**2
+            parents.append(order[i_pair[close]])
+            children.append(order[j_pair[close]])
+    del cell_xy, cell_x, cell_y, x, y, cell_start
+    parents, children = _both_ways(np.concatenate(parents), np.concatenate(children))
+    weights = np.sqrt(np.sum((points[parents] - points[children])**2, axis=1))
+    weights *= 1.0 + 0.5 * rng.random(len(weights))
+    graph = _build(f"random geometric graph ({n_nodes})", n_nodes, parents, children, weights, points)
+    return synthetic_graph(graph, "geometric", seed, points, metric="euclidean")
+
+
+def scale_free_graph(n_nodes, n_links=3, seed=0):
+    """Barabasi-Albert preferential attachment (both ways), with edge costs in [1, 10)
+
+    Batagelj & Brandes' formulation: the k-th link (from node k // n_links) picks
+    a uniformly random entry of the list of all link endpoints so far,
+    i.e. an existing node with probability proportional to its degree.
+    An endpoint is either known upfront (the source node of a link) or the target of
+    an earlier link, so all targets are resolved at once by pointer jumping.
+    Self loops and repeated links are dropped. There is no geometry (h = 0).
+    """
+    rng = np.random.default_rng(seed)
+    n_total = n_nodes * n_links
+    k = np.arange(n_total, dtype=np.int64)
+    r = rng.random(n_total)
+    r *= 2 * k + 1
+    r = np.minimum(r.astype(np.int64), 2 * k) # uniform in [0, 2k]
+    del k
+    # endpoint list: entry 2j is the source of link j, entry 2j+1 its target
+    target = np.where(r % 2 == 0, (r // 2) // n_links, -1)
+    pointer = np.where(r % 2 == 1, (r - 1) // 2, -1)
+    del r
+    pending = np.flatnonzero(pointer >= 0)
+    while len(pending):
+        p = pointer[pending]
+        resolved = target[p] >= 0
+        target[pending[resolved]] = target[p[resolved]]
+        pointer[pending[~resolved]] = pointer[p[~resolved]]
+        pending = pending[~resolved]
+    del pointer, pending
+
+    source = np.arange(n_total, dtype=np.int64) // n_links
+    keep = source != target
+    parents, children = _both_ways(source[keep], target[keep])
+    del source, target, keep
+    weights = 1.0 + 9.0 * rng.random(len(parents))
+    graph = _build(f"scale-free graph ({n_nodes})", n_nodes, parents, children, weights)
+    return synthetic_graph(graph, "scale_free", seed)
+
+
+def road_like_graph(n_nodes, highway_every=16, p_keep=0.85, seed=0):
+    """a planar, road-network-like graph: a jittered square grid of junctions
+    (about `n_nodes` of them) with some local roads missing,
+    and fast highways along every `highway_every`-th row and column
+
+    An edge costs its length times 1 (highway) or a random factor in [1.5, 3) (local road),
+    i.e. the straight-line distance is admissible.
+    """
+    rng = np.random.default_rng(seed)
+    side = max(2, int(round(math.sqrt(n_nodes))))
+    n_nodes = side * side
+    ids = np.arange(n_nodes, dtype=np.int64).reshape(side, side)
+    rows, cols = np.divmod(np.arange(n_nodes), side)
+    coords = np.stack([cols, rows], axis=1) + rng.uniform(-0.3, 0.3, (n_nodes, 2))
+
+    # horizontal roads (along a row) and vertical roads (along a column)
+    parents = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    children = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    is_highway = np.concatenate([(rows.reshape(side, side)[:, :-1] % highway_every == 0).ravel(),
+                                 (cols.reshape(side, side)[:-1, :] % highway_every == 0).ravel()])
+    keep = is_highway | (rng.random(len(parents)) < p_keep)
+    parents, children, is_highway = parents[keep], children[keep], is_highway[keep]
+    factor = np.where(is_highway, 1.0, rng.uniform(1.5, 3.0, len(parents)))
+    parents, children, factor = _both_ways(parents, children, factor)
+    length = np.sqrt(np.sum((coords[parents] - coords[children])**2, axis=1))
+    graph = _build(f"road-like graph ({side}x{side})", n_nodes, parents, children, length * factor, coords)
+    return synthetic_graph(graph, "road", seed, coords, metric="euclidean")
+
+
+# name --> (n_nodes, seed) --> synthetic_graph, with the sizes rounded as needed
+GENERATORS = {
+    "grid2d": lambda n_nodes, seed: grid_graph((round(n_nodes ** 0.5),) * 2, seed=seed),
+    "grid3d": lambda n_nodes, seed: grid_graph((round(n_nodes ** (1 / 3)),) * 3, seed=seed),
+    "geometric": lambda n_nodes, seed: random_geometric_graph(n_nodes, seed=seed),
+    "scale_free": lambda n_nodes, seed: scale_free_graph(n_nodes, seed=seed),
+    "road": lambda n_nodes, seed: road_like_graph(n_nodes, seed=seed),
+}
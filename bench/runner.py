@@ -0,0 +1,216 @@
+"""Benchmark runner: times the solvers on generated graphs, one JSON record per (query, algorithm)
+
+e.g. (from the repository root)
+    python -m bench.runner --generators grid2d road --n-nodes 1000 100000 --output results.jsonl
+    python -m bench.runner ... --baseline results.jsonl   # flag performance regressions
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from statistics import median
+
+from algo_forward import Astar
+from algo_bidirectional import BidirectionalAstar
+from algo_traversal import BFS, DFS
+from graph_examples import path_cost
+from instrumentation import search_stats
+from bench.generators import GENERATORS
+from bench.cases import make_cases
+
+__all__ = ["ALGORITHMS", "run_case", "run_benchmark", "compare_to_baseline"]
+
+def _zero(node):
+    return 0.0
+
+# name --> (solver class, case --> constructor kwargs, whether its solutions are optimal)
+ALGORITHMS = {
+    "Astar": (Astar, lambda case: {"heuristic": case.heuristic}, True),
+    "Dijkstra": (Astar, lambda case: {"heuristic": _zero}, True),
+    "BidirectionalAstar": (BidirectionalAstar,
+                           lambda case: {"heuristic": case.heuristic,
+                                         "heuristic_to_start": case.sgraph.heuristic(case.start)}, True),
+    "BidirectionalDijkstra": (BidirectionalAstar, lambda case: {}, True),
+    "BFS": (BFS, lambda case: {}, False),
+    "DFS": (DFS, lambda case: {}, False),
+}
+
+
+def _solve(algo_class, case, kwargs, is_optimal):
+    solver = algo_class(case.start, case.goal, case.graph, **kwargs)
+    if is_optimal:
+        soln_path, soln_cost = solver.solve(validate_heuristics=False)
+    else: # BFS/ DFS: any path (or None), its cost is computed later (outside of the timing)
+        soln_path = solver.solve()
+        soln_cost = None
+    return solver, soln_path, soln_cost
+
+
+def _is_correct(case, algo_name):
+    algo_class, make_kwargs, is_optimal = ALGORITHMS[algo_name]
+    try:
+        if is_optimal:
+            case.verify(algo_class, **make_kwargs(case))
+        else:
+            _, soln_path, _ = _solve(algo_class, case, make_kwargs(case), is_optimal)
+            # a feasible path, iff there is any
+            assert (soln_path is None) == (case.true_min_cost is None)
+    except (AssertionError, KeyError):
+        return False
+    return True
+
+
+def run_case(case, algo_name, repeat=3, measure_memory=True, verify=True, collect_stats=False):
+    """
+    Returns:
+        record (dict): the wall time (the median of `repeat` runs), the number of expansions,
+            the peak memory (traced by tracemalloc in an extra run), the throughput
+            (expansions per second) and whether the solution is correct,
+            with collect_stats=True also the counters of a `search_stats` (in yet another run)
+    """
+    algo_class, make_kwargs, is_optimal = ALGORITHMS[algo_name]
+    times = []
+    for _ in range(repeat):
+        kwargs = make_kwargs(case)
+        t0 = time.perf_counter()
+        solver, soln_path, soln_cost = _solve(algo_class, case, kwargs, is_optimal)
+        times.append(time.perf_counter() - t0)
+    wall_time = median(times)
+    if not is_optimal and soln_path is not None:
+        soln_cost = path_cost(case.graph, soln_path)
+
+    peak_memory = None
+    if measure_memory:
+        # (separately, since tracing slows everything down)
+        kwargs = make_kwargs(case)
+        tracemalloc.start()
+        _solve(algo_class, case, kwargs, is_optimal)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    stats = None
+    if collect_stats:
+        stats = search_stats()
+        _solve(algo_class, case, dict(make_kwargs(case), observer=stats), is_optimal)
+
+    return {
+        "generator": case.sgraph.kind,
+        "seed": case.sgraph.seed,
+        "n_nodes": case.graph.n_nodes,
+        "n_edges": case.graph.n_edges,
+        "start": case.start,
+        "goal": case.goal,
+        "algorithm": algo_name,
+        "wall_time_s": wall_time,
+        "expansions": solver.iter,
+        "peak_memory_bytes": peak_memory,
+        "expansions_per_s": solver.iter / wall_time if wall_time > 0 else None,
+        "path_length": None if soln_path is None else len(soln_path),
+        "cost": soln_cost,
+        "optimal_cost": case.true_min_cost,
+        "correct": _is_correct(case, algo_name) if verify else None,
+        "stats": None if stats is None else stats.as_dict(),
+    }
+
+
+def run_benchmark(generators, sizes, algorithms, n_queries=5, seed=0, repeat=3,
+                  measure_memory=True, verify=True, out=None, collect_stats=False):
+    """run every algorithm on `n_queries` random queries per (generator, size)
+
+    Args:
+        out (file, optional): each record is written (as one JSON line) as soon as it is done
+
+    Returns:
+        records (list of dict): see `run_case`
+    """
+    records = []
+    for generator in generators:
+        for n_nodes in sizes:
+            t0 = time.perf_counter()
+            sgraph = GENERATORS[generator](n_nodes, seed)
+            build_time = time.perf_counter() - t0
+            print(f"[Info] {sgraph} built in {build_time:.2f} s", file=sys.stderr)
+            for case in make_cases(sgraph, n_queries, seed):
+                for algo_name in algorithms:
+                    record = run_case(case, algo_name, repeat, measure_memory, verify, collect_stats)
+                    record["build_time_s"] = build_time
+                    records.append(record)
+                    if out is not None:
+                        out.write(json.dumps(record) + "\n")
+                        out.flush()
+    return records
+
+
+def _record_key(record):
+    return (record["generator"], record["seed"], record["n_nodes"],
+            record["start"], record["goal"], record["algorithm"])
+
+
+def compare_to_baseline(records, baseline, time_tolerance=0.25):
+    """
+    Args:
+        records, baseline (lists of dict): see `run_case`
+        time_tolerance (float): relative slow-down to be tolerated (timings are noisy)
+
+    Returns:
+        regressions (list of str): a description of each query (also in the baseline)
+            that became incorrect, expands more nodes, or got slower beyond the tolerance
+    """
+    old_records = {_record_key(r): r for r in baseline}
+    regressions = []
+    for new in records:
+        old = old_records.get(_record_key(new))
+        if old is None:
+            continue
+        label = f"{new['algorithm']} on {new['generator']} ({new['n_nodes']} nodes) {new['start']}->{new['goal']}"
+        if old["correct"] and new["correct"] is False:
+            regressions.append(f"{label}: no longer correct")
+        if new["expansions"] > old["expansions"]:
+            regressions.append(f"{label}: {old['expansions']} --> {new['expansions']} expansions")
+        if new["wall_time_s"] > (1.0 + time_tolerance) * old["wall_time_s"]:
+            regressions.append(f"{label}: {old['wall_time_s']:.4f} s --> {new['wall_time_s']:.4f} s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generators", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--n-nodes", nargs="+", type=lambda s: int(float(s)), default=[1000, 10000],
+                        help="graph sizes (e.g. 1e3 1e5), rounded to a valid shape by some generators")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=list(ALGORITHMS))
+    parser.add_argument("--queries", type=int, default=5, help="random (start, goal) pairs per graph")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per query (the median is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the (slow) tracemalloc run")
+    parser.add_argument("--no-verify", action="store_true", help="skip the correctness check")
+    parser.add_argument("--stats", action="store_true", help="also count pushes, reopenings, etc. (see search_stats)")
+    parser.add_argument("--output", help="JSON lines file (default: stdout)")
+    parser.add_argument("--baseline", help="JSON lines file of an earlier run to compare with")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        records = run_benchmark(args.generators, args.n_nodes, args.algorithms, args.queries,
+                                args.seed, args.repeat, not args.no_memory, not args.no_verify, out, args.stats)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    failed = [r for r in records if r["correct"] is False]
+    for r in failed:
+        print(f"[Error] {r['algorithm']} is incorrect on {r['generator']} ({r['n_nodes']} nodes) "
+              f"{r['start']}->{r['goal']}: cost {r['cost']}, expected {r['optimal_cost']}", file=sys.stderr)
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = [json.loads(line) for line in f if line.strip()]
+        regressions = compare_to_baseline(records, baseline, args.time_tolerance)
+        for message in regressions:
+            print(f"[Regression] {message}", file=sys.stderr)
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
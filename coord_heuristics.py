@@ -0,0 +1,239 @@
+import math
+from abc import abstractmethod
+import numpy as np
+from graph_rep import directed_graph_weighted, frozen_graph
+from heuristics import goal_heuristic
+
+__all__ = ["coordinate_heuristic", "euclidean_heuristic", "manhattan_heuristic", "octile_heuristic",
+           "haversine_heuristic", "callable_heuristic", "EARTH_RADIUS_KM"]
+
+EARTH_RADIUS_KM = 6371.0088 # the mean radius
+
+class coordinate_heuristic(goal_heuristic):
+    def __init__(self, scale=1.0, batch=False):
+        """h(v) = scale * distance(position of v, position of the goal),
+        from the node coordinates of the graph (see `directed_graph_weighted.set_coords`,
+        `freeze` carries them into `frozen_graph.coords`)
+
+        Args:
+            scale (float): h is admissible and consistent as long as scale * distance(u, v)
+                never exceeds the cost of an edge u -> v
+                (e.g. 1 / the top speed if the edge costs are travel times)
+            batch (bool):
+                False --- h is evaluated lazily, only for the nodes the search reaches
+                True --- `bind` computes h for every node at once (numpy) and the search
+                         looks it up, which pays off when a search reaches most of the graph
+
+        Subclasses define the metric, via `distance` (a pair of points)
+        and `distances` (many points vs one, vectorized).
+        A metric is symmetric, so `bind_reverse` is the same as `bind`.
+        """
+        assert scale >= 0
+        self.scale = float(scale)
+        self.batch = batch
+
+    @abstractmethod
+    def distance(self, a, b):
+        """between two points (tuples of floats)"""
+
+    def distances(self, points, b):
+        """between every row of `points` (an (N, D) array) and the point `b`, as an (N,) array
+        (point by point here, subclasses vectorize it)"""
+        b = tuple(b)
+        return np.fromiter((self.distance(a, b) for a in map(tuple, points.tolist())),
+                           dtype=np.float64, count=len(points))
+
+    # ---- access to the coordinates ----
+    @staticmethod
+    def _check(graph):
+        if isinstance(graph, frozen_graph):
+            assert graph.coords is not None, f"the graph {graph.name} has no node coordinates"
+        else:
+            assert isinstance(graph, directed_graph_weighted), "the graph should be a (frozen) weighted graph"
+            assert graph._coords and len(graph._coords) == len(graph._adj), \
+                f"every node of the graph {graph.name} should have coordinates (see `set_coords`)"
+
+    @staticmethod
+    def _all_coords(graph):
+        if isinstance(graph, frozen_graph):
+            return graph.coords
+        return np.array([graph._coords[node] for node in graph._all_node_keys()], dtype=np.float64)
+
+    @staticmethod
+    def _lookup(graph, values):
+        # values (by node index) --> h(node key)
+        if isinstance(graph, frozen_graph):
+            return values.tolist().__getitem__
+        return dict(zip(graph._all_node_keys(), values.tolist())).__getitem__
+
+    # ---- the heuristic ----
+    def batch_values(self, graph, goals):
+        """the estimates of every node towards the nearest of `goals` (node names),
+        as one array (in node index order for a frozen graph, in the order the nodes were added otherwise)"""
+        self._check(graph)
+        if isinstance(goals, str):
+            goals = (goals,)
+        points = self._all_coords(graph)
+        values = None
+        for goal in goals:
+            d = self.distances(points, graph._coords_of(graph._key_of(goal)))
+            values = d if values is None else np.minimum(values, d, out=values)
+        return self.scale * values
+
+    def bind(self, graph, goal: str):
+        self._check(graph)
+        if self.batch:
+            return self._lookup(graph, self.batch_values(graph, (goal,)))
+        coords_of = graph._coords_of
+        target = coords_of(graph._key_of(goal))
+        distance, scale = self.distance, self.scale
+        return lambda v: scale * distance(coords_of(v), target)
+
+    def bind_reverse(self, graph, start: str):
+        return self.bind(graph, start)
+
+    def bind_many(self, graph, goals):
+        """the minimum over the goals, vectorized over the goals for each node (see `goal_heuristic.bind_many`)"""
+        goals = tuple(goals)
+        if self.batch:
+            self._check(graph)
+            return self._lookup(graph, self.batch_values(graph, goals))
+        if len(goals) == 1:
+            return self.bind(graph, goals[0])
+        self._check(graph)
+        coords_of = graph._coords_of
+        targets = np.array([coords_of(graph._key_of(goal)) for goal in goals], dtype=np.float64)
+        distances, scale = self.distances, self.scale
+        return lambda v: scale * float(distances(targets, coords_of(v)).min())
+
+
+class euclidean_heuristic(coordinate_heuristic):
+    """the straight-line distance (any number of dimensions)"""
+    def distance(self, a, b):
+        return math.dist(a, b)
+
+    def distances(self, points, b):
+        diff = points - np.asarray(b)
+        return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+
+class manhattan_heuristic(coordinate_heuristic):
+    """the sum of the coordinate differences, e.g. for 4-connected grids"""
+    def distance(self, a, b):
+        return sum(abs(x - y) for x, y in zip(a, b))
+
+    def distances(self, points, b):
+        return np.abs(points - np.asarray(b)).sum(axis=1)
+
+
+class octile_heuristic(coordinate_heuristic):
+    """the shortest 8-connected move sequence on a 2D grid with unit straight
+    and sqrt(2) diagonal moves, i.e. max(dx, dy) + (sqrt(2) - 1) * min(dx, dy)"""
+    _DIAGONAL_EXTRA = math.sqrt(2.0) - 1.0
+
+    def distance(self, a, b):
+        dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+        return max(dx, dy) + self._DIAGONAL_EXTRA * min(dx, dy)
+
+    def distances(self, points, b):
+        diff = np.abs(points[:, :2] - np.asarray(b)[:2])
+        return diff.max(axis=1) + self._DIAGONAL_EXTRA * diff.min(axis=1)
+
+
+class haversine_heuristic(coordinate_heuristic):
+    def __init__(self, radius=EARTH_RADIUS_KM, scale=1.0, batch=False):
+        """the great-circle distance, for (latitude, longitude) coordinates in degrees
+
+        Args:
+            radius (float): of the sphere, in the unit of the edge costs (km by default)
+            scale, batch: see `coordinate_heuristic`
+        """
+        super().__init__(scale, batch)
+        self.radius = float(radius)
+
+    def distance(self, a, b):
+        lat_a, lat_b = math.radians(a[0]), math.radians(b[0])
+        s = math.sin((lat_b - lat_a) / 2) ** 2 + \
+            math.cos(lat_a) * math.cos(lat_b) * math.sin(math.radians(b[1] - a[1]) / 2) ** 2
+        return 2 * self.radius * math.asin(min(1.0, math.sqrt(s)))
+
+    def distances(self, points, b):
+        lat_a, lon_a = np.radians(points[:, 0]), np.radians(points[:, 1])
+        lat_b, lon_b = math.radians(b[0]), math.radians(b[1])
+        s = np.sin((lat_b - lat_a) / 2) ** 2 + np.cos(lat_a) * math.cos(lat_b) * np.sin((lon_b - lon_a) / 2) ** 2
+        return 2 * self.radius * np.arcsin(np.minimum(1.0, np.sqrt(s)))
+
+
+class callable_heuristic(coordinate_heuristic):
+    def __init__(self, metric, vectorized=False, scale=1.0, batch=False):
+        """a user-defined metric on the node coordinates
+
+        Args:
+            metric (callable): (a, b) --> the distance between the points a and b (tuples of floats)
+            vectorized (bool): if True, `metric` also takes an (N, D) array as `a`
+                and returns the N distances (otherwise it is called point by point)
+            scale, batch: see `coordinate_heuristic`
+        """
+        super().__init__(scale, batch)
+        assert callable(metric)
+        self.metric = metric
+        self.vectorized = vectorized
+
+    def distance(self, a, b):
+        return self.metric(a, b)
+
+    def distances(self, points, b):
+        if self.vectorized:
+            return np.asarray(self.metric(points, tuple(b)), dtype=np.float64)
+        return super().distances(points, b)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from algo_forward import Astar
+    from algo_multigoal import MultiGoalAstar
+    from bench.generators import random_geometric_graph
+
+    # the great-circle distances reproduce the node weights (towards WB), and serve any other goal too
+    tcase = german_city_network_acc_de_wikipedia()
+    h = haversine_heuristic().bind(tcase.graph, "WB")
+    for city in tcase.graph.list_all_nodes():
+        assert abs(h(city) - tcase.graph.get_cost_node(city)) < 0.05 * tcase.graph.get_cost_node(city) + 1
+    for heuristic in (haversine_heuristic(), haversine_heuristic(batch=True)):
+        tcase.verify(Astar, heuristic=heuristic)
+        frozen = tcase.graph.freeze()
+        assert Astar("HB", "Frankfurt", frozen, heuristic=heuristic).solve() == \
+            Astar("HB", "Frankfurt", frozen, heuristic=lambda v: 0.0).solve()
+    print(MultiGoalAstar("SB", ["HB", "Frankfurt"], tcase.graph, heuristic=haversine_heuristic()).solve(k=2))
+
+    # the coordinates survive save/ load
+    path = os.path.join(tempfile.mkdtemp(), "german_cities.graph")
+    tcase.graph.save(path)
+    loaded = frozen_graph.load(path)
+    assert np.array_equal(loaded.coords, tcase.graph.freeze().coords)
+    assert loaded.thaw().get_coords("WB") == tcase.graph.get_coords("WB")
+
+    # one frozen graph, any goal, lazy vs batch vs the user's metric
+    sgraph = random_geometric_graph(200000, seed=5)
+    graph = sgraph.graph
+    rng = np.random.default_rng(0)
+    heuristics = {
+        "euclidean (lazy)": euclidean_heuristic(scale=sgraph.heuristic_scale),
+        "euclidean (batch)": euclidean_heuristic(scale=sgraph.heuristic_scale, batch=True),
+        "callable": callable_heuristic(math.dist, scale=sgraph.heuristic_scale),
+    }
+    for start, goal in rng.integers(0, graph.n_nodes, size=(3, 2)).astype(str).tolist():
+        reference = sgraph.heuristic_array(goal)
+        assert np.allclose(euclidean_heuristic(scale=sgraph.heuristic_scale).batch_values(graph, goal), reference)
+        costs = set()
+        for label, heuristic in heuristics.items():
+            t0 = time.perf_counter()
+            solver = Astar(start, goal, graph, heuristic=heuristic)
+            _, cost = solver.solve()
+            costs.add(None if cost is None else round(cost, 9))
+            print(f"{start} --> {goal}, {label}: {cost} in {(time.perf_counter() - t0) * 1e3:.1f} ms "
+                  f"({solver.iter} expansions)")
+        assert len(costs) == 1
@@ -2,6 +2,11 @@ from graph_rep import * # in order to
 from abc import ABC
 from numpy.testing import assert_almost_equal
 
+def path_cost(graph, path):
+    """the total edge cost along `path` (a sequence of node names), KeyError if an edge is missing"""
+    return sum(graph.get_cost_edge(parent, child) for parent, child in zip(path[:-1], path[1:]))
+
+
 class graph_algo_verifier(ABC):
     def __init__(self):
         """
@@ -14,6 +19,7 @@ class graph_algo_verifier(ABC):
         # None ==> no-solution
         self.true_min_cost = None
         # there might be non-unique globally minimal paths, so a tuple
+        # (None ==> not enumerated, any feasible path of cost `true_min_cost` is fine)
         self.tuple_global_soln = None 
         # a possible solution represents a globally optimal path, e.g.
         # soln1 == ("my Start", "B", "D", "E", "my goal")  # please use tuple!
@@ -35,6 +41,8 @@ class graph_algo_verifier(ABC):
             print("No feasible solution") 
         else:
             print(f"Global minimum path cost: {self.true_min_cost: .2f}")
+            if self.tuple_global_soln is None:
+                return
             print(f"The optimizer(s) can be:")
             for soln in self.tuple_global_soln:
                 print(" ", soln)
@@ -48,6 +56,7 @@ class graph_algo_verifier(ABC):
 
         Args:
             algo_class (type): _description_
+                (constructed as algo_class(start, goal, graph, **kwargs))
             num_expected_iter (int, optional):
                 this value is algorithm/ config-specific. If don't care, leave the defaults to None.
         """
@@ -58,8 +67,17 @@ class graph_algo_verifier(ABC):
 
         soln_path, soln_cost = solver.solve(validate_heuristics=True)
         # It makes more sense to first test whether the optimal cost are correct!
-        assert_almost_equal(soln_cost, self.true_min_cost)
-        assert soln_path in self.tuple_global_soln
+        if self.true_min_cost is None:
+            assert soln_path is None and soln_cost is None, f"expect no solution but got {soln_path}"
+        else:
+            assert_almost_equal(soln_cost, self.true_min_cost)
+        if self.tuple_global_soln is not None:
+            assert soln_path in self.tuple_global_soln
+        elif soln_path is not None:
+            # the optimal paths are not enumerated (e.g. for a big synthetic graph),
+            # so the path just has to be feasible and cost as much as claimed
+            assert soln_path[0] == self.start and soln_path[-1] == self.goal
+            assert_almost_equal(path_cost(self.graph, soln_path), soln_cost)
 
         if num_expected_iter is not None:
             assert isinstance(num_expected_iter,int) and num_expected_iter >= 1, "expect the expected number of iterations to be a positive integer!"
@@ -75,13 +93,15 @@ class german_city_network_acc_de_wikipedia(graph_algo_verifier):
         self.start = "SB" #Saarbrücke
         self.goal = "WB" #Würzburg
         net = directed_graph_weighted("German city network from SB to WB")
-        net.add_node("SB", 222.)
-        net.add_node("KL", 158.)
-        net.add_node("Frankfurt", 96.)
-        net.add_node("LH", 108)
-        net.add_node("KA", 140.)
-        net.add_node("HB", 87.)
-        net.add_node("WB", 0.)
+        # the node weights are the straight-line distances to WB,
+        # the coordinates (latitude, longitude) give them towards any city (see `haversine_heuristic`)
+        net.add_node("SB", 222., coords=(49.2402, 6.9969))
+        net.add_node("KL", 158., coords=(49.4447, 7.7690))
+        net.add_node("Frankfurt", 96., coords=(50.1109, 8.6821))
+        net.add_node("LH", 108, coords=(49.4774, 8.4452))
+        net.add_node("KA", 140., coords=(49.0069, 8.4037))
+        net.add_node("HB", 87., coords=(49.1427, 9.2109))
+        net.add_node("WB", 0., coords=(49.7913, 9.9534))
 
         
         net.add_edge("SB", "KL", 70.)
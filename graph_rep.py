@@ -1,3 +1,76 @@
+import gc
+import logging
+import os
+import sys
+from array import array
+from contextlib import contextmanager
+import numpy as np
+
+
+# what to do when a bulk constructor meets an edge that is already in the graph
+#   "ignore"    --- keep the existing edge (and its weight)
+#   "overwrite" --- keep the new edge weight
+#   "error"     --- raise a ValueError
+DUPLICATE_POLICIES = ("ignore", "overwrite", "error")
+
+INF = float("inf")
+
+# e.g. the (harmless) re-definitions of nodes/ edges are reported at the INFO level,
+# enable them via logging.getLogger("graph_rep").setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _check_duplicate_policy(on_duplicate):
+    if on_duplicate not in DUPLICATE_POLICIES:
+        raise ValueError(f"on_duplicate must be one of {DUPLICATE_POLICIES}, got {on_duplicate!r}")
+
+def _as_name_list(node_names):
+    # node names are always str, e.g. integer node IDs 3 --> "3"
+    return np.asarray(node_names).astype(str).tolist()
+
+def _iter_edge_list_file(path, delimiter=None, comment="#", skip_header=False):
+    """stream an edge-list file line by line
+
+    Each (non-empty, non-comment) line reads `parent child [edge_weight]`.
+    Unless given, the delimiter is inferred from the file extension:
+    ".csv" --> ",", ".tsv" --> tab, otherwise any whitespace.
+
+    Yields:
+        (parent, child) or (parent, child, edge_weight) tuples
+    """
+    if delimiter is None:
+        delimiter = {".csv": ",", ".tsv": "\t"}.get(os.path.splitext(str(path))[1].lower())
+    with open(path, "r", newline="") as f:
+        if skip_header:
+            next(f, None)
+        for line_no, line in enumerate(f, start=2 if skip_header else 1):
+            line = line.strip()
+            if not line or line.startswith(comment):
+                continue
+            fields = [field.strip() for field in line.split(delimiter)]
+            if len(fields) == 2:
+                yield fields[0], fields[1]
+            elif len(fields) == 3:
+                try:
+                    yield fields[0], fields[1], float(fields[2])
+                except ValueError:
+                    raise ValueError(f"{path}:{line_no}: invalid edge weight {fields[2]!r}") from None
+            else:
+                raise ValueError(f"{path}:{line_no}: expect 2 or 3 fields, got {len(fields)}")
+
+
+@contextmanager
+def _gc_paused():
+    # bulk loading creates millions of (non-cyclic) containers,
+    # which would otherwise trigger the cyclic garbage collector over and over
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
 class directed_graph:
     def __init__(self,name: str):
         # aka adjacency table/ more aptly "descendant table"
@@ -6,6 +79,10 @@ class directed_graph:
         assert isinstance(name, str)
         self.name = name
         self._adj = dict()
+        self._pred = dict() # the reverse index ("predecessor table"), kept in sync with _adj
+        self._subscribers = [] # see `subscribe`
+        # bumped by every change (of nodes, edges, or weights), e.g. to tell stale cached results
+        self.version = 0
         # how it should look like
         #   'node1':  set("node1's descendant node A" , "node1's descendant node B"
         #   ... 
@@ -17,9 +94,11 @@ class directed_graph:
     def add_node(self, node_name: str):
         assert isinstance(node_name, str)
         if node_name in self._adj.keys():
-            print(f"[Info] the node {node_name} was already in the graph!")
+            logger.info("the node %s was already in the graph!", node_name)
         else:
             self._adj[node_name] = set()
+            self._pred[node_name] = set()
+            self.version += 1
 
 
     def add_edge(self, parent_node: str, child_node: str):
@@ -30,14 +109,120 @@ class directed_graph:
         self.add_node(parent_node)
         self.add_node(child_node)
         if (parent_node in self._adj.keys()) and (child_node in self._adj[parent_node]):
-            print(f"[Info] the edge {parent_node} --> {child_node} was already in the graph!")
+            logger.info("the edge %s --> %s was already in the graph!", parent_node, child_node)
             return
         else:
             self._adj[parent_node].add(child_node)
+            self._pred[child_node].add(parent_node)
+            self.version += 1
+            self._notify_edge_change(parent_node, child_node, INF, 1.0)
+
+    def subscribe(self, callback):
+        """get notified of every edge insertion and edge cost change
+
+        Args:
+            callback (callable): called as callback(parent_node, child_node, old_cost, new_cost)
+                right after the change, where old_cost is inf for a new edge
+                (the edges of an unweighted graph count as unit cost)
+
+        The graph keeps a (strong) reference until `unsubscribe`.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
 
+    def _notify_edge_change(self, parent_node, child_node, old_cost, new_cost):
+        for callback in self._subscribers:
+            callback(parent_node, child_node, old_cost, new_cost)
+
+    def add_nodes_from(self, node_names):
+        """add many nodes at once (already existing ones are left untouched)"""
+        adj = self._adj
+        pred = self._pred
+        self.version += 1
+        for node_name in node_names:
+            assert isinstance(node_name, str)
+            if node_name not in adj:
+                adj[node_name] = set()
+                pred[node_name] = set()
+
+    def add_edges_from(self, edges, on_duplicate="ignore"):
+        """add many edges in a single pass
+
+        Args:
+            edges (iterable): of (parent, child) tuples,
+                a third element (edge weight) is accepted but ignored here
+            on_duplicate (str): see `DUPLICATE_POLICIES`
+                (for an unweighted graph, "overwrite" is the same as "ignore")
+
+        Missing nodes are added on the fly.
+        """
+        _check_duplicate_policy(on_duplicate)
+        self.version += 1
+        with _gc_paused():
+            self._add_edges_from(edges, on_duplicate)
+
+    def _add_edges_from(self, edges, on_duplicate):
+        adj = self._adj
+        pred = self._pred
+        notify = self._notify_edge_change if self._subscribers else None
+        for edge in edges:
+            parent_node, child_node = edge[0], edge[1]
+            assert isinstance(parent_node, str) and isinstance(child_node, str)
+            assert parent_node != child_node, "self looping prohibited"
+            if child_node not in adj:
+                adj[child_node] = set()
+                pred[child_node] = set()
+            children = adj.get(parent_node)
+            if children is None:
+                children = adj[parent_node] = set()
+                pred[parent_node] = set()
+            elif child_node in children:
+                if on_duplicate == "error":
+                    raise ValueError(f"the edge {parent_node} --> {child_node} was already in the graph!")
+                continue
+            children.add(child_node)
+            pred[child_node].add(parent_node)
+            if notify is not None:
+                notify(parent_node, child_node, INF, 1.0)
+
+    @classmethod
+    def from_edge_arrays(cls, name: str, parents, children, weights=None, on_duplicate="ignore"):
+        """build a graph from parallel arrays (e.g. NumPy) of parent and child nodes
+
+        Node IDs which are not str (e.g. integers) are converted to str.
+        `weights` is only relevant for weighted graphs.
+        """
+        parents = _as_name_list(parents)
+        children = _as_name_list(children)
+        assert len(parents) == len(children), "parents and children must have the same length"
+        if weights is None:
+            edges = zip(parents, children)
+        else:
+            weights = np.asarray(weights, dtype=np.float64).tolist()
+            assert len(weights) == len(parents), "weights and parents must have the same length"
+            edges = zip(parents, children, weights)
+        graph = cls(name)
+        graph.add_edges_from(edges, on_duplicate=on_duplicate)
+        return graph
+
+    @classmethod
+    def from_edge_list_file(cls, path, name=None, delimiter=None, comment="#", skip_header=False, on_duplicate="ignore"):
+        """build a graph from a (CSV/ TSV/ whitespace-separated) edge-list file
+
+        The file is streamed, see `_iter_edge_list_file` for the format.
+        """
+        graph = cls(str(path) if name is None else name)
+        graph.add_edges_from(
+            _iter_edge_list_file(path, delimiter=delimiter, comment=comment, skip_header=skip_header),
+            on_duplicate=on_duplicate)
+        return graph
     
     def list_all_nodes(self):
         return set(self._adj.keys())
+    def list_parent_nodes(self, node_name):
+        return set(self._pred[node_name])
     def list_leaf_nodes(self):
         out = set()
         for node in self._adj.keys():
@@ -68,38 +253,726 @@ class directed_graph:
         print(self)
 
     def viz(self):
-        # maybe use igraph? (maybe also use igraph for serializing the graph object)
+        # maybe use igraph? (for serializing the graph object, see `save`)
         pass
 
+    def freeze(self):
+        """compile the graph into a compact, read-only `frozen_graph`
+
+        Edges of an unweighted graph get a unit cost (i.e. hop count).
+        Later changes to this graph are NOT reflected in the frozen one.
+        """
+        return frozen_graph.from_graph(self)
+
+    def save(self, path):
+        """persist the graph (see `graph_store` for the binary format)"""
+        self.freeze().save(path)
+
+    @classmethod
+    def load(cls, path):
+        """read a graph written by `save` back into a mutable graph
+
+        (use `frozen_graph.load` for the memory-mapped, read-only variant)
+        """
+        frozen = frozen_graph.load(path, mmap=False)
+        if issubclass(cls, directed_graph_weighted):
+            return frozen.thaw()
+        graph = cls(frozen.name)
+        names = list(frozen._names)
+        graph.add_nodes_from(names)
+        parents = np.repeat(np.arange(frozen.n_nodes), np.diff(frozen.offsets))
+        graph.add_edges_from(zip((names[i] for i in parents.tolist()),
+                                 (names[j] for j in frozen.targets.tolist())))
+        return graph
+
+    def has_node(self, node_name):
+        return node_name in self._adj
+
+    # ---- node access used by the search algorithms ----
+    # The algorithms address nodes through "node keys".
+    # Here a node key is simply the node name,
+    # whereas `frozen_graph` uses integer indices instead.
+    def _key_of(self, node_name):
+        return node_name
+    def _name_of(self, node_key):
+        return node_key
+    def _all_node_keys(self):
+        return self._adj.keys()
+    def _children_of(self, node_key):
+        return self._adj[node_key]
+    def _parents_of(self, node_key):
+        return self._pred[node_key]
+
 class directed_graph_weighted(directed_graph):
     def __init__(self,name: str):
         super().__init__(name)
         self._cost_edge = dict()
         self._cost_node = dict() # could be used for heuristic cost-to-go
-    def add_node(self, node_name, node_weight = 0.0):
+        self._coords = dict() # the node positions (tuples of floats), see `set_coords`
+    def add_node(self, node_name, node_weight = 0.0, coords = None):
         assert isinstance(node_weight, float) or isinstance(node_weight, int)
-        super().add_node(node_name)
+        is_new = node_name not in self._adj
+        super().add_node(node_name) # (bumps the version of a new node)
         self._cost_node[node_name] = node_weight
+        if coords is not None:
+            self._coords[node_name] = self._as_coords(coords)
+        if not is_new:
+            self.version += 1 # (its weight/ coordinates may have changed)
+
+    def _as_coords(self, coords):
+        coords = tuple(float(c) for c in coords)
+        if self._coords:
+            n_dims = len(next(iter(self._coords.values())))
+            assert len(coords) == n_dims, f"expect {n_dims} coordinates per node but got {coords}"
+        return coords
+
+    def set_coords(self, node_name, coords):
+        """the position of a node, e.g. (x, y) or (latitude, longitude) in degrees
+
+        Unlike the node weight (a cost-to-go towards ONE goal), positions serve any goal,
+        see the heuristics in coord_heuristics.py. Either every node or none should have one,
+        with the same number of coordinates.
+        """
+        assert node_name in self._adj, f"please first define the node {node_name}"
+        self._coords[node_name] = self._as_coords(coords)
+        self.version += 1
+
+    def set_coords_from(self, items):
+        """the bulk version of `set_coords`
+
+        Args:
+            items (iterable or dict): of (node name, coordinates) pairs
+        """
+        if isinstance(items, dict):
+            items = items.items()
+        for node_name, coords in items:
+            assert node_name in self._adj, f"please first define the node {node_name}"
+            self._coords[node_name] = self._as_coords(coords)
+        self.version += 1
+
+    def get_coords(self, node_name):
+        """the position of a node (None if it has none)"""
+        return self._coords.get(node_name)
     @staticmethod
     def get_edge_name(parent_node, child_node):
         return f"{parent_node}->{child_node}"
-    def add_edge(self, parent_node, child_node, edge_weight = 0.0):
+    def add_edge(self, parent_node, child_node, edge_weight = 1.0):
+        """add an edge between two existing nodes, with a unit cost unless given
+        (the same default as `add_edges_from` and the frozen constructors)"""
         assert isinstance(edge_weight, float) or isinstance(edge_weight, int)
         assert not parent_node == child_node, "self looping prohibited"
-        assert parent_node in self.list_all_nodes(), f"please first define the node {parent_node}"
-        assert child_node in self.list_all_nodes(), f"please first define the node {child_node}"
+        assert parent_node in self._adj, f"please first define the node {parent_node}"
+        assert child_node in self._adj, f"please first define the node {child_node}"
         edge_ID = directed_graph_weighted.get_edge_name(parent_node, child_node)
         if edge_ID in self._cost_edge.keys():
-            print(f"[Info] the edge {edge_ID} was already in the graph so your request is ignored!")
+            logger.info("the edge %s was already in the graph so your request is ignored!", edge_ID)
             return
         self._adj[parent_node].add(child_node)
+        self._pred[child_node].add(parent_node)
         self._cost_edge[edge_ID] = edge_weight
+        self.version += 1
+        self._notify_edge_change(parent_node, child_node, INF, edge_weight)
+
+    def set_cost_edge(self, parent_node, child_node, edge_weight):
+        """change the cost of an existing edge (and notify the subscribers)"""
+        assert isinstance(edge_weight, float) or isinstance(edge_weight, int)
+        edge_ID = directed_graph_weighted.get_edge_name(parent_node, child_node)
+        assert edge_ID in self._cost_edge, f"the edge {edge_ID} is not in the graph"
+        old_cost = self._cost_edge[edge_ID]
+        self._cost_edge[edge_ID] = edge_weight
+        self.version += 1
+        self._notify_edge_change(parent_node, child_node, old_cost, edge_weight)
+
+    def set_cost_edges_from(self, edges):
+        """the bulk version of `set_cost_edge`, e.g. for a batch of traffic updates
+
+        Args:
+            edges (iterable): of (parent, child, edge_weight) tuples
+        """
+        for parent_node, child_node, edge_weight in edges:
+            self.set_cost_edge(parent_node, child_node, edge_weight)
+
+    def add_nodes_from(self, nodes):
+        """add many nodes at once
+
+        Args:
+            nodes (iterable): of node names or (node name, node weight) tuples,
+                the node weight of a node already in the graph gets updated.
+        """
+        adj = self._adj
+        pred = self._pred
+        cost_node = self._cost_node
+        self.version += 1
+        for node in nodes:
+            if isinstance(node, str):
+                node_name, node_weight = node, 0.0
+            else:
+                node_name, node_weight = node
+            assert isinstance(node_name, str)
+            assert isinstance(node_weight, float) or isinstance(node_weight, int)
+            if node_name not in adj:
+                adj[node_name] = set()
+                pred[node_name] = set()
+            cost_node[node_name] = node_weight
+
+    def add_edges_from(self, edges, on_duplicate="ignore"):
+        """add many edges in a single pass
+
+        Args:
+            edges (iterable): of (parent, child, edge_weight) tuples
+                (or (parent, child) tuples, then the edge gets a unit cost,
+                like the edges of `directed_graph` and the frozen constructors)
+            on_duplicate (str): see `DUPLICATE_POLICIES`
+
+        Missing nodes are added on the fly with a node weight of 0.0
+        (use `add_nodes_from` beforehand to define their weights).
+        """
+        _check_duplicate_policy(on_duplicate)
+        self.version += 1
+        with _gc_paused():
+            self._add_edges_from(edges, on_duplicate)
+
+    def _add_edges_from(self, edges, on_duplicate):
+        adj = self._adj
+        pred = self._pred
+        cost_node = self._cost_node
+        cost_edge = self._cost_edge
+        notify = self._notify_edge_change if self._subscribers else None
+        for edge in edges:
+            parent_node, child_node = edge[0], edge[1]
+            edge_weight = edge[2] if len(edge) > 2 else 1.0
+            assert isinstance(parent_node, str) and isinstance(child_node, str)
+            assert isinstance(edge_weight, float) or isinstance(edge_weight, int)
+            assert parent_node != child_node, "self looping prohibited"
+            if child_node not in adj:
+                adj[child_node] = set()
+                pred[child_node] = set()
+                cost_node[child_node] = 0.0
+            children = adj.get(parent_node)
+            if children is None:
+                children = adj[parent_node] = set()
+                pred[parent_node] = set()
+                cost_node[parent_node] = 0.0
+            elif child_node in children:
+                if on_duplicate == "error":
+                    raise ValueError(f"the edge {parent_node}->{child_node} was already in the graph!")
+                if on_duplicate == "ignore":
+                    continue
+            edge_ID = f"{parent_node}->{child_node}"
+            if notify is not None:
+                old_cost = cost_edge.get(edge_ID, INF)
+            children.add(child_node)
+            pred[child_node].add(parent_node)
+            cost_edge[edge_ID] = edge_weight
+            if notify is not None:
+                notify(parent_node, child_node, old_cost, edge_weight)
+
     def get_cost_node(self, node_name):
         return self._cost_node[node_name]
         
     def get_cost_edge(self, parent_node, child_node):
         return self._cost_edge[self.get_edge_name(parent_node, child_node)]
 
+    def _children_with_cost_of(self, node_key):
+        cost_edge = self._cost_edge
+        return [(child, cost_edge[f"{node_key}->{child}"]) for child in self._adj[node_key]]
+    def _parents_with_cost_of(self, node_key):
+        cost_edge = self._cost_edge
+        return [(parent, cost_edge[f"{parent}->{node_key}"]) for parent in self._pred[node_key]]
+    def _node_cost_of(self, node_key):
+        return self._cost_node[node_key]
+    def _coords_of(self, node_key):
+        return self._coords[node_key]
+
+    def distance_matrix(self, sources, targets, return_predecessors=False, hierarchy=None):
+        """shortest path costs between every (source, target) pair, on the frozen graph
+        (see `algo_dp.distance_matrix`)"""
+        from algo_dp import distance_matrix
+        return distance_matrix(self, sources, targets, return_predecessors, hierarchy)
+
+
+class node_name_table:
+    def __init__(self, blob, name_offsets, name_order):
+        """A read-only table of node names, backed by a utf-8 blob
+
+        Args:
+            blob (uint8 array): all node names (utf-8), concatenated
+            name_offsets (int array, shape (N+1,)):
+                the name of node i is blob[name_offsets[i]:name_offsets[i+1]]
+            name_order (int array, shape (N,)): node indices sorted by their (utf-8) names
+
+        Names are only decoded on demand and looked up by binary search,
+        so nothing is done per node upfront, e.g. when the arrays are
+        memory-mapped from a file (see `graph_store`).
+        """
+        self._blob = blob
+        self._name_offsets = name_offsets
+        self._name_order = name_order
+
+    @classmethod
+    def from_names(cls, node_names):
+        encoded = [n.encode("utf-8") for n in node_names]
+        name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=name_offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        name_order = np.array(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int64)
+        return cls(blob, name_offsets, name_order)
+
+    @classmethod
+    def numbered(cls, n_nodes):
+        """the names "0", "1", ..., str(n_nodes - 1), built without any per-node Python object"""
+        fixed_width = np.arange(n_nodes).astype(bytes) # zero-padded to the widest name
+        width = fixed_width.dtype.itemsize
+        if n_nodes == 0:
+            return cls(np.zeros(0, dtype=np.uint8), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        chars = fixed_width.view(np.uint8).reshape(n_nodes, width)
+        name_offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.count_nonzero(chars, axis=1), out=name_offsets[1:])
+        blob = chars[chars != 0]
+        name_order = np.argsort(fixed_width, kind="stable").astype(np.int64)
+        return cls(blob, name_offsets, name_order)
+
+    def __len__(self):
+        return len(self._name_order)
+
+    def _encoded(self, node_index):
+        return self._blob[self._name_offsets[node_index]:self._name_offsets[node_index + 1]].tobytes()
+
+    def __getitem__(self, node_index):
+        return self._encoded(node_index).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def find(self, node_name):
+        """the index of the node, or -1 if there is no such node"""
+        if not isinstance(node_name, str):
+            return -1
+        target = node_name.encode("utf-8")
+        lo, hi = 0, len(self._name_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._encoded(self._name_order[mid]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._name_order):
+            node_index = int(self._name_order[lo])
+            if self._encoded(node_index) == target:
+                return node_index
+        return -1
+
+    # so that it can serve as the name --> index mapping, too
+    def __contains__(self, node_name):
+        return self.find(node_name) >= 0
+
+    def index_of(self, node_name):
+        node_index = self.find(node_name)
+        if node_index < 0:
+            raise KeyError(node_name)
+        return node_index
+
+
+class frozen_graph:
+    def __init__(self, name: str, node_names, offsets, targets, cost_edge, cost_node, coords=None):
+        """A read-only, integer-indexed directed graph in CSR layout
+
+        Typically obtained via `directed_graph(_weighted).freeze()`.
+
+        Args:
+            name (str):
+            node_names (sequence of str or node_name_table):
+                the name of node i is node_names[i]
+                (or another frozen_graph to share its node names with)
+            offsets (int array, shape (N+1,)):
+                the children of node i are targets[offsets[i]:offsets[i+1]]
+            targets (int array, shape (E,)): child node indices, sorted within each row
+            cost_edge (float array, shape (E,)): parallel to `targets`
+            cost_node (float array, shape (N,)): e.g. heuristic cost-to-go
+            coords (float array, shape (N, D), optional): the node positions
+                (see `directed_graph_weighted.set_coords`), None if there are none
+
+        Attributes:
+            store_path (str or None): the file the arrays are memory-mapped from
+                (see `load`), e.g. for other processes to map the same file
+
+        Remarks:
+        * node names are interned and only used at the boundary,
+          i.e. to look up the start/ goal and to report the path,
+          the search algorithms work on the integer indices internally.
+        * the arrays are flagged non-writeable
+        """
+        assert isinstance(name, str)
+        self.name = name
+        if isinstance(node_names, frozen_graph):
+            self._names = node_names._names
+            self._index = node_names._index
+            self._index_of = node_names._index_of
+        elif isinstance(node_names, node_name_table):
+            self._names = node_names
+            self._index = node_names
+            self._index_of = node_names.index_of
+        else:
+            self._names = [sys.intern(n) for n in node_names]
+            self._index = {n: i for i, n in enumerate(self._names)}
+            self._index_of = self._index.__getitem__
+            assert len(self._index) == len(self._names), "node names must be unique"
+
+        n_nodes = len(self._names)
+        index_dtype = np.int32 if n_nodes < 2**31 else np.int64
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        self.targets = np.ascontiguousarray(targets, dtype=index_dtype)
+        self.cost_edge = np.ascontiguousarray(cost_edge, dtype=np.float64)
+        self.cost_node = np.ascontiguousarray(cost_node, dtype=np.float64)
+        assert self.offsets.shape == (n_nodes + 1,)
+        assert self.cost_node.shape == (n_nodes,)
+        assert self.targets.shape == self.cost_edge.shape == (int(self.offsets[-1]),)
+        if coords is None:
+            self.coords = None
+        else:
+            self.coords = np.ascontiguousarray(coords, dtype=np.float64)
+            assert self.coords.ndim == 2 and len(self.coords) == n_nodes
+            self.coords.flags.writeable = False
+        for arr in (self.offsets, self.targets, self.cost_edge, self.cost_node):
+            arr.flags.writeable = False
+        self._reverse = None
+        self.store_path = None
+        self.version = 0 # (never changes, see `directed_graph`)
+
+    @classmethod
+    def from_graph(cls, graph: directed_graph):
+        names = list(graph._adj.keys())
+        index = {n: i for i, n in enumerate(names)}
+        is_weighted = isinstance(graph, directed_graph_weighted)
+
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        targets = []
+        cost_edge = []
+        for i, parent in enumerate(names):
+            if is_weighted:
+                row = sorted((index[child], cost) for child, cost in graph._children_with_cost_of(parent))
+            else:
+                row = sorted((index[child], 1.0) for child in graph._adj[parent])
+            targets.extend(child for child, _ in row)
+            cost_edge.extend(cost for _, cost in row)
+            offsets[i + 1] = len(targets)
+
+        coords = None
+        if is_weighted:
+            cost_node = [graph._cost_node[n] for n in names]
+            if graph._coords:
+                missing = [n for n in names if n not in graph._coords]
+                assert not missing, f"the nodes {missing[:5]} have no coordinates (either all nodes or none)"
+                coords = [graph._coords[n] for n in names]
+        else:
+            cost_node = np.zeros(len(names))
+        return cls(graph.name, names, offsets, targets, cost_edge, cost_node, coords)
+
+    @classmethod
+    def from_edge_arrays(cls, name: str, parents, children, weights=None,
+                         node_names=None, cost_node=None, coords=None, on_duplicate="ignore"):
+        """build the CSR arrays directly (vectorized, no intermediate dict graph)
+
+        Args:
+            parents, children (arrays):
+                either integer node indices (into `node_names`),
+                or node names (then nodes are numbered in sorted name order)
+            weights (float array, optional): edge costs, unit costs if None
+            node_names (sequence of str or node_name_table, optional):
+                only for integer indices, defaults to "0", "1", ... (see `node_name_table.numbered`)
+            cost_node (float array, optional): defaults to zeros
+            coords (float array, shape (N, D), optional): the node positions, by node index
+            on_duplicate (str): see `DUPLICATE_POLICIES`
+        """
+        _check_duplicate_policy(on_duplicate)
+        parents = np.asarray(parents)
+        children = np.asarray(children)
+        assert parents.shape == children.shape and parents.ndim == 1
+        if parents.dtype.kind in "iu" and children.dtype.kind in "iu":
+            src = parents.astype(np.int64, copy=False)
+            dst = children.astype(np.int64, copy=False)
+            if node_names is None:
+                n_nodes = int(max(src.max(initial=-1), dst.max(initial=-1))) + 1
+                node_names = node_name_table.numbered(n_nodes)
+            n_nodes = len(node_names)
+            if len(src) and (min(src.min(), dst.min()) < 0 or max(src.max(), dst.max()) >= n_nodes):
+                raise ValueError("node index out of range")
+        else:
+            assert node_names is None, "node_names is only supported along with integer node indices"
+            names, inverse = np.unique(np.concatenate([parents.astype(str), children.astype(str)]),
+                                       return_inverse=True)
+            node_names = names.tolist()
+            n_nodes = len(node_names)
+            src, dst = inverse[:len(parents)].astype(np.int64), inverse[len(parents):].astype(np.int64)
+        if np.any(src == dst):
+            raise ValueError("self looping prohibited")
+
+        if weights is None:
+            weights = np.ones(len(src))
+        weights = np.asarray(weights, dtype=np.float64)
+        assert weights.shape == src.shape
+
+        # sort by (parent, child), the sorting is stable so duplicates keep their input order
+        if n_nodes < 2**31:
+            order = np.argsort(src * n_nodes + dst, kind="stable") # (faster than a lexsort)
+        else:
+            order = np.lexsort((dst, src))
+        src, dst, weights = src[order], dst[order], weights[order]
+        del order
+        is_repeated = (src[1:] == src[:-1]) & (dst[1:] == dst[:-1])
+        if is_repeated.any():
+            if on_duplicate == "error":
+                k = int(np.argmax(is_repeated))
+                raise ValueError(f"the edge {node_names[src[k]]}->{node_names[dst[k]]} is repeated!")
+            if on_duplicate == "ignore": # keep the first one
+                keep = np.concatenate([[True], ~is_repeated])
+            else: # keep the last one
+                keep = np.concatenate([~is_repeated, [True]])
+            src, dst, weights = src[keep], dst[keep], weights[keep]
+
+        offsets = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n_nodes), out=offsets[1:])
+        if cost_node is None:
+            cost_node = np.zeros(n_nodes)
+        return cls(name, node_names, offsets, dst, weights, cost_node, coords)
+
+    @classmethod
+    def from_edge_list_file(cls, path, name=None, delimiter=None, comment="#", skip_header=False,
+                            on_duplicate="ignore"):
+        """the frozen counterpart of `directed_graph.from_edge_list_file`
+
+        Lines without an edge weight get a unit cost.
+        """
+        index = dict()
+        src = array("q")
+        dst = array("q")
+        weights = array("d")
+        for edge in _iter_edge_list_file(path, delimiter=delimiter, comment=comment, skip_header=skip_header):
+            src.append(index.setdefault(edge[0], len(index)))
+            dst.append(index.setdefault(edge[1], len(index)))
+            weights.append(edge[2] if len(edge) > 2 else 1.0)
+        return cls.from_edge_arrays(str(path) if name is None else name,
+                                    np.frombuffer(src, dtype=np.int64),
+                                    np.frombuffer(dst, dtype=np.int64),
+                                    np.frombuffer(weights, dtype=np.float64),
+                                    node_names=list(index), on_duplicate=on_duplicate)
+
+    def save(self, path):
+        """write the graph in the binary format of `graph_store`"""
+        from graph_store import save_frozen_graph
+        save_frozen_graph(self, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """read a graph written by `save`
+
+        With mmap=True, the arrays (incl. the node names) are memory-mapped
+        (zero-copy, read-only), so processes loading the same file
+        share one page-cached copy.
+        """
+        from graph_store import load_frozen_graph
+        return load_frozen_graph(path, mmap=mmap)
+
+    def reverse(self):
+        """the same graph with every edge flipped, i.e. the predecessor table in CSR layout
+
+        (computed once and cached, since the graph is read-only)
+        """
+        if self._reverse is None:
+            parents = np.repeat(np.arange(self.n_nodes, dtype=self.targets.dtype), np.diff(self.offsets))
+            # the parents are already sorted, a stable sort keeps them so within each row
+            order = np.argsort(self.targets, kind="stable")
+            offsets = np.zeros(self.n_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.targets, minlength=self.n_nodes), out=offsets[1:])
+            reverse = frozen_graph(self.name + " (reversed)", self, offsets,
+                                   parents[order], self.cost_edge[order], self.cost_node, self.coords)
+            reverse._reverse = self
+            self._reverse = reverse
+        return self._reverse
+
+    def distance_matrix(self, sources, targets, return_predecessors=False, hierarchy=None):
+        """shortest path costs between every (source, target) pair (see `algo_dp.distance_matrix`)"""
+        from algo_dp import distance_matrix
+        return distance_matrix(self, sources, targets, return_predecessors, hierarchy)
+
+    def thaw(self):
+        """a mutable `directed_graph_weighted` copy of this graph"""
+        graph = directed_graph_weighted(self.name)
+        names = list(self._names)
+        graph.add_nodes_from(zip(names, self.cost_node.tolist()))
+        parents = np.repeat(np.arange(self.n_nodes), np.diff(self.offsets))
+        graph.add_edges_from(zip((names[i] for i in parents.tolist()),
+                                 (names[j] for j in self.targets.tolist()),
+                                 self.cost_edge.tolist()))
+        if self.coords is not None:
+            graph.set_coords_from(zip(names, self.coords.tolist()))
+        return graph
+
+    @property
+    def n_nodes(self):
+        return len(self._names)
+    @property
+    def n_edges(self):
+        return len(self.targets)
+
+    def index_of(self, node_name):
+        return self._index_of(node_name)
+    def name_of(self, node_index):
+        return self._names[node_index]
+
+    def has_node(self, node_name):
+        return node_name in self._index
+    def list_all_nodes(self):
+        return set(self._names)
+    def list_parent_nodes(self, node_name):
+        return set(self._names[p] for p in self._parents_of(self._index_of(node_name)))
+    def list_leaf_nodes(self):
+        out_degree = np.diff(self.offsets)
+        return set(self._names[i] for i in np.flatnonzero(out_degree == 0))
+
+    def get_cost_node(self, node_name):
+        return float(self.cost_node[self._index_of(node_name)])
+    def get_cost_edge(self, parent_node, child_node):
+        i = self._index_of(parent_node)
+        j = self._index_of(child_node)
+        a, b = self.offsets[i], self.offsets[i + 1]
+        k = a + np.searchsorted(self.targets[a:b], j)
+        if k == b or self.targets[k] != j:
+            raise KeyError(f"{parent_node}->{child_node}")
+        return float(self.cost_edge[k])
+
+    def __str__(self):
+        out = "-"*20 + "\nGraph name: " + self.name + " (frozen)\n"
+        out += f" contains {self.n_nodes} nodes and {self.n_edges} directed edges:\n"
+        for i, node in enumerate(self._names):
+            children = self._children_of(i)
+            if len(children) == 0:
+                out += f"{node} (which is a leaf node)\n"
+            else:
+                out += f"{node} --> {set(self._names[c] for c in children)} \n"
+        out += "-"*20
+        return out
+
+    # ---- node access used by the search algorithms (see `directed_graph`) ----
+    def _key_of(self, node_name):
+        return self._index_of(node_name)
+    def _name_of(self, node_key):
+        return self._names[node_key]
+    def _all_node_keys(self):
+        return range(self.n_nodes)
+    def _children_of(self, node_key):
+        return self.targets[self.offsets[node_key]:self.offsets[node_key + 1]].tolist()
+    def _children_with_cost_of(self, node_key):
+        a, b = self.offsets[node_key], self.offsets[node_key + 1]
+        return zip(self.targets[a:b].tolist(), self.cost_edge[a:b].tolist())
+    def _node_cost_of(self, node_key):
+        return float(self.cost_node[node_key])
+    def _coords_of(self, node_key):
+        return tuple(self.coords[node_key].tolist())
+    def _parents_of(self, node_key):
+        return self.reverse()._children_of(node_key)
+    def _parents_with_cost_of(self, node_key):
+        return self.reverse()._children_with_cost_of(node_key)
+
+
+class tuple_codec:
+    def __init__(self, shape):
+        """packs a tuple of bounded non-negative integers (e.g. the cell and heading of a
+        lattice state) into a single int and back (mixed radix), to hash states compactly
+
+        Args:
+            shape (tuple of int): the (exclusive) upper bound of every component
+
+        e.g. tuple_codec((1000, 1000, 16)).encode((3, 7, 5)) == (3 * 1000 + 7) * 16 + 5
+        """
+        self.shape = tuple(int(s) for s in shape)
+        assert all(s >= 1 for s in self.shape)
+
+    def encode(self, state):
+        key = 0
+        for x, s in zip(state, self.shape):
+            assert 0 <= x < s, f"{state} is out of bounds {self.shape}"
+            key = key * s + x
+        return key
+
+    def decode(self, key):
+        out = []
+        for s in reversed(self.shape):
+            key, x = divmod(key, s)
+            out.append(x)
+        return tuple(reversed(out))
+
+
+class implicit_graph:
+    def __init__(self, name: str, successors, heuristic=None, predecessors=None,
+                 is_valid=None, encode=None, decode=None):
+        """a graph given by its successor function, i.e. nodes/ edges are generated on demand
+        (and never stored by the graph), e.g. for huge state spaces like motion-planning lattices
+
+        Args:
+            name (str):
+            successors (callable): successors(state) --> iterable of (child state, edge cost)
+            heuristic (callable, optional): heuristic(state), the cost-to-go estimate
+                the solvers use by default (the counterpart of the node weights, default 0)
+            predecessors (callable, optional): predecessors(state) --> iterable of
+                (parent state, edge cost), needed by the backward/ bidirectional methods only
+            is_valid (callable, optional): is_valid(state), whether it is a node (default: any)
+            encode, decode (callable, optional): a compact, hashable node key of a state
+                and back (e.g. `tuple_codec`), by default the states themselves are the keys
+
+        Node keys (see `directed_graph`) are the encoded states, so the solvers only
+        hold compact keys in their tables, while the callables above get the states.
+        A heuristic passed to a solver directly gets the node keys, like for a `frozen_graph`.
+        """
+        assert callable(successors)
+        self.name = name
+        self._successors = successors
+        self._heuristic = heuristic
+        self._predecessors = predecessors
+        self._is_valid = is_valid
+        self._encode = encode
+        self._decode = decode
+        self.version = 0 # (the successor function is assumed to be fixed, see `directed_graph`)
+
+    def has_node(self, node_name):
+        return self._is_valid is None or bool(self._is_valid(node_name))
+
+    def get_cost_edge(self, parent_node, child_node):
+        for child, cost in self._successors(parent_node):
+            if child == child_node:
+                return cost
+        raise KeyError(f"{parent_node}->{child_node}")
+
+    def __str__(self):
+        return f"Graph name: {self.name} (implicit)"
+
+    # ---- node access used by the search algorithms (see `directed_graph`) ----
+    def _key_of(self, node_name):
+        return node_name if self._encode is None else self._encode(node_name)
+    def _name_of(self, node_key):
+        return node_key if self._decode is None else self._decode(node_key)
+    def _children_of(self, node_key):
+        return [child for child, _ in self._children_with_cost_of(node_key)]
+    def _children_with_cost_of(self, node_key):
+        encode = self._encode
+        successors = self._successors(self._name_of(node_key))
+        if encode is None:
+            return successors
+        return [(encode(child), cost) for child, cost in successors]
+    def _node_cost_of(self, node_key):
+        return 0.0 if self._heuristic is None else self._heuristic(self._name_of(node_key))
+    def _parents_with_cost_of(self, node_key):
+        assert self._predecessors is not None, "the graph has no predecessor function"
+        encode = self._encode
+        predecessors = self._predecessors(self._name_of(node_key))
+        if encode is None:
+            return predecessors
+        return [(encode(parent), cost) for parent, cost in predecessors]
+    def _parents_of(self, node_key):
+        return [parent for parent, _ in self._parents_with_cost_of(node_key)]
+
+
 def test_directed_graph():
     print("creating & editing a graph")
     A = directed_graph("A dummy graph")
@@ -139,6 +1012,12 @@ def test_directed_weighted_graph():
     print(A.get_cost_node('B'))
     print(A.get_cost_edge('H','A'))
 
+    print("let's freeze it!")
+    F = A.freeze()
+    print(F)
+    print(F.get_cost_node('B'))
+    print(F.get_cost_edge('H','A'))
+
 if __name__ == "__main__":
     test_directed_graph()
     test_directed_weighted_graph()
@@ -0,0 +1,159 @@
+"""A versioned binary on-disk format for (frozen) weighted graphs
+
+Layout (all little-endian, every section starts at a multiple of 64 bytes):
+
+    header (64 bytes)
+        magic           8s   b"GRAPHCSR"
+        version         u4   FORMAT_VERSION
+        flags           u4   bit 0: targets stored as int64 (otherwise int32)
+                             bits 8-15: the number D of coordinates per node (0: no coordinates)
+        n_nodes         u8
+        n_edges         u8
+        graph_name_len  u8   (bytes)
+        names_blob_len  u8   (bytes)
+        (zero padding)
+    graph name      utf-8
+    name_offsets    int64[n_nodes+1]   node i's name is names_blob[name_offsets[i]:name_offsets[i+1]]
+    name_order      int64[n_nodes]     node indices sorted by name (for lookups by binary search)
+    names_blob      uint8[names_blob_len]
+    offsets         int64[n_nodes+1]   CSR row offsets
+    targets         int32/int64[n_edges]
+    cost_edge       float64[n_edges]
+    cost_node       float64[n_nodes]
+    coords          float64[n_nodes*D]  node i's position is coords[i*D:(i+1)*D] (absent if D = 0)
+
+Since the section positions follow from the header alone,
+a memory-mapped file is turned into arrays without reading (or copying) anything.
+"""
+import mmap as _mmap
+import os
+import struct
+import numpy as np
+from graph_rep import frozen_graph, node_name_table
+
+__all__ = ["FORMAT_VERSION", "save_frozen_graph", "load_frozen_graph"]
+
+MAGIC = b"GRAPHCSR"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIQQQQ")
+_ALIGN = 64
+_FLAG_TARGETS_INT64 = 1
+_FLAG_N_DIMS_SHIFT = 8 # (older files have D = 0, i.e. no coordinates)
+
+
+def _padded(n_bytes):
+    return -(-n_bytes // _ALIGN) * _ALIGN
+
+def _section_layout(n_nodes, n_edges, graph_name_len, names_blob_len, targets_itemsize, n_dims=0):
+    """(name, dtype, count) of every section, along with its byte position"""
+    sections = [
+        ("graph_name", np.uint8, graph_name_len),
+        ("name_offsets", np.dtype("<i8"), n_nodes + 1),
+        ("name_order", np.dtype("<i8"), n_nodes),
+        ("names_blob", np.uint8, names_blob_len),
+        ("offsets", np.dtype("<i8"), n_nodes + 1),
+        ("targets", np.dtype(f"<i{targets_itemsize}"), n_edges),
+        ("cost_edge", np.dtype("<f8"), n_edges),
+        ("cost_node", np.dtype("<f8"), n_nodes),
+        ("coords", np.dtype("<f8"), n_nodes * n_dims),
+    ]
+    layout = []
+    pos = _padded(_HEADER.size)
+    for name, dtype, count in sections:
+        layout.append((name, np.dtype(dtype), count, pos))
+        pos = _padded(pos + np.dtype(dtype).itemsize * count)
+    return layout
+
+
+def save_frozen_graph(graph: frozen_graph, path):
+    if isinstance(graph._names, node_name_table):
+        names = graph._names
+    else:
+        names = node_name_table.from_names(graph._names)
+    graph_name = graph.name.encode("utf-8")
+    targets_itemsize = graph.targets.dtype.itemsize
+    flags = _FLAG_TARGETS_INT64 if targets_itemsize == 8 else 0
+    n_dims = 0 if graph.coords is None else graph.coords.shape[1]
+    assert n_dims < 256, "too many coordinates per node"
+    flags |= n_dims << _FLAG_N_DIMS_SHIFT
+
+    arrays = {
+        "graph_name": np.frombuffer(graph_name, dtype=np.uint8),
+        "name_offsets": names._name_offsets,
+        "name_order": names._name_order,
+        "names_blob": names._blob,
+        "offsets": graph.offsets,
+        "targets": graph.targets,
+        "cost_edge": graph.cost_edge,
+        "cost_node": graph.cost_node,
+        "coords": np.empty(0) if graph.coords is None else graph.coords.ravel(),
+    }
+    layout = _section_layout(graph.n_nodes, graph.n_edges, len(graph_name), len(names._blob),
+                             targets_itemsize, n_dims)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, flags, graph.n_nodes, graph.n_edges,
+                             len(graph_name), len(names._blob)))
+        for name, dtype, count, pos in layout:
+            f.write(b"\0" * (pos - f.tell()))
+            arr = np.ascontiguousarray(arrays[name], dtype=dtype)
+            assert len(arr) == count
+            f.write(arr.tobytes())
+        f.write(b"\0" * (_padded(f.tell()) - f.tell()))
+
+
+def load_frozen_graph(path, mmap=True):
+    """read a graph written by `save_frozen_graph`
+
+    Args:
+        mmap (bool): if True, map the file (read-only) instead of reading it,
+            the returned arrays then share the page cache with every other
+            process mapping the same file.
+    """
+    with open(path, "rb") as f:
+        if mmap:
+            buffer = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+
+    if len(buffer) < _HEADER.size:
+        raise ValueError(f"{path} is not a graph file (too short)")
+    magic, version, flags, n_nodes, n_edges, graph_name_len, names_blob_len = \
+        _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a graph file (bad magic {magic!r})")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {version}, only version {FORMAT_VERSION} is supported")
+
+    targets_itemsize = 8 if flags & _FLAG_TARGETS_INT64 else 4
+    n_dims = (flags >> _FLAG_N_DIMS_SHIFT) & 0xFF
+    layout = _section_layout(n_nodes, n_edges, graph_name_len, names_blob_len, targets_itemsize, n_dims)
+    _, dtype, count, pos = layout[-1]
+    if len(buffer) < pos + dtype.itemsize * count:
+        raise ValueError(f"{path} is truncated")
+    arrays = dict()
+    for name, dtype, count, pos in layout:
+        # zero-copy views into the buffer
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=pos)
+
+    names = node_name_table(arrays["names_blob"], arrays["name_offsets"], arrays["name_order"])
+    coords = arrays["coords"].reshape(n_nodes, n_dims) if n_dims else None
+    graph = frozen_graph(arrays["graph_name"].tobytes().decode("utf-8"), names,
+                         arrays["offsets"], arrays["targets"], arrays["cost_edge"], arrays["cost_node"], coords)
+    if mmap:
+        graph.store_path = os.path.abspath(path)
+    return graph
+
+
+if __name__ == "__main__":
+    import tempfile
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from algo_forward import Astar
+
+    tcase = german_city_network_acc_de_wikipedia()
+    path = os.path.join(tempfile.mkdtemp(), "german_cities.graph")
+    tcase.graph.save(path)
+    print(f"saved to {path} ({os.path.getsize(path)} bytes)")
+
+    tcase.graph = frozen_graph.load(path, mmap=True)
+    print(tcase.graph)
+    tcase.verify(Astar, num_expected_iter=6)
@@ -0,0 +1,88 @@
+import inspect
+from abc import ABC, abstractmethod
+
+__all__ = ["goal_heuristic", "resolve_heuristic", "resolve_heuristic_many", "HeuristicWarning",
+           "no_validation_kwargs"]
+
+class HeuristicWarning(UserWarning):
+    """issued by the solvers when the heuristic turns out to be inadmissible/ inconsistent,
+    i.e. the solution might be sub-optimal (filter it via the `warnings` module)"""
+
+
+class goal_heuristic(ABC):
+    """A heuristic that is NOT tied to a single goal (unlike the node weights of a graph)
+
+    It is bound to the goal of each query, so one instance
+    (and one graph) can serve any number of goals at the same time.
+    """
+    @abstractmethod
+    def bind(self, graph, goal: str):
+        """
+        Args:
+            graph: the graph the search runs on
+            goal (str):
+
+        Returns:
+            h (callable): node key --> (optimistic) cost-to-go towards `goal`,
+                where the node key is whatever `graph` uses internally
+                (node names for a `directed_graph_weighted`, node indices for a `frozen_graph`)
+        """
+
+    def bind_reverse(self, graph, start: str):
+        """the same as `bind` but estimating the cost-to-come FROM `start`
+        (e.g. for the backward half of a bidirectional search), if supported"""
+        raise NotImplementedError(f"{type(self).__name__} does not support reverse estimates")
+
+    def bind_many(self, graph, goals):
+        """the same as `bind` but towards the nearest of several `goals`,
+        i.e. the minimum of their estimates (still admissible/ consistent if each one is)
+
+        This default evaluates them one by one, override it to do better.
+        """
+        hs = [self.bind(graph, goal) for goal in goals]
+        if len(hs) == 1:
+            return hs[0]
+        return lambda v: min(h(v) for h in hs)
+
+
+def resolve_heuristic(heuristic, graph, goal, reverse=False):
+    """the h(node key) callable a solver should use
+
+    Args:
+        heuristic: one of
+            * None --- the node weights of the graph
+            * a `goal_heuristic` --- bound to `goal`
+            * a callable --- used as is
+        reverse (bool): if True, `goal` is in fact the start (see `goal_heuristic.bind_reverse`)
+    """
+    if heuristic is None:
+        return graph._node_cost_of
+    if isinstance(heuristic, goal_heuristic):
+        return heuristic.bind_reverse(graph, goal) if reverse else heuristic.bind(graph, goal)
+    assert callable(heuristic), "the heuristic should be a callable or a goal_heuristic"
+    return heuristic
+
+
+def resolve_heuristic_many(heuristic, graph, goals):
+    """the same as `resolve_heuristic` towards the nearest of several `goals`
+
+    Args:
+        heuristic: one of
+            * None --- h = 0 (the node weights of a graph refer to a single goal)
+            * a `goal_heuristic` --- see `goal_heuristic.bind_many`
+            * a callable --- used as is (it should bound the cost to the nearest goal)
+    """
+    if heuristic is None:
+        return lambda v: 0.0
+    if isinstance(heuristic, goal_heuristic):
+        return heuristic.bind_many(graph, goals)
+    assert callable(heuristic), "the heuristic should be a callable or a goal_heuristic"
+    return heuristic
+
+
+def no_validation_kwargs(algo_class: type):
+    """the kwargs of `algo_class.solve` to skip the heuristic checks, i.e. {"validate_heuristics": False}
+    for the solvers that take the flag and {} for the others (e.g. the traversals)"""
+    if "validate_heuristics" in inspect.signature(algo_class.solve).parameters:
+        return {"validate_heuristics": False}
+    return {}
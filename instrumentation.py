@@ -0,0 +1,128 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+__all__ = ["search_observer", "search_stats", "phase"]
+
+class search_observer:
+    """The events a solver reports to the `observer` passed to it (all no-ops here)
+
+    Node arguments are node keys, i.e. node names for a `directed_graph(_weighted)`
+    and node indices for a `frozen_graph` (see `frozen_graph.name_of`).
+    Costs and priorities are None for the solvers without any (`BFS`, `DFS`).
+    Without an observer (the default), a solver only pays an `is None` check per event.
+    """
+    def on_expand(self, node, g):
+        """`node` is taken out of the OPEN buffer and its children are examined, g = its cost-to-come"""
+
+    def on_relax(self, parent, child, cost_edge, improved):
+        """the edge parent --> child is examined, `improved` iff it gives `child` a better cost-to-come"""
+
+    def on_push(self, node, priority, open_size, reopened):
+        """`node` enters (or moves within) the OPEN buffer, which then holds `open_size` nodes,
+        `reopened` iff the node had been expanded already (e.g. due to an inconsistent heuristic)"""
+
+    def on_phase(self, name, seconds):
+        """a phase of the solver (e.g. "search", "backtrack") took `seconds`"""
+
+
+@contextmanager
+def _timed_phase(observer, name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observer.on_phase(name, time.perf_counter() - t0)
+
+
+def phase(observer, name):
+    """context manager timing a phase of a solver (does nothing if observer is None)"""
+    return nullcontext() if observer is None else _timed_phase(observer, name)
+
+
+class search_stats(search_observer):
+    def __init__(self, on_expand=None, on_relax=None):
+        """counts the events of one or more searches
+
+        Args:
+            on_expand (callable, optional): also called as on_expand(node, g)
+            on_relax (callable, optional): also called as on_relax(parent, child, cost_edge, improved)
+
+        Counters:
+            expansions, relaxations (examined edges), improvements (relaxations that improved g),
+            pushes, reopenings, peak_open (the largest OPEN buffer),
+            phase_times (phase name --> seconds, summed up)
+        """
+        self._on_expand = on_expand
+        self._on_relax = on_relax
+        self.reset()
+
+    def reset(self):
+        self.expansions = 0
+        self.relaxations = 0
+        self.improvements = 0
+        self.pushes = 0
+        self.reopenings = 0
+        self.peak_open = 0
+        self.phase_times = dict()
+
+    def on_expand(self, node, g):
+        self.expansions += 1
+        if self._on_expand is not None:
+            self._on_expand(node, g)
+
+    def on_relax(self, parent, child, cost_edge, improved):
+        self.relaxations += 1
+        if improved:
+            self.improvements += 1
+        if self._on_relax is not None:
+            self._on_relax(parent, child, cost_edge, improved)
+
+    def on_push(self, node, priority, open_size, reopened):
+        self.pushes += 1
+        if reopened:
+            self.reopenings += 1
+        if open_size > self.peak_open:
+            self.peak_open = open_size
+
+    def on_phase(self, name, seconds):
+        self.phase_times[name] = self.phase_times.get(name, 0.0) + seconds
+
+    def as_dict(self):
+        return {
+            "expansions": self.expansions,
+            "relaxations": self.relaxations,
+            "improvements": self.improvements,
+            "pushes": self.pushes,
+            "reopenings": self.reopenings,
+            "peak_open": self.peak_open,
+            "phase_times": dict(self.phase_times),
+        }
+
+    def __str__(self):
+        out = ", ".join(f"{k}: {v}" for k, v in self.as_dict().items() if k != "phase_times")
+        timings = ", ".join(f"{name} {seconds * 1e3:.3f} ms" for name, seconds in self.phase_times.items())
+        return out + (f" ({timings})" if timings else "")
+
+
+if __name__ == "__main__":
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from graph_examples import longway_round
+    from algo_forward import Astar
+    from algo_bidirectional import BidirectionalAstar
+    from algo_incremental import LPAstar
+    from algo_traversal import BFS
+
+    for tcase in (german_city_network_acc_de_wikipedia(), longway_round()):
+        for algo_class in (Astar, BidirectionalAstar, LPAstar):
+            stats = search_stats()
+            tcase.verify(algo_class, observer=stats)
+            print(f"{algo_class.__name__} on {tcase.graph.name}: {stats}")
+        stats = search_stats(on_expand=lambda node, g: print(f"  expanding {node}"))
+        BFS(tcase.start, tcase.goal, tcase.graph, observer=stats).solve()
+        print(f"BFS on {tcase.graph.name}: {stats}")
+
+    # longway_round needs a reopening (of node E)
+    stats = search_stats()
+    tcase = longway_round()
+    tcase.verify(Astar, observer=stats)
+    assert stats.expansions == 6 and stats.reopenings == 1
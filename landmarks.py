@@ -0,0 +1,249 @@
+import numpy as np
+from graph_rep import directed_graph_weighted, frozen_graph
+from heuristics import goal_heuristic
+from algo_dp import shortest_path_tree
+
+__all__ = ["landmark_heuristic"]
+
+SELECTION_METHODS = ("farthest", "avoid", "random")
+
+class landmark_heuristic(goal_heuristic):
+    def __init__(self, graph, n_landmarks=8, selection="farthest", seed=0):
+        """ALT (A*, Landmarks, Triangle inequality) heuristic
+
+        Preprocessing: pick K landmarks L and store, for every node v,
+        d(L, v) and d(v, L) (forward and backward Dijkstra from each landmark).
+        By the triangle inequality, for any goal t,
+            d(v, t) >= d(L, t) - d(L, v)   and   d(v, t) >= d(v, L) - d(t, L)
+        so the max over all landmarks is an admissible (and consistent) heuristic,
+        for ANY (start, goal) pair.
+
+        Args:
+            graph (directed_graph_weighted or frozen_graph):
+                a mutable graph is frozen first (later changes are not reflected!),
+                edge costs must be non-negative
+            n_landmarks (int):
+            selection (str):
+                "farthest" --- each landmark is the node farthest from the ones chosen so far
+                "avoid" --- Goldberg & Werneck's avoid method, which favours regions
+                            where the current landmarks give poor bounds
+                "random"
+            seed (int): for the random choices
+
+        Remarks:
+        * the distance tables are float32 of shape (N, K), i.e. 8K bytes per node,
+          to keep the bounds admissible despite the rounding,
+          a tiny slack (relative to the largest distance) is subtracted
+        * inf marks unreachable pairs, which either gives no information
+          or proves that the goal is unreachable (h = inf)
+        """
+        assert isinstance(graph, (directed_graph_weighted, frozen_graph))
+        assert selection in SELECTION_METHODS, f"selection must be one of {SELECTION_METHODS}"
+        self.graph = graph if isinstance(graph, frozen_graph) else graph.freeze()
+        assert np.all(self.graph.cost_edge >= 0), "ALT requires non-negative edge costs"
+        n_landmarks = min(n_landmarks, self.graph.n_nodes)
+        self._rng = np.random.default_rng(seed)
+
+        n = self.graph.n_nodes
+        self.landmarks = [] # node indices
+        self.dist_from = np.full((n, 0), np.inf, dtype=np.float32) # d(L, v)
+        self.dist_to = np.full((n, 0), np.inf, dtype=np.float32) # d(v, L)
+        for _ in range(n_landmarks):
+            if selection == "farthest":
+                landmark = self._select_farthest()
+            elif selection == "avoid":
+                landmark = self._select_avoid()
+            else:
+                landmark = self._select_random()
+            if landmark is None:
+                break
+            self._add_landmark(landmark)
+        self._update_slack()
+
+    # ---- preprocessing ----
+    def _distances(self, source, reverse):
+        dist = np.full(self.graph.n_nodes, np.inf)
+        settled, _ = shortest_path_tree(self.graph, source, reverse=reverse)
+        dist[np.fromiter(settled.keys(), dtype=np.int64, count=len(settled))] = \
+            np.fromiter(settled.values(), dtype=np.float64, count=len(settled))
+        return dist
+
+    def _add_landmark(self, landmark):
+        self.landmarks.append(landmark)
+        dist_from = self._distances(landmark, reverse=False).astype(np.float32)
+        dist_to = self._distances(landmark, reverse=True).astype(np.float32)
+        self.dist_from = np.column_stack([self.dist_from, dist_from])
+        self.dist_to = np.column_stack([self.dist_to, dist_to])
+
+    def _update_slack(self):
+        finite = np.concatenate([self.dist_from[np.isfinite(self.dist_from)],
+                                 self.dist_to[np.isfinite(self.dist_to)]])
+        largest = float(finite.max()) if len(finite) else 0.0
+        self._slack = 4 * float(np.finfo(np.float32).eps) * largest
+
+    def _select_random(self):
+        candidates = np.setdiff1d(np.arange(self.graph.n_nodes), self.landmarks)
+        return int(self._rng.choice(candidates)) if len(candidates) else None
+
+    def _select_farthest(self):
+        if not self.landmarks:
+            # the node farthest from a random one
+            seed_node = self._select_random()
+            score = self._distances(seed_node, reverse=False) + self._distances(seed_node, reverse=True)
+            if self.graph.n_nodes > 1:
+                score[seed_node] = -1.0
+        else:
+            # distance (both ways) to the closest landmark so far, unreachable counts as farthest
+            score = np.min(self.dist_from + self.dist_to, axis=1)
+            score[self.landmarks] = -1.0
+        score = np.where(np.isinf(score), np.finfo(np.float32).max, score)
+        best = int(np.argmax(score))
+        return None if score[best] < 0 else best
+
+    def _select_avoid(self):
+        if not self.landmarks:
+            return self._select_farthest()
+        # a random root, and its shortest path tree
+        root = self._select_random()
+        if root is None:
+            return None
+        settled, parent = shortest_path_tree(self.graph, root)
+        # weight: how poor the current lower bound on d(root, v) is
+        # size: sum of the weights in the subtree, or 0 if the subtree holds a landmark
+        lower_bound = self._lower_bounds_from(root, settled)
+        weight = {v: d - lower_bound[v] for v, d in settled.items()}
+        size = dict(weight)
+        has_landmark = {v: False for v in settled}
+        for v in self.landmarks:
+            if v in has_landmark:
+                has_landmark[v] = True
+        children = dict()
+        for v in sorted(settled, key=settled.get, reverse=True): # leaves first
+            p = parent[v]
+            if p >= 0:
+                children.setdefault(p, []).append(v)
+                size[p] += size[v]
+                has_landmark[p] = has_landmark[p] or has_landmark[v]
+        for v in settled:
+            if has_landmark[v]:
+                size[v] = 0.0
+        # walk down along the largest subtree to a leaf
+        node = root
+        while True:
+            best_child = max(children.get(node, []), key=size.get, default=None)
+            if best_child is None or size[best_child] <= 0:
+                break
+            node = best_child
+        if node in self.landmarks:
+            return self._select_farthest()
+        return node
+
+    def _lower_bounds_from(self, source, settled):
+        # lower bounds on d(source, v) for the settled nodes v (capped by the true distance)
+        nodes = np.fromiter(settled.keys(), dtype=np.int64, count=len(settled))
+        dist = np.fromiter(settled.values(), dtype=np.float64, count=len(settled))
+        bounds = self._bounds(self.dist_from[source], self.dist_to[source],
+                              self.dist_from[nodes], self.dist_to[nodes], forward=False)
+        return dict(zip(nodes.tolist(), np.minimum(bounds, dist).tolist()))
+
+    # ---- the heuristic ----
+    @staticmethod
+    def _bounds(from_t, to_t, from_v, to_v, forward=True):
+        """lower bounds on d(v, t) (forward=True) or on d(t, v) (forward=False)
+        with from_* = d(L, *) and to_* = d(*, L), vectorized over the v's (rows)"""
+        with np.errstate(invalid="ignore"):
+            if forward:
+                a = from_t - from_v # d(L, t) - d(L, v)
+                b = to_v - to_t # d(v, L) - d(t, L)
+            else:
+                a = from_v - from_t # d(L, v) - d(L, t)
+                b = to_t - to_v # d(t, L) - d(v, L)
+        # (inf - inf = nan carries no information)
+        bound = np.fmax(np.fmax.reduce(a, axis=-1), np.fmax.reduce(b, axis=-1))
+        return np.fmax(bound, 0.0)
+
+    def lower_bound(self, source: str, target: str):
+        """an admissible estimate of the cost from `source` to `target`"""
+        u = self.graph.index_of(source)
+        t = self.graph.index_of(target)
+        return self._estimate(t, u, forward=True)
+
+    def _estimate(self, t, v, forward):
+        bound = float(self._bounds(self.dist_from[t], self.dist_to[t],
+                                   self.dist_from[v], self.dist_to[v], forward=forward))
+        return max(bound - self._slack, 0.0)
+
+    def batch(self, goal: str):
+        """the estimates of every node towards `goal`, as one (node index) array"""
+        t = self.graph.index_of(goal)
+        bound = self._bounds(self.dist_from[t], self.dist_to[t], self.dist_from, self.dist_to)
+        return np.fmax(bound.astype(np.float64) - self._slack, 0.0)
+
+    def _bind(self, graph, node_name, forward):
+        assert graph is self.graph or isinstance(graph, directed_graph_weighted), \
+            "the graph should be the one the landmarks were computed on (or the graph it was frozen from)"
+        t = self.graph.index_of(node_name)
+        estimate = self._estimate
+        if graph is self.graph:
+            return lambda v: estimate(t, v, forward)
+        index_of = self.graph.index_of
+        return lambda v: estimate(t, index_of(v), forward)
+
+    def bind(self, graph, goal: str):
+        return self._bind(graph, goal, forward=True)
+
+    def bind_reverse(self, graph, start: str):
+        return self._bind(graph, start, forward=False)
+
+    def bind_many(self, graph, goals):
+        """the minimum of the estimates towards every goal, evaluated at once
+        on the (goals x landmarks) table rows"""
+        assert graph is self.graph or isinstance(graph, directed_graph_weighted), \
+            "the graph should be the one the landmarks were computed on (or the graph it was frozen from)"
+        t = np.array([self.graph.index_of(goal) for goal in goals], dtype=np.int64)
+        from_t, to_t = self.dist_from[t], self.dist_to[t]
+        dist_from, dist_to = self.dist_from, self.dist_to
+        bounds = self._bounds
+        def estimate(v):
+            bound = float(bounds(from_t, to_t, dist_from[v], dist_to[v]).min())
+            return max(bound - self._slack, 0.0)
+        if graph is self.graph:
+            return estimate
+        index_of = self.graph.index_of
+        return lambda v: estimate(index_of(v))
+
+    # ---- persistence ----
+    def save(self, path):
+        np.savez(path, landmarks=np.array(self.landmarks, dtype=np.int64),
+                 dist_from=self.dist_from, dist_to=self.dist_to)
+
+    @classmethod
+    def load(cls, path, graph):
+        """
+        Args:
+            graph: the (frozen) graph the tables were computed on
+        """
+        out = cls.__new__(cls)
+        out.graph = graph if isinstance(graph, frozen_graph) else graph.freeze()
+        with np.load(path) as data:
+            out.landmarks = data["landmarks"].tolist()
+            out.dist_from = data["dist_from"]
+            out.dist_to = data["dist_to"]
+        assert out.dist_from.shape == out.dist_to.shape == (out.graph.n_nodes, len(out.landmarks))
+        out._rng = np.random.default_rng(0)
+        out._update_slack()
+        return out
+
+
+if __name__ == "__main__":
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from graph_examples import longway_round
+    from algo_forward import Astar
+    from algo_bidirectional import BidirectionalAstar
+
+    for tcase in (german_city_network_acc_de_wikipedia(), longway_round()):
+        for selection in SELECTION_METHODS:
+            alt = landmark_heuristic(tcase.graph, n_landmarks=3, selection=selection)
+            print(f"[{selection}] landmarks: {[alt.graph.name_of(L) for L in alt.landmarks]}")
+            tcase.verify(Astar, heuristic=alt)
+            tcase.verify(BidirectionalAstar, heuristic=alt, heuristic_to_start=alt)
@@ -0,0 +1,84 @@
+import heapq
+from itertools import count
+
+__all__ = ["heap_buffer"]
+
+class heap_buffer:
+    def __init__(self):
+        """A min-priority queue (binary heap) of nodes, aka the OPEN set
+
+        Decrease-key (and in fact any key change) is done by lazy deletion:
+        pushing a node that is already in the buffer adds a fresh heap entry
+        and invalidates the old one, which is silently dropped once it
+        surfaces at the top of the heap.
+
+        Remarks:
+        * an entry is valid iff its sequence number is the one recorded
+          in `self._entry_seq` for that node
+        * the sequence number also breaks ties among equal priorities
+          (first in, first out), so nodes never have to be comparable
+        * priorities can be anything comparable, e.g. f = g + h (float)
+          or a lexicographic key (tuple)
+        """
+        self._heap = [] # entries of (priority, seq, node)
+        self._entry_seq = dict() # node --> seq of its valid entry
+        self._entry_priority = dict() # node --> its current priority
+        self._seq = count()
+
+    def __len__(self):
+        return len(self._entry_seq)
+
+    def __contains__(self, node):
+        return node in self._entry_seq
+
+    def __iter__(self):
+        """the nodes in the buffer (in no particular order)"""
+        return iter(self._entry_seq)
+
+    def push(self, node, priority):
+        """insert the node, or update its priority if it is already in the buffer"""
+        seq = next(self._seq)
+        self._entry_seq[node] = seq
+        self._entry_priority[node] = priority
+        heapq.heappush(self._heap, (priority, seq, node))
+
+    def remove(self, node):
+        """take the node out of the buffer (no-op if it is not in there)"""
+        if node in self._entry_seq:
+            del self._entry_seq[node]
+            del self._entry_priority[node]
+
+    def priority_of(self, node):
+        return self._entry_priority[node]
+
+    def _discard_stale_top(self):
+        heap = self._heap
+        while heap and self._entry_seq.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+
+    def peek(self):
+        """the (node, priority) with the lowest priority, without removing it"""
+        self._discard_stale_top()
+        if not self._heap:
+            raise IndexError("peek from an empty buffer")
+        priority, _, node = self._heap[0]
+        return node, priority
+
+    def min_priority(self, default=None):
+        self._discard_stale_top()
+        return self._heap[0][0] if self._heap else default
+
+    def pop(self):
+        """remove and return the node with the lowest priority"""
+        self._discard_stale_top()
+        if not self._heap:
+            raise IndexError("pop from an empty buffer")
+        _, _, node = heapq.heappop(self._heap)
+        del self._entry_seq[node]
+        del self._entry_priority[node]
+        return node
+
+    def clear(self):
+        self._heap.clear()
+        self._entry_seq.clear()
+        self._entry_priority.clear()
@@ -0,0 +1,262 @@
+import sys
+import time
+import weakref
+from collections import OrderedDict
+import numpy as np
+from graph_rep import directed_graph_weighted, frozen_graph
+from algo_dp import shortest_path_tree, tree_path
+from heuristics import no_validation_kwargs
+
+__all__ = ["query_cache"]
+
+_MISSING = object() # (not cached, whereas None is a valid value, e.g. `BFS.solve` of an unreachable goal)
+
+def _estimate_size(value):
+    """a rough (but cheap) estimate of the memory held by a cached value, in bytes"""
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (0 if value.base is not None else value.nbytes)
+    if isinstance(value, dict):
+        # (a key and a value of ~50 bytes each, i.e. small str/ int/ float)
+        return sys.getsizeof(value) + 100 * len(value)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class _entry:
+    __slots__ = ("value", "n_bytes", "expires_at", "graph_ref")
+
+    def __init__(self, value, n_bytes, expires_at, graph_ref):
+        self.value = value
+        self.n_bytes = n_bytes
+        self.expires_at = expires_at
+        self.graph_ref = graph_ref
+
+
+class query_cache:
+    def __init__(self, max_bytes=64 * 2**20, ttl=None, clock=time.monotonic):
+        """An LRU cache of solved queries (and shortest path trees)
+
+        Args:
+            max_bytes (int): the memory budget, the least recently used entries
+                are evicted beyond it (sizes are estimated, see `_estimate_size`)
+            ttl (float, optional): seconds an entry stays valid (None: until evicted)
+            clock (callable): the time source for the ttl
+
+        Entries are keyed by (graph, graph version, start, goal, algorithm),
+        where the version is bumped by every change of the graph (see `directed_graph.version`),
+        so results of an older version never hit. Once a newer version of a graph shows up,
+        the entries of its older versions are dropped right away.
+        The graph itself is only weakly referenced.
+
+        The cached values are shared, i.e. they should not be modified.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict() # key --> _entry, least recently used first
+        self._keys_of_graph = dict() # id(graph) --> (version, set of keys)
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0 # by the memory budget
+        self.expirations = 0 # by the ttl
+        self.invalidations = 0 # by a change of the graph
+
+    # ---- the generic interface ----
+    def _key(self, graph, start, goal, algorithm):
+        return (id(graph), graph.version, start, goal, algorithm)
+
+    def _lookup(self, graph, start, goal, algorithm):
+        # the cached value or _MISSING (not counted as a hit or a miss)
+        key = self._key(graph, start, goal, algorithm)
+        entry = self._entries.get(key)
+        if entry is None or entry.graph_ref() is not graph:
+            return _MISSING
+        if entry.expires_at is not None and self._clock() >= entry.expires_at:
+            self._discard(key)
+            self.expirations += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def get(self, graph, start, goal, algorithm, default=None):
+        """the cached value (counted as a hit) or `default` (counted as a miss)"""
+        value = self._lookup(graph, start, goal, algorithm)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, graph, start, goal, algorithm, value):
+        """cache `value`, unless it alone exceeds the memory budget"""
+        n_bytes = _estimate_size(value)
+        if n_bytes > self.max_bytes:
+            return
+        self._invalidate_old_versions(graph)
+        key = self._key(graph, start, goal, algorithm)
+        if key in self._entries:
+            self._discard(key)
+        expires_at = None if self.ttl is None else self._clock() + self.ttl
+        self._entries[key] = _entry(value, n_bytes, expires_at, weakref.ref(graph))
+        self._keys_of_graph.setdefault(id(graph), (graph.version, set()))[1].add(key)
+        self.n_bytes += n_bytes
+        while self.n_bytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key)
+        self.n_bytes -= entry.n_bytes
+        version, keys = self._keys_of_graph[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._keys_of_graph[key[0]]
+
+    def _invalidate_old_versions(self, graph):
+        version, keys = self._keys_of_graph.get(id(graph), (graph.version, ()))
+        if version == graph.version:
+            return
+        # (also covers a new graph reusing the id of a garbage collected one)
+        for key in list(keys):
+            self._discard(key)
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_of_graph.clear()
+        self.n_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        n_lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / n_lookups if n_lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self.n_bytes,
+        }
+
+    # ---- solving through the cache ----
+    def solve(self, algo_class: type, start: str, goal: str, graph, solve_kwargs=None, **kwargs):
+        """`algo_class(start, goal, graph, **kwargs).solve(**solve_kwargs)`, unless it is cached
+
+        Args:
+            solve_kwargs (dict, optional): e.g. dict(k=3) for `KShortestPaths`
+                (the heuristic checks are skipped anyway, see `no_validation_kwargs`)
+
+        Returns:
+            whatever `solve` returns, i.e. for the shortest path solvers (`Astar` & co.)
+            the (forward) path sequence (tuple) and the total path cost (float),
+            or (None, None) if the goal is unreachable
+
+        For those solvers (the ones taking `validate_heuristics`), a cached shortest path tree
+        of `start` (see `tree`) answers the query as well.
+        The algorithm key is the class along with both kwargs, which have to be hashable
+        (e.g. the very same heuristic object).
+        """
+        solve_kwargs = dict() if solve_kwargs is None else solve_kwargs
+        algorithm = (algo_class, tuple(sorted(kwargs.items())), tuple(sorted(solve_kwargs.items())))
+        result = self._lookup(graph, start, goal, algorithm)
+        if result is not _MISSING:
+            self.hits += 1
+            return result
+        quiet_kwargs = no_validation_kwargs(algo_class)
+        if quiet_kwargs and not solve_kwargs:
+            tree = self._lookup(graph, start, None, "tree")
+            if tree is not _MISSING:
+                self.hits += 1
+                return self._from_tree(graph, tree, goal)
+        self.misses += 1
+        result = algo_class(start, goal, graph, **kwargs).solve(**quiet_kwargs, **solve_kwargs)
+        self.put(graph, start, goal, algorithm, result)
+        return result
+
+    def tree(self, graph, source: str):
+        """the (cached) shortest path tree of `source`, i.e. (cost dict, parent dict)
+        in the node keys of `graph` (the root's parent is -1 for a frozen_graph, None otherwise)"""
+        tree = self.get(graph, source, None, "tree")
+        if tree is not None:
+            return tree
+        assert isinstance(graph, (directed_graph_weighted, frozen_graph))
+        frozen = graph if isinstance(graph, frozen_graph) else graph.freeze()
+        dist, parent = shortest_path_tree(frozen, frozen.index_of(source))
+        if frozen is not graph:
+            name_of = frozen.name_of
+            dist = {name_of(u): d for u, d in dist.items()}
+            parent = {name_of(u): (None if p < 0 else name_of(p)) for u, p in parent.items()}
+        tree = (dist, parent)
+        self.put(graph, source, None, "tree", tree)
+        return tree
+
+    @staticmethod
+    def _from_tree(graph, tree, goal):
+        dist, parent = tree
+        key = graph._key_of(goal)
+        if key not in dist:
+            return None, None
+        name_of = graph._name_of
+        return tuple(name_of(n) for n in tree_path(parent, key)), dist[key]
+
+
+if __name__ == "__main__":
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from algo_forward import Astar
+
+    tcase = german_city_network_acc_de_wikipedia()
+    cache = query_cache(max_bytes=2**20)
+    for _ in range(3):
+        soln = cache.solve(Astar, tcase.start, tcase.goal, tcase.graph)
+        assert soln[0] in tcase.tuple_global_soln and soln[1] == tcase.true_min_cost
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        cache.solve(Astar, tcase.start, tcase.goal, tcase.graph)
+    print(f"a hit takes {(time.perf_counter() - t0) * 1e3:.1f} us")
+    print(cache.stats())
+    assert cache.hits == 1002 and cache.misses == 1
+
+    # a traffic jam near Frankfurt ==> the cached answer is stale
+    tcase.graph.set_cost_edge("Frankfurt", "WB", 216.)
+    assert cache.solve(Astar, tcase.start, tcase.goal, tcase.graph) == (("SB", "KL", "LH", "WB"), 306.0)
+    assert cache.invalidations == 1
+
+    # a shortest path tree answers the queries of any goal
+    dist, parent = cache.tree(tcase.graph, tcase.start)
+    for goal in ("KA", "HB", "WB"):
+        path, cost = cache.solve(Astar, tcase.start, goal, tcase.graph)
+        assert path == tree_path(parent, goal) and cost == dist[goal]
+    print(cache.stats())
+
+    # the memory budget
+    cache = query_cache(max_bytes=1000, ttl=60.)
+    for goal in tcase.graph.list_all_nodes():
+        cache.solve(Astar, tcase.start, goal, tcase.graph)
+    assert cache.n_bytes <= 1000 and cache.evictions > 0
+    print(cache.stats())
+
+    # any solver, e.g. the fewest hops or the k cheapest paths (not answered by the tree)
+    from algo_traversal import BFS
+    from algo_kshortest import KShortestPaths
+    cache = query_cache()
+    cache.tree(tcase.graph, tcase.start)
+    assert cache.solve(BFS, tcase.start, tcase.goal, tcase.graph) == BFS(tcase.start, tcase.goal, tcase.graph).solve()
+    three = cache.solve(KShortestPaths, tcase.start, tcase.goal, tcase.graph, solve_kwargs=dict(k=3))
+    assert len(three) == 3 and three is cache.solve(KShortestPaths, tcase.start, tcase.goal, tcase.graph,
+                                                    solve_kwargs=dict(k=3))
+
+
+    # None is a cached value too (BFS of an unreachable goal)
+    graph = directed_graph_weighted("two islands")
+    graph.add_nodes_from(["a", "b", "c"])
+    graph.add_edges_from([("a", "b", 1.)])
+    cache = query_cache()
+    for _ in range(3):
+        assert cache.solve(BFS, "a", "c", graph) is None
+    assert cache.misses == 1 and cache.hits == 2
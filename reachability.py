@@ -0,0 +1,360 @@
+import numpy as np
+from graph_rep import directed_graph, frozen_graph
+
+__all__ = ["reachability_index", "strongly_connected_components"]
+
+INF = float("inf")
+
+def strongly_connected_components(graph: frozen_graph):
+    """Tarjan's algorithm (iterative, so no recursion limit)
+
+    Returns:
+        comp (int64 array): the component id of every node index
+        n_components (int)
+
+    The ids are in reverse topological order of the condensation,
+    i.e. every edge u --> v between components has comp[u] > comp[v].
+    """
+    n_nodes = graph.n_nodes
+    offsets = graph.offsets.tolist()
+    targets = graph.targets.tolist()
+    index = [-1] * n_nodes # DFS discovery order
+    low = [0] * n_nodes
+    on_stack = [False] * n_nodes
+    comp = [-1] * n_nodes
+    stack = []
+    counter = 0
+    n_components = 0
+    for root in range(n_nodes):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, offsets[root])] # (node, position of its next child)
+        while work:
+            v, i = work[-1]
+            end = offsets[v + 1]
+            while i < end:
+                w = targets[i]
+                i += 1
+                if index[w] < 0:
+                    # descend into w (and come back to v's next child later)
+                    work[-1] = (v, i)
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, offsets[w]))
+                    break
+                if on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                # all children of v are done
+                work.pop()
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        comp[w] = n_components
+                        if w == v:
+                            break
+                    n_components += 1
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+    return np.array(comp, dtype=np.int64), n_components
+
+
+class reachability_index:
+    def __init__(self, graph, n_intervals=2, max_bitset_bytes=2**26, max_pending=64, seed=0):
+        """answers "is there a path from S to G?" without a traversal
+
+        Args:
+            graph (directed_graph or frozen_graph): a `directed_graph(_weighted)` is subscribed to,
+                so the index follows its edge insertions (call `close()` to unsubscribe)
+            n_intervals (int): the number of interval labels (for a large condensation, see below)
+            max_bitset_bytes (int): the budget of the transitive closure as a bit matrix
+            max_pending (int): inserted edges kept aside before the index is rebuilt (see below)
+            seed (int): for the random interval labels
+
+        Construction (O(V + E)):
+        1. the strongly connected components are collapsed (all their nodes reach each other),
+           which leaves a DAG (the condensation) numbered in reverse topological order
+        2. the DAG gets reachability labels
+           * a bit matrix (row c = the components reachable from c) if it fits `max_bitset_bytes`,
+             then every query is a lookup
+           * otherwise `n_intervals` interval labels (Yildirim et al., GRAIL) from randomized DFS:
+             each component c gets [low, post], where post is its DFS post-order number and low
+             the smallest post-order number among its descendants (so the interval of a descendant
+             lies within the interval of c), plus [first, post] covering its DFS subtree.
+             A query is answered right away if the intervals are not nested (unreachable)
+             or it is in the DFS subtree (reachable), only the remaining ones need a
+             search of the DAG, pruned by the same labels.
+
+        Edge insertions (u --> v) that u already reaches v through change nothing,
+        the others are kept aside and chained in every query (a few lookups each),
+        once there are more than `max_pending` of them the index is rebuilt (lazily).
+        """
+        assert isinstance(graph, (directed_graph, frozen_graph))
+        self.graph = graph
+        self.n_intervals = n_intervals
+        self.max_bitset_bytes = max_bitset_bytes
+        self.max_pending = max_pending
+        self._rng = np.random.default_rng(seed)
+        self._pending = [] # inserted edges (parent, child) not reflected in the labels yet
+        self.n_builds = 0
+        self._build()
+        if isinstance(graph, directed_graph):
+            graph.subscribe(self._on_edge_change)
+
+    def close(self):
+        """stop listening to the graph"""
+        if isinstance(self.graph, directed_graph):
+            self.graph.unsubscribe(self._on_edge_change)
+
+    # ---- construction ----
+    def _build(self):
+        graph = self.graph
+        self._frozen = frozen = graph if isinstance(graph, frozen_graph) else graph.freeze()
+        self._comp, self.n_components = strongly_connected_components(frozen)
+
+        # the condensation (in CSR layout)
+        n_comp = self.n_components
+        parents = np.repeat(self._comp, np.diff(frozen.offsets))
+        children = self._comp[frozen.targets]
+        keys = np.unique(parents[parents != children] * n_comp + children[parents != children])
+        dag_parents, dag_children = np.divmod(keys, n_comp)
+        self._dag_offsets = np.zeros(n_comp + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dag_parents, minlength=n_comp), out=self._dag_offsets[1:])
+        self._dag_targets = dag_children
+
+        self._closure = None
+        self._labels = []
+        n_words = (n_comp + 63) // 64
+        if n_comp * n_words * 8 <= self.max_bitset_bytes:
+            self._build_closure(n_words)
+        else:
+            for _ in range(self.n_intervals):
+                self._labels.append(self._interval_labels())
+            self._dag_children = [self._dag_targets[a:b].tolist() for a, b in
+                                  zip(self._dag_offsets[:-1].tolist(), self._dag_offsets[1:].tolist())]
+        self._pending.clear()
+        self.n_builds += 1
+
+    def _build_closure(self, n_words):
+        n_comp = self.n_components
+        closure = np.zeros((n_comp, n_words), dtype=np.uint64)
+        closure[np.arange(n_comp), np.arange(n_comp) >> 6] = np.left_shift(
+            np.uint64(1), (np.arange(n_comp) & 63).astype(np.uint64))
+        offsets, targets = self._dag_offsets, self._dag_targets
+        # (the children of a component have smaller ids, so they are complete already)
+        for c in range(n_comp):
+            a, b = offsets[c], offsets[c + 1]
+            if a < b:
+                closure[c] |= np.bitwise_or.reduce(closure[targets[a:b]], axis=0)
+        self._closure = closure
+
+    def _interval_labels(self):
+        """(first, low, post) lists of a DFS over the condensation, in a random order"""
+        n_comp = self.n_components
+        offsets = self._dag_offsets.tolist()
+        # shuffle the children within each row
+        rows = np.repeat(np.arange(n_comp), np.diff(self._dag_offsets))
+        targets = self._dag_targets[np.lexsort((self._rng.random(len(rows)), rows))].tolist()
+        has_parent = np.zeros(n_comp, dtype=bool)
+        has_parent[self._dag_targets] = True
+        roots = np.flatnonzero(~has_parent)
+
+        first = [-1] * n_comp
+        low = [0] * n_comp
+        post = [-1] * n_comp
+        counter = 0
+        for root in self._rng.permutation(roots).tolist():
+            first[root] = counter
+            low[root] = n_comp
+            work = [(root, offsets[root])]
+            while work:
+                c, i = work[-1]
+                end = offsets[c + 1]
+                while i < end:
+                    d = targets[i]
+                    i += 1
+                    if first[d] < 0:
+                        work[-1] = (c, i)
+                        first[d] = counter
+                        low[d] = n_comp
+                        work.append((d, offsets[d]))
+                        break
+                    if low[d] < low[c]: # (d is done already, it is a DAG)
+                        low[c] = low[d]
+                else:
+                    work.pop()
+                    post[c] = counter
+                    counter += 1
+                    if counter - 1 < low[c]:
+                        low[c] = counter - 1
+                    if work:
+                        p = work[-1][0]
+                        if low[c] < low[p]:
+                            low[p] = low[c]
+        return first, low, post
+
+    # ---- queries ----
+    def _comp_of(self, node_name):
+        try:
+            return int(self._comp[self._frozen.index_of(node_name)])
+        except KeyError: # (a node added after the last build)
+            return None
+
+    def _comp_reaches(self, cs, ct):
+        if cs == ct:
+            return True
+        if cs < ct: # (ids are in reverse topological order)
+            return False
+        if self._closure is not None:
+            return bool((int(self._closure[cs, ct >> 6]) >> (ct & 63)) & 1)
+        verdict = self._label_verdict(cs, ct)
+        if verdict is not None:
+            return verdict
+        # a DFS of the condensation, only into the components the labels can't rule out
+        children = self._dag_children
+        seen = {cs}
+        stack = [cs]
+        while stack:
+            for d in children[stack.pop()]:
+                if d in seen or d < ct:
+                    continue
+                seen.add(d)
+                verdict = self._label_verdict(d, ct)
+                if verdict:
+                    return True
+                if verdict is None:
+                    stack.append(d)
+        return False
+
+    def _label_verdict(self, cs, ct):
+        """True/ False if the labels tell whether cs reaches ct, None if they don't"""
+        for first, low, post in self._labels:
+            if low[ct] < low[cs] or post[ct] > post[cs]:
+                return False # (not nested)
+        for first, low, post in self._labels:
+            if first[cs] <= post[ct] <= post[cs]:
+                return True # (in the DFS subtree)
+        return None
+
+    def _index_reaches(self, start, goal):
+        # by the labels alone (i.e. ignoring the pending edges)
+        if start == goal:
+            return True
+        cs, ct = self._comp_of(start), self._comp_of(goal)
+        return cs is not None and ct is not None and self._comp_reaches(cs, ct)
+
+    def is_reachable(self, start: str, goal: str):
+        """whether there is a path from start to goal (by node names)"""
+        if len(self._pending) > self.max_pending:
+            self._build()
+        if self._index_reaches(start, goal):
+            return True
+        if not self._pending:
+            return False
+        # chain the pending edges: start ~~> u1 --> v1 ~~> u2 --> v2 ... ~~> goal
+        frontier = [start]
+        used = set()
+        while frontier:
+            node = frontier.pop()
+            for edge in self._pending:
+                if edge in used:
+                    continue
+                u, v = edge
+                if self._index_reaches(node, u):
+                    if self._index_reaches(v, goal):
+                        return True
+                    used.add(edge)
+                    frontier.append(v)
+        return False
+
+    def path(self, start: str, goal: str):
+        """a path from start to goal (a list of node names, not necessarily the shortest one),
+        or None right away if there is none
+
+        The DFS only enters nodes that reach the goal, so it hardly ever backs up.
+        """
+        if not self.is_reachable(start, goal):
+            return None
+        graph = self.graph
+        goal_key = graph._key_of(goal)
+        parent = {graph._key_of(start): None}
+        stack = [graph._key_of(start)]
+        while stack:
+            node = stack.pop()
+            if node == goal_key:
+                break
+            for child in graph._children_of(node):
+                if child not in parent and self.is_reachable(graph._name_of(child), goal):
+                    parent[child] = node
+                    stack.append(child)
+        backward_path = [goal_key]
+        while parent[backward_path[-1]] is not None:
+            backward_path.append(parent[backward_path[-1]])
+        return [graph._name_of(n) for n in reversed(backward_path)]
+
+    def _on_edge_change(self, parent_node, child_node, old_cost, new_cost):
+        if old_cost < INF:
+            return # (a cost change)
+        if not self.is_reachable(parent_node, child_node):
+            self._pending.append((parent_node, child_node))
+
+    def __str__(self):
+        labels = "a bit matrix" if self._closure is not None else f"{len(self._labels)} interval label(s)"
+        return (f"reachability index of {self.graph.name}: {self.n_components} components, "
+                f"{len(self._dag_targets)} DAG edges, {labels}, {len(self._pending)} pending edge(s)")
+
+
+if __name__ == "__main__":
+    import time
+    from graph_examples import german_city_network_acc_de_wikipedia
+    from bench.generators import random_geometric_graph
+    from algo_traversal import BFS, bfs_tree
+
+    tcase = german_city_network_acc_de_wikipedia()
+    index = reachability_index(tcase.graph)
+    print(index)
+    assert index.is_reachable("SB", "WB") and not index.is_reachable("WB", "SB")
+    assert index.path("WB", "SB") is None
+    tcase.graph.add_edge("WB", "KL", 120.) # closes a cycle
+    assert not index.is_reachable("WB", "SB") and not index.is_reachable("WB", "HB")
+    assert index.is_reachable("WB", "LH") and index.is_reachable("LH", "Frankfurt")
+    print(index.path("WB", "LH"))
+    tcase.graph.add_node("Berlin", 0.) # a new node
+    tcase.graph.add_edge("Frankfurt", "Berlin", 550.)
+    assert index.is_reachable("SB", "Berlin") and not index.is_reachable("Berlin", "SB")
+
+    # sparse random directed graphs, i.e. a big SCC and many small ones
+    rng = np.random.default_rng(0)
+    for max_bitset_bytes in (2**26, 0):
+        sgraph = random_geometric_graph(20000, mean_degree=8.0, seed=1)
+        graph = sgraph.graph
+        # keep each edge in one direction only (at random)
+        keep = rng.random(graph.n_edges) < 0.5
+        parents = np.repeat(np.arange(graph.n_nodes), np.diff(graph.offsets))[keep]
+        graph = frozen_graph.from_edge_arrays("random orientation", parents, graph.targets[keep],
+                                              node_names=[str(i) for i in range(graph.n_nodes)])
+        t0 = time.perf_counter()
+        index = reachability_index(graph, max_bitset_bytes=max_bitset_bytes)
+        print(f"{index} (built in {time.perf_counter() - t0:.2f} s)")
+
+        sources = rng.integers(0, graph.n_nodes, 20)
+        goals = rng.integers(0, graph.n_nodes, 500)
+        t0 = time.perf_counter()
+        answers = [[index.is_reachable(str(s), str(g)) for g in goals] for s in sources]
+        per_query = (time.perf_counter() - t0) / answers.__len__() / len(goals)
+        for s, row in zip(sources, answers):
+            hops, _ = bfs_tree(graph, int(s))
+            assert row == (hops[goals] >= 0).tolist()
+        print(f"  {per_query * 1e6:.1f} us per query, {np.mean(answers):.2%} reachable")
+    t0 = time.perf_counter()
+    BFS(str(sources[0]), str(goals[0]), graph).solve()
+    print(f"  vs. {(time.perf_counter() - t0) * 1e6:.0f} us for a BFS")